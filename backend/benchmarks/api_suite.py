@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: end-to-end API throughput and latency
+
+Drives the real FastAPI app in process (httpx over ASGI, with the app's
+lifespan running). The synthetic market data provider stands in for Yahoo,
+and the local fake OpenAI server stands in for the model, each with a fixed
+latency. The suite covers the quote, history, search, analyze, sentiment and
+earnings routes in three scenarios:
+
+- cold:  every request is for a symbol, query, transcript or period the app
+         has not seen, so it goes through to the provider or the model;
+- warm:  a small hot set is requested once to prime the caches, then
+         requested repeatedly;
+- mixed: a weighted mix of all routes at once, mostly from the hot set.
+
+For each scenario and route it reports requests/s, p50/p95/p99 latency and
+errors, plus process RSS after each scenario. Results are written as JSON
+and compared with a stored baseline. A route whose p95 or throughput moves
+past --tolerance is flagged, and the exit status is non-zero.
+
+Usage: python benchmarks/api_suite.py [--requests 200] [--concurrency 16]
+                                      [--output results.json] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+PORT = 8012
+STATE_DIR = tempfile.mkdtemp(prefix="api-suite-")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["MARKET_DATA_PROVIDER"] = "synthetic"
+os.environ["QUOTE_REFRESHER_ENABLED"] = "false"
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["HISTORY_STORE_DIR"] = str(Path(STATE_DIR) / "history")
+os.environ["SENTIMENT_JOB_DIR"] = str(Path(STATE_DIR) / "jobs")
+os.environ.pop("SENTIMENT_CACHE_DIR", None)
+
+import httpx
+import fake_openai
+import main
+from market_data import SyntheticProvider
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "api_suite.json"
+ROUTES = ["quote", "history", "search", "analyze", "sentiment", "earnings"]
+# Share of each route in the mixed workload
+MIX_WEIGHTS = {"quote": 40, "history": 20, "search": 25, "analyze": 5, "sentiment": 5, "earnings": 5}
+HOT_SET = 20
+MIXED_HOT_SHARE = 0.9
+HISTORY_PERIODS = ["1D", "1W", "1M", "1Y"]
+SENTENCE = "Revenue grew in line with guidance while margins were pressured by input costs."
+
+
+class Workload:
+    """Builds requests for each route, either from the hot set or never seen before"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.fresh = itertools.count()
+        self.hot_symbols = main.symbol_index.symbols[:HOT_SET]
+        self.analyzed = list(self.hot_symbols)
+        self.queries = [
+            text[:end].lower()
+            for symbol, name in zip(main.symbol_index.symbols, main.symbol_index.names)
+            for text in (symbol, name)
+            for end in range(1, min(len(text), 8) + 1)
+        ]
+
+    def cold_symbol(self) -> str:
+        return f"COLD{next(self.fresh)}"
+
+    def transcript(self, symbol: str, variant: int) -> str:
+        sentences = " ".join([SENTENCE] * (10 + variant % 20))
+        return f"CEO: {symbol} quarter {variant}. {sentences}\nCFO: {sentences}"
+
+    def request(self, route: str, hot: bool):
+        """(route, method, path, json body) for one request"""
+        symbol = self.rng.choice(self.hot_symbols) if hot else self.cold_symbol()
+        if route == "quote":
+            return route, "GET", f"/api/stocks/{symbol}", None
+        if route == "history":
+            period = self.rng.choice(HISTORY_PERIODS)
+            return route, "GET", f"/api/stocks/{symbol}/history?period={period}&max_points=200", None
+        if route == "search":
+            query = self.rng.choice(self.queries[:200]) if hot else self.rng.choice(self.queries)
+            return route, "GET", f"/api/stocks/search/{query}", None
+        if route == "analyze":
+            variant = self.rng.randrange(5) if hot else next(self.fresh)
+            if not hot:
+                self.analyzed.append(symbol)
+            body = {"transcript": self.transcript(symbol, variant)}
+            return route, "POST", f"/api/stocks/{symbol}/analyze?mode=llm", body
+        if route == "sentiment":
+            symbol = self.rng.choice(self.analyzed if hot else self.analyzed[HOT_SET:] or self.analyzed)
+            return route, "GET", f"/api/stocks/{symbol}/sentiment", None
+        if route == "earnings":
+            quarter = str(self.rng.randrange(1, 5)) if hot else str(next(self.fresh) % 4 + 1)
+            return route, "POST", f"/api/stocks/{symbol}/earnings/generate", {"quarter": quarter, "year": "2024"}
+        raise ValueError(route)
+
+    def priming(self):
+        """Every hot-set request, so warm runs start from full caches"""
+        requests = []
+        for symbol in self.hot_symbols:
+            requests.append(("quote", "GET", f"/api/stocks/{symbol}", None))
+            for period in HISTORY_PERIODS:
+                requests.append(("history", "GET", f"/api/stocks/{symbol}/history?period={period}&max_points=200", None))
+            for variant in range(5):
+                requests.append(("analyze", "POST", f"/api/stocks/{symbol}/analyze?mode=llm",
+                                 {"transcript": self.transcript(symbol, variant)}))
+            for quarter in "1234":
+                requests.append(("earnings", "POST", f"/api/stocks/{symbol}/earnings/generate",
+                                 {"quarter": quarter, "year": "2024"}))
+        return requests
+
+
+def rss_mb() -> float:
+    """Current resident set size, or the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+async def drive(client: httpx.AsyncClient, requests, concurrency: int):
+    """Replay requests with a fixed number of concurrent clients"""
+    latencies = {}
+    errors = {}
+    queue = iter(requests)
+
+    async def worker():
+        for route, method, path, body in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.setdefault(route, []).append(time.perf_counter() - start)
+            errors[route] = errors.get(route, 0) + failed
+
+    # A full collection of the previous run's garbage would otherwise land in this one
+    gc.collect()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50Ms": round(float(np.percentile(ms, 50)), 3),
+        "p95Ms": round(float(np.percentile(ms, 95)), 3),
+        "p99Ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+async def run_per_route(client, workload: Workload, hot: bool, args) -> dict:
+    """Each route on its own, so route throughputs don't share a clock"""
+    results = {}
+    for route in ROUTES:
+        requests = [workload.request(route, hot) for _ in range(args.requests)]
+        latencies, errors, elapsed = await drive(client, requests, args.concurrency)
+        results[route] = summarize(latencies[route], errors[route], elapsed)
+    return results
+
+
+async def run_mixed(client, workload: Workload, args) -> dict:
+    routes = workload.rng.choices(list(MIX_WEIGHTS), weights=list(MIX_WEIGHTS.values()), k=args.mixed_requests)
+    requests = [workload.request(route, workload.rng.random() < MIXED_HOT_SHARE) for route in routes]
+    latencies, errors, elapsed = await drive(client, requests, args.concurrency)
+    results = {route: summarize(latencies[route], errors[route], elapsed) for route in ROUTES if route in latencies}
+    results["overall"] = summarize(
+        [latency for samples in latencies.values() for latency in samples], sum(errors.values()), elapsed
+    )
+    return results
+
+
+async def run_suite(args) -> dict:
+    main.market_data = SyntheticProvider(
+        latency=args.provider_latency_ms / 1000, jitter=args.provider_latency_ms / 4000, seed=args.seed
+    )
+    workload = Workload(random.Random(args.seed))
+    results = {"scenarios": {}, "memory": {"startRssMb": round(rss_mb(), 1)}}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            results["scenarios"]["cold"] = await run_per_route(client, workload, hot=False, args=args)
+            results["memory"]["coldRssMb"] = round(rss_mb(), 1)
+
+            await drive(client, workload.priming(), args.concurrency)
+            results["scenarios"]["warm"] = await run_per_route(client, workload, hot=True, args=args)
+            results["memory"]["warmRssMb"] = round(rss_mb(), 1)
+
+            results["scenarios"]["mixed"] = await run_mixed(client, workload, args)
+            results["memory"]["mixedRssMb"] = round(rss_mb(), 1)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float):
+    """(scenario, route, metric, baseline, current) for every regression past tolerance"""
+    regressions = []
+    for scenario, routes in baseline.get("scenarios", {}).items():
+        for route, before in routes.items():
+            after = results["scenarios"].get(scenario, {}).get(route)
+            if after is None:
+                continue
+            # Sub-millisecond routes jitter by more than any sane percentage
+            if after["p95Ms"] > before["p95Ms"] * (1 + tolerance) and after["p95Ms"] - before["p95Ms"] > min_delta_ms:
+                regressions.append((scenario, route, "p95Ms", before["p95Ms"], after["p95Ms"]))
+            # Likewise for throughput, as wall time per request; a lone stall can
+            # halve a short run's rate, so the median must slow too
+            extra_ms = (1 / after["rps"] - 1 / before["rps"]) * 1000
+            slower = after["p50Ms"] > before["p50Ms"] * (1 + tolerance)
+            if after["rps"] < before["rps"] * (1 - tolerance) and extra_ms > min_delta_ms and slower:
+                regressions.append((scenario, route, "rps", before["rps"], after["rps"]))
+            if after["errors"] > before["errors"]:
+                regressions.append((scenario, route, "errors", before["errors"], after["errors"]))
+    for key, before in baseline.get("memory", {}).items():
+        after = results["memory"].get(key)
+        if after is not None and key != "startRssMb" and after > before * (1 + tolerance):
+            regressions.append(("memory", key, "rssMb", before, after))
+    return regressions
+
+
+def print_report(results: dict, baseline: dict):
+    print(f"{'scenario':<8} {'route':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'p95 vs base':>12}")
+    for scenario, routes in results["scenarios"].items():
+        for route, stats in routes.items():
+            before = baseline.get("scenarios", {}).get(scenario, {}).get(route)
+            delta = f"{(stats['p95Ms'] / before['p95Ms'] - 1) * 100:+.0f}%" if before and before["p95Ms"] else "-"
+            print(
+                f"{scenario:<8} {route:<10} {stats['rps']:>9.1f} {stats['p50Ms']:>9.2f} {stats['p95Ms']:>9.2f} "
+                f"{stats['p99Ms']:>9.2f} {stats['errors']:>7} {delta:>12}"
+            )
+    print("RSS MB: " + ", ".join(f"{key[:-5]} {value:.1f}" for key, value in results["memory"].items()))
+
+
+def main_cli(args) -> int:
+    fake_openai.serve_in_thread(
+        PORT, base_latency=args.openai_latency_ms / 1000, latency_per_1k_words=args.openai_latency_ms / 1000,
+        token_interval=0.0
+    )
+    results = asyncio.run(run_suite(args))
+    results["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests": args.requests,
+        "mixedRequests": args.mixed_requests,
+        "concurrency": args.concurrency,
+        "providerLatencyMs": args.provider_latency_ms,
+        "openaiLatencyMs": args.openai_latency_ms,
+    }
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() and not args.save_baseline else {}
+    print_report(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not baseline:
+        print("No baseline to compare against (record one with --save-baseline)")
+        return 0
+
+    settings = ["requests", "mixedRequests", "concurrency", "providerLatencyMs", "openaiLatencyMs"]
+    if any(baseline.get("meta", {}).get(key) != results["meta"][key] for key in settings):
+        print("Note: baseline was recorded with different settings; deltas may not be comparable")
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for scenario, route, metric, before, after in regressions:
+        print(f"REGRESSION {scenario}/{route} {metric}: {before} -> {after}")
+    if regressions:
+        return 1
+    print(f"OK: within {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route in the cold and warm scenarios")
+    parser.add_argument("--mixed-requests", type=int, default=2000, help="requests in the mixed scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--provider-latency-ms", type=float, default=20.0, help="synthetic market data latency per call")
+    parser.add_argument("--openai-latency-ms", type=float, default=50.0, help="fake OpenAI base latency (and per 1k prompt words)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before flagging")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency changes smaller than this")
+    sys.exit(main_cli(parser.parse_args()))
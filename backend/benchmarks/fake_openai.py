@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for tests and benchmarks
+
+Implements POST /v1/chat/completions, including stream=true. Latency grows
+with prompt length (like a real model), JSON-mode requests get a
+deterministic sentiment payload derived from the prompt, and other requests
+get filler text.
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8001/v1.
+
+Usage: python benchmarks/fake_openai.py [--port 8001] [--base-latency 0.2] [--latency-per-1k-words 0.5]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake OpenAI")
+settings = {"base_latency": 0.2, "latency_per_1k_words": 0.5, "token_interval": 0.01}
+stats = {"requests": 0}
+
+
+def sentiment_payload(prompt: str) -> dict:
+    digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    words = max(len(prompt.split()), 1)
+    return {
+        "sentimentScore": 3 + digest % 7,
+        "positiveCount": words // 50,
+        "neutralCount": words // 80,
+        "negativeCount": words // 120,
+        "confidence": 0.6 + (digest % 40) / 100,
+        "summary": f"Synthetic analysis of {words} words.",
+        "keyHighlights": [f"highlight-{digest % 13}", f"highlight-{digest % 17}"],
+        "riskFactors": [f"risk-{digest % 11}"],
+    }
+
+
+def filler_text(prompt: str, max_tokens: int) -> str:
+    words = ["CEO:", "Revenue", "grew", "strongly", "this", "quarter.", "CFO:", "Margins", "expanded", "and", "guidance", "is", "raised."]
+    return " ".join(words[i % len(words)] for i in range(max_tokens))
+
+
+async def stream_chunks(model: str, content: str):
+    """Emit content word by word as chat.completion.chunk events"""
+    chunk_id = f"chatcmpl-fake-{stats['requests']}"
+    for i, word in enumerate(content.split(" ")):
+        delta = {"content": word if i == 0 else " " + word}
+        if i == 0:
+            delta["role"] = "assistant"
+        payload = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(payload)}\n\n"
+        await asyncio.sleep(settings["token_interval"])
+    final = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    latency = settings["base_latency"] + len(prompt.split()) / 1000 * settings["latency_per_1k_words"]
+    await asyncio.sleep(latency)
+
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        content = json.dumps(sentiment_payload(prompt))
+    else:
+        content = filler_text(prompt, min(int(body.get("max_tokens") or 200), 2000))
+
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body.get("model", "gpt-4o"), content), media_type="text/event-stream")
+
+    return {
+        "id": f"chatcmpl-fake-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": len(prompt.split()) * 4 // 3,
+            "completion_tokens": len(content.split()) * 4 // 3,
+            "total_tokens": (len(prompt.split()) + len(content.split())) * 4 // 3,
+        },
+    }
+
+
+def serve_in_thread(port: int, **overrides) -> uvicorn.Server:
+    """Start the fake server on a background thread and wait until it accepts requests"""
+    settings.update(overrides)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-1k-words", type=float, default=0.5)
+    args = parser.parse_args()
+    settings.update(base_latency=args.base_latency, latency_per_1k_words=args.latency_per_1k_words)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
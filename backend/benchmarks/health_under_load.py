@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Load test: /health latency while 50 slow quote fetches are in flight
+
+Swaps in the synthetic market data provider with a per-call latency so the
+test runs offline, then compares /health p50/p99 with and without quote
+fetches outstanding.
+Exits non-zero if p99 degrades by more than the allowed factor.
+
+Usage: python benchmarks/health_under_load.py [--latency 2.0] [--fetches 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("MARKET_DATA_WORKERS", "64")
+
+import httpx
+import main
+from market_data import SyntheticProvider
+
+
+def percentile(samples, pct):
+    return float(np.percentile(samples, pct)) if samples else 0.0
+
+
+async def measure_health(client: httpx.AsyncClient, requests: int, interval: float):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(args):
+    # A quote is an info call plus a history call
+    main.market_data = SyntheticProvider(latency=args.latency / 2)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        idle = await measure_health(client, args.requests, 0.005)
+
+        # Distinct symbols so single-flight doesn't collapse the fetches
+        symbols = [f"SLOW{i}" for i in range(args.fetches)]
+        fetches = [asyncio.create_task(client.get(f"/api/stocks/{symbol}")) for symbol in symbols]
+        await asyncio.sleep(0.05)
+        loaded = await measure_health(client, args.requests, 0.005)
+        in_flight_at_end = sum(not task.done() for task in fetches)
+        results = await asyncio.gather(*fetches)
+        stats = (await client.get("/api/stats")).json()
+
+    idle_p99 = percentile(idle, 99)
+    loaded_p99 = percentile(loaded, 99)
+    print(f"quote fetches: {args.fetches} x {args.latency:.1f}s, {in_flight_at_end} still in flight after sampling")
+    print(f"/health idle:   p50={statistics.median(idle):.2f}ms p99={idle_p99:.2f}ms")
+    print(f"/health loaded: p50={statistics.median(loaded):.2f}ms p99={loaded_p99:.2f}ms")
+    print(f"quote responses: {sorted({r.status_code for r in results})}")
+    print(f"executor: {stats['marketDataExecutor']}")
+
+    limit = max(idle_p99 * args.max_ratio, idle_p99 + args.slack_ms)
+    if loaded_p99 > limit:
+        print(f"FAIL: loaded p99 {loaded_p99:.2f}ms exceeds {limit:.2f}ms")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds per stand-in quote fetch")
+    parser.add_argument("--fetches", type=int, default=50, help="concurrent quote fetches")
+    parser.add_argument("--requests", type=int, default=200, help="/health samples per phase")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="allowed p99 growth factor")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="allowed absolute p99 growth")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: history response serialization
+
+Compares the old row-by-row path (iterrows + one HistoricalData per row)
+with the column-wise serialize_history, with and without LTTB downsampling.
+
+Usage: python benchmarks/history_serialization.py [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from main import HistoricalData, serialize_history
+
+SIZES = [250, 5_000, 100_000]
+
+
+def make_history(rows: int) -> pd.DataFrame:
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=rows, freq="5min", tz="Asia/Kolkata")
+    close = 1000 + np.cumsum(np.random.default_rng(rows).normal(0, 1, rows))
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e5}, index=index)
+
+
+def serialize_rows(hist: pd.DataFrame):
+    """The original per-row implementation"""
+    data = []
+    for date, row in hist.iterrows():
+        data.append(HistoricalData(
+            date=date.strftime('%Y-%m-%d'),
+            price=float(row['Close'])
+        ))
+    return data
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main(args):
+    print(f"{'rows':>8} {'iterrows ms':>12} {'columns ms':>12} {'speedup':>8} {'lttb 500 ms':>12}")
+    for rows in SIZES:
+        hist = make_history(rows)
+        old = best_of(lambda: serialize_rows(hist), args.repeat)
+        new = best_of(lambda: serialize_history(hist), args.repeat)
+        lttb = best_of(lambda: serialize_history(hist, max_points=500), args.repeat)
+        print(f"{rows:>8} {old:>12.2f} {new:>12.2f} {old / new:>7.1f}x {lttb:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; best is reported")
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: response serialization on the read routes
+
+Calls the app in-process over raw ASGI, with FAST_JSON_ENABLED off
+(FastAPI validates the returned models against response_model and encodes
+them) and on (orjson bodies, quotes served from the JSON cached in
+MemoryStorage), and reports the time per request and what the fast path
+saves. Caches are warm in both modes, so the difference is serialization.
+No client and no socket are involved, so the absolute times are the
+server's share of a request. History comes from the payload cache in both
+modes, so it shows validating and encoding the rows against sending bytes
+encoded once.
+
+Usage: python benchmarks/json_responses.py [--requests 2000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+STATE_DIR = tempfile.mkdtemp(prefix="json-responses-")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["MARKET_DATA_PROVIDER"] = "synthetic"
+os.environ["QUOTE_REFRESHER_ENABLED"] = "false"
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["HISTORY_STORE_DIR"] = str(Path(STATE_DIR) / "history")
+
+import fastapi
+import pydantic
+
+import fast_json
+import main
+from models import SentimentAnalysis
+
+SYMBOLS = ["TCS", "INFY", "RELIANCE", "HDFCBANK", "ICICIBANK", "SBIN", "ITC", "LT", "WIPRO", "AXISBANK"]
+
+# (label, method, path, JSON body)
+ROUTES = [
+    ("quote", "GET", "/api/stocks/TCS", None),
+    ("batch x10", "POST", "/api/stocks/batch", {"symbols": SYMBOLS}),
+    ("history 1Y", "GET", "/api/stocks/TCS/history?period=1Y", None),
+    ("history 200 pts", "GET", "/api/stocks/TCS/history?period=1Y&max_points=200", None),
+    ("search", "GET", "/api/stocks/search/ta", None),
+    ("sentiment", "GET", "/api/stocks/TCS/sentiment", None),
+]
+
+
+async def call(method: str, path: str, body) -> int:
+    """One request through the whole ASGI stack; returns the response body size"""
+    url = urlsplit(path)
+    payload = fast_json.dumps(body) if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    received = False
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{method} {path}: HTTP {message['status']}")
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return size
+
+
+async def time_route(method: str, path: str, body, requests: int, repeat: int) -> float:
+    """Best per-request time in microseconds over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await call(method, path, body)
+        best = min(best, (time.perf_counter() - started) / requests)
+    return best * 1e6
+
+
+async def run(args):
+    async with main.app.router.lifespan_context(main.app):
+        main.storage.store_sentiment_analysis(SentimentAnalysis(
+            stockSymbol="TCS", transcriptText="CEO: a solid quarter. " * 400, sentimentScore=0.4,
+            positiveCount=12, neutralCount=30, negativeCount=3, confidence=0.8, summary="Solid quarter",
+            keyHighlights=["Revenue up"] * 5, riskFactors=["Attrition"] * 3,
+        ))
+        sizes = {}
+        for label, method, path, body in ROUTES:
+            sizes[label] = await call(method, path, body)
+
+        timings = {}
+        for enabled in (False, True):
+            main.FAST_JSON_ENABLED = enabled
+            for label, method, path, body in ROUTES:
+                await call(method, path, body)
+                timings[label, enabled] = await time_route(method, path, body, args.requests, args.repeat)
+
+    # Newer FastAPI releases encode through pydantic-core themselves, which narrows the gap
+    print(f"fastapi {fastapi.__version__}, pydantic {pydantic.VERSION}")
+    print(f"{'route':<16} {'bytes':>7} {'fastapi us':>11} {'fast us':>9} {'saved us':>9} {'speedup':>8}")
+    for label, _, _, _ in ROUTES:
+        slow, fast = timings[label, False], timings[label, True]
+        print(f"{label:<16} {sizes[label]:>7} {slow:>11.1f} {fast:>9.1f} {slow - fast:>9.1f} {slow / fast:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; best is reported")
+    asyncio.run(run(parser.parse_args()))
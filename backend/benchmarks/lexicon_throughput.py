@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local lexicon sentiment scorer throughput
+
+Scores synthetic transcripts of several lengths on one core and reports
+transcripts and tokens per second.
+
+Usage: python benchmarks/lexicon_throughput.py [--count 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lexicon import LexiconScorer
+
+FILLER = "the company said revenue for the quarter and our segment in india with customers across markets".split()
+
+
+def make_transcripts(scorer: LexiconScorer, words: int, count: int):
+    rng = random.Random(words)
+    vocabulary = FILLER * 8 + sorted(scorer.codes)
+    transcripts = []
+    for _ in range(count):
+        tokens = [rng.choice(vocabulary) for _ in range(words)]
+        for i in range(12, words, 15):
+            tokens[i] += "."
+        transcripts.append("CEO: " + " ".join(tokens))
+    return transcripts
+
+
+def main(args):
+    scorer = LexiconScorer.load()
+    print(f"lexicon: {scorer.words} words")
+    print(f"{'words':>7} {'transcripts/s':>14} {'tokens/s':>12}")
+    for words in (200, 2_000, 20_000):
+        count = max(args.count * 200 // words, 20)
+        transcripts = make_transcripts(scorer, words, count)
+        start = time.perf_counter()
+        for transcript in transcripts:
+            scorer.score(transcript)
+        elapsed = time.perf_counter() - start
+        print(f"{words:>7} {count / elapsed:>14.0f} {count * words / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="transcripts at the shortest length")
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of request metrics
+
+Calls a minimal ASGI app directly and through MetricsMiddleware, and reports
+the difference per request, i.e. what instrumentation adds to every call
+including a cached quote. Also times a bare histogram observation and a
+/metrics render with realistic label cardinality.
+
+Usage: python benchmarks/metrics_overhead.py [--requests 200000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import Registry, MetricsMiddleware, UpstreamMetrics
+
+
+class Route:
+    path = "/api/stocks/{symbol}"
+
+
+ROUTE = Route()
+
+
+async def app(scope, receive, send):
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def per_request(handler, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/stocks/TCS"}
+    start = time.perf_counter()
+    for _ in range(requests):
+        await handler(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main(args):
+    registry = Registry()
+    instrumented = MetricsMiddleware(app, registry)
+
+    # Best of three, since a single run picks up scheduler noise of the same order
+    bare = min(asyncio.run(per_request(app, args.requests)) for _ in range(3))
+    wrapped = min(asyncio.run(per_request(instrumented, args.requests)) for _ in range(3))
+    print(f"bare app:          {bare * 1e6:6.2f} us/request")
+    print(f"with middleware:   {wrapped * 1e6:6.2f} us/request")
+    print(f"overhead:          {(wrapped - bare) * 1e6:6.2f} us/request")
+
+    histogram = registry.histogram("bench_seconds", "benchmark", ("route",))
+    child = histogram.labels("/api/stocks/{symbol}")
+    start = time.perf_counter()
+    for i in range(args.requests):
+        child.observe(0.001 * (i % 50))
+    print(f"histogram observe: {(time.perf_counter() - start) / args.requests * 1e6:6.2f} us")
+
+    # About the series a busy instance exports: 20 routes x 4 statuses, plus upstreams
+    upstream = UpstreamMetrics(registry)
+    for route in range(20):
+        for status in ("200", "404", "500", "304"):
+            instrumented.duration.labels("GET", f"/route/{route}", status).observe(0.01)
+    for operation in ("info", "history", "download", "sentiment", "earnings"):
+        upstream.observe("yfinance", operation, 0.2, False)
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"/metrics render:   {(time.perf_counter() - start) * 1000:6.2f} ms for {text.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    main(parser.parse_args())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Load test: live quote fan-out to thousands of WebSocket subscribers
+
+Runs the API in one worker process with the synthetic market data provider
+on a fast clock (one trading day per --day-seconds), so every poll moves
+prices and each subscriber receives a stream of deltas. Client processes
+open --subscribers connections to /api/stocks/stream, each following
+--per-client symbols drawn from --symbols. A further --slow connections
+follow every symbol but never read, with a small receive buffer, so they
+must be evicted rather than hold up everyone else.
+
+Connections open over --ramp seconds; the --duration seconds after that
+are measured. Reports connect time, delivery latency (receipt minus the
+message's publish timestamp), messages and bytes received, server CPU
+time, slow consumers evicted, and upstream provider calls, which should depend on the number of symbols
+and polls only, not on the number of subscribers. Exits non-zero if any
+reader fails to connect, a reader is evicted, or p99 delivery latency
+exceeds --max-p99-ms.
+
+Usage: python benchmarks/quote_stream_load.py [--subscribers 5000] [--slow 20]
+                                              [--duration 30] [--client-processes 4]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PORT = 8013
+# Latency samples each client process sends back
+MAX_SAMPLES = 50_000
+
+
+def percentile(samples, pct):
+    return float(np.percentile(samples, pct)) if len(samples) else 0.0
+
+
+def raise_fd_limit(wanted: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+
+def serve(args):
+    """Server process: the real app with an accelerated synthetic market"""
+    state_dir = tempfile.mkdtemp(prefix="quote-stream-")
+    os.environ.update(
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "benchmark"),
+        MARKET_DATA_PROVIDER="synthetic",
+        QUOTE_REFRESHER_ENABLED="false",
+        STORAGE_BACKEND="memory",
+        SHARED_CACHE_ENABLED="false",
+        QUOTE_STREAM_INTERVAL=str(args.interval),
+        QUOTE_STREAM_SEND_TIMEOUT=str(args.send_timeout),
+        HISTORY_STORE_DIR=str(Path(state_dir) / "history"),
+        SENTIMENT_JOB_DIR=str(Path(state_dir) / "jobs"),
+    )
+    raise_fd_limit(args.subscribers + args.slow + 1024)
+
+    import pandas as pd
+    import uvicorn
+    import main
+    from market_data import IST, SyntheticProvider
+    from serving import websocket_options
+
+    # A Monday mid-session, advancing one day every day_seconds
+    start = pd.Timestamp("2025-07-07 10:00", tz=IST)
+    started = time.perf_counter()
+    speed = 86400 / args.day_seconds
+    main.market_data = SyntheticProvider(clock=lambda: start + pd.Timedelta(seconds=(time.perf_counter() - started) * speed))
+
+    uvicorn.run(main.app, host="127.0.0.1", port=PORT, log_level="warning", backlog=4096, **websocket_options())
+
+
+async def reader(uri: str, symbols, measure_from: float, stop_at: float, results: dict, latencies: list, connect_gate: asyncio.Semaphore):
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import ConnectionClosed
+
+    started = time.perf_counter()
+    try:
+        async with connect_gate:
+            ws = await connect(f"{uri}?symbols={','.join(symbols)}", open_timeout=60, ping_interval=None, max_size=None)
+    except Exception:
+        results["connectErrors"] += 1
+        return
+    results["connectTimes"].append(time.perf_counter() - started)
+    try:
+        while True:
+            remaining = stop_at - time.time()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(ws.recv(), remaining)
+            except asyncio.TimeoutError:
+                break
+            received = time.time()
+            if received < measure_from:
+                continue
+            update = json.loads(message)
+            if update["type"] != "quotes":
+                results["errors"] += 1
+                continue
+            results["messages"] += 1
+            results["bytes"] += len(message)
+            results["updates"] += len(update["quotes"])
+            latencies.append(received - update["ts"])
+    except ConnectionClosed as e:
+        code = str(e.rcvd.code) if e.rcvd else "1006"
+        results["closed"][code] = results["closed"].get(code, 0) + 1
+    finally:
+        await ws.close()
+
+
+async def slow_reader(uri: str, symbols, stop_at: float, results: dict, connect_gate: asyncio.Semaphore):
+    """Connects and subscribes, then never reads until the test ends"""
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import ConnectionClosed
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    try:
+        async with connect_gate:
+            await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", PORT))
+            ws = await connect(f"{uri}?symbols={','.join(symbols)}", sock=sock, open_timeout=60, ping_interval=None, max_queue=1, max_size=None)
+    except Exception:
+        results["slowConnectErrors"] += 1
+        return
+    await asyncio.sleep(max(stop_at - time.time(), 0))
+    # Drain what is buffered to see whether the server closed the connection
+    deadline = time.time() + 10
+    try:
+        while time.time() < deadline:
+            await asyncio.wait_for(ws.recv(), max(deadline - time.time(), 0.01))
+        results["slowClosed"]["open"] = results["slowClosed"].get("open", 0) + 1
+    except ConnectionClosed as e:
+        code = str(e.rcvd.code) if e.rcvd else "1006"
+        results["slowClosed"][code] = results["slowClosed"].get(code, 0) + 1
+    except asyncio.TimeoutError:
+        results["slowClosed"]["open"] = results["slowClosed"].get("open", 0) + 1
+    finally:
+        await ws.close()
+
+
+def run_clients(args, index: int, readers: int, slow: int, start_at: float, measure_from: float, stop_at: float, queue):
+    """Client process: readers and slow readers, reporting totals back through queue"""
+    raise_fd_limit(readers + slow + 1024)
+    rng = random.Random(args.seed + index)
+    universe = [f"SYM{i:03d}" for i in range(args.symbols)]
+    uri = f"ws://127.0.0.1:{PORT}/api/stocks/stream"
+    results = {
+        "connectErrors": 0, "slowConnectErrors": 0, "connectTimes": [], "messages": 0, "bytes": 0,
+        "updates": 0, "errors": 0, "closed": {}, "slowClosed": {},
+    }
+    latencies = []
+
+    async def main():
+        await asyncio.sleep(max(start_at - time.time(), 0))
+        gate = asyncio.Semaphore(args.connect_concurrency)
+        tasks = [
+            *(reader(uri, rng.sample(universe, args.per_client), measure_from, stop_at, results, latencies, gate) for _ in range(readers)),
+            *(slow_reader(uri, universe, stop_at, results, gate) for _ in range(slow)),
+        ]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    if len(latencies) > MAX_SAMPLES:
+        latencies = rng.sample(latencies, MAX_SAMPLES)
+    queue.put({**results, "latencies": latencies})
+
+
+def cpu_seconds(pid: int):
+    """User plus system CPU time of a process, where /proc is available"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def fetch_stats():
+    import httpx
+    return httpx.get(f"http://127.0.0.1:{PORT}/api/stats", timeout=30).json()
+
+
+def wait_for_server(timeout: float = 60):
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("Server did not start")
+
+
+def merge(parts):
+    total = {"connectTimes": [], "latencies": [], "closed": {}, "slowClosed": {}}
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, list):
+                total[key].extend(value)
+            elif isinstance(value, dict):
+                for code, count in value.items():
+                    total[key][code] = total[key].get(code, 0) + count
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000, help="Connections that read every message")
+    parser.add_argument("--slow", type=int, default=20, help="Connections that never read")
+    parser.add_argument("--symbols", type=int, default=100, help="Distinct symbols across all subscribers")
+    parser.add_argument("--per-client", type=int, default=5, help="Symbols each reader follows")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to stream once everyone has connected")
+    parser.add_argument("--interval", type=float, default=1.0, help="Server poll interval per symbol, seconds")
+    parser.add_argument("--day-seconds", type=float, default=1.0, help="Real seconds per simulated trading day")
+    parser.add_argument("--send-timeout", type=float, default=2.0, help="Server send timeout before eviction")
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="Handshakes in flight per client process")
+    parser.add_argument("--ramp", type=float, default=30, help="Seconds allowed for all connections to open")
+    parser.add_argument("--max-p99-ms", type=float, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    server = context.Process(target=serve, args=(args,), daemon=True)
+    server.start()
+    try:
+        wait_for_server()
+        before = fetch_stats()
+
+        start_at = time.time() + 1
+        measure_from = start_at + args.ramp
+        stop_at = measure_from + args.duration
+        queue = context.Queue()
+        processes = args.client_processes
+        clients = [
+            context.Process(target=run_clients, args=(
+                args, index,
+                args.subscribers // processes + (index < args.subscribers % processes),
+                args.slow // processes + (index < args.slow % processes),
+                start_at, measure_from, stop_at, queue
+            ))
+            for index in range(processes)
+        ]
+        for client in clients:
+            client.start()
+
+        time.sleep(max(measure_from - time.time(), 0))
+        cpu_before = cpu_seconds(server.pid)
+        # Peak server state, sampled while everyone is connected
+        time.sleep(max(measure_from + args.duration / 2 - time.time(), 0))
+        during = fetch_stats()
+        time.sleep(max(stop_at - time.time(), 0))
+        cpu_after = cpu_seconds(server.pid)
+        results = merge(queue.get() for _ in clients)
+        for client in clients:
+            client.join()
+        after = fetch_stats()
+    finally:
+        server.terminate()
+        server.join()
+
+    stream, peak = after["quoteStream"], during["quoteStream"]
+    calls_before = before["marketDataProvider"]["calls"]
+    upstream = {method: count - calls_before.get(method, 0) for method, count in after["marketDataProvider"]["calls"].items()}
+    latencies = np.array(results["latencies"]) * 1000
+    connect_times = np.array(results["connectTimes"]) * 1000
+    report = {
+        "subscribers": args.subscribers,
+        "slow": args.slow,
+        "symbols": args.symbols,
+        "connected": len(results["connectTimes"]),
+        "connectErrors": results["connectErrors"],
+        "connectMs": {"p50": percentile(connect_times, 50), "p99": percentile(connect_times, 99), "max": float(connect_times.max()) if len(connect_times) else 0.0},
+        "peakConnections": peak["connections"],
+        "peakSymbols": peak["symbols"],
+        "messages": results["messages"],
+        "messagesPerSecond": results["messages"] / args.duration,
+        "updates": results["updates"],
+        "bytes": results["bytes"],
+        "latencyMs": {pct: percentile(latencies, int(pct[1:])) for pct in ("p50", "p95", "p99")},
+        "serverCpuSeconds": cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None,
+        "readersClosed": results["closed"],
+        "slowClosed": results["slowClosed"],
+        "server": {key: stream[key] for key in ("polls", "pollFailures", "unchangedPolls", "messagesSent", "updatesMerged", "slowConsumersEvicted")},
+        "upstreamCalls": upstream,
+    }
+
+    print(f"Connected {report['connected']}/{args.subscribers} readers "
+          f"(connect p50 {report['connectMs']['p50']:.0f} ms, p99 {report['connectMs']['p99']:.0f} ms), "
+          f"peak {peak['connections']} connections on {peak['symbols']} symbols")
+    print(f"Received {report['messages']} messages ({report['messagesPerSecond']:.0f}/s, {report['bytes'] / 1e6:.1f} MB), "
+          f"{report['updates']} symbol updates in {args.duration:.0f}s")
+    if report["serverCpuSeconds"] is not None:
+        print(f"Server CPU {report['serverCpuSeconds']:.1f}s ({report['serverCpuSeconds'] / args.duration:.0%} of one core)")
+    print(f"Delivery latency p50 {report['latencyMs']['p50']:.1f} ms, p95 {report['latencyMs']['p95']:.1f} ms, "
+          f"p99 {report['latencyMs']['p99']:.1f} ms")
+    print(f"Server: {stream['polls']} polls, {stream['messagesSent']} messages, {stream['updatesMerged']} updates merged, "
+          f"{stream['slowConsumersEvicted']} slow consumers evicted (slow clients saw {results['slowClosed']})")
+    print(f"Upstream calls: {upstream}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    failures = []
+    if report["connected"] < args.subscribers:
+        failures.append(f"{args.subscribers - report['connected']} readers failed to connect")
+    if results["closed"].get("1013"):
+        failures.append(f"{results['closed']['1013']} readers evicted")
+    if report["latencyMs"]["p99"] > args.max_p99_ms:
+        failures.append(f"p99 latency {report['latencyMs']['p99']:.0f} ms over {args.max_p99_ms:.0f} ms")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
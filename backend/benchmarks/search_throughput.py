@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: symbol search
+
+Builds the search index over the bundled NSE list padded with synthetic
+instruments to 2,000 and 20,000 entries, then replays keystroke-by-keystroke
+queries (every prefix of a symbol or company name, a fifth of them with a
+typo) and reports build time, queries per second and p50/p99 latency.
+
+Usage: python benchmarks/search_throughput.py [--sizes 2000 20000] [--queries 20000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from symbol_search import SymbolIndex, DEFAULT_EQUITY_LIST
+
+CONSONANTS = "bcdghjklmnprstvy"
+VOWELS = "aeiou"
+SUFFIXES = ["Industries", "Finance", "Pharma", "Technologies", "Steels", "Textiles", "Power", "Chemicals", "Foods", "Motors"]
+
+
+def universe(size: int, rng: random.Random):
+    base = SymbolIndex.load(DEFAULT_EQUITY_LIST)
+    instruments = list(zip(base.symbols, base.names))
+    symbols = set(base.symbols)
+    while len(instruments) < size:
+        word = "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+        name = f"{word.title()} {rng.choice(SUFFIXES)} Limited"
+        symbol = (word + name.split()[1])[:rng.randint(5, 10)].upper()
+        if symbol not in symbols:
+            symbols.add(symbol)
+            instruments.append((symbol, name))
+    return instruments[:size]
+
+
+def typo(text: str, rng: random.Random) -> str:
+    if len(text) < 3:
+        return text
+    i = rng.randrange(len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def keystroke_queries(instruments, count: int, rng: random.Random):
+    queries = []
+    while len(queries) < count:
+        symbol, name = rng.choice(instruments)
+        text = rng.choice([symbol, name.replace(" Limited", "")]).lower()
+        if rng.random() < 0.2:
+            text = typo(text, rng)
+        queries.extend(text[:end] for end in range(1, len(text) + 1))
+    return queries[:count]
+
+
+def main(args):
+    rng = random.Random(11)
+    for size in args.sizes:
+        instruments = universe(size, rng)
+        start = time.perf_counter()
+        index = SymbolIndex(instruments)
+        build = time.perf_counter() - start
+        queries = keystroke_queries(instruments, args.queries, rng)
+
+        latencies = []
+        start = time.perf_counter()
+        for query in queries:
+            t = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(
+            f"{size:>6} instruments: build {build * 1000:6.0f} ms, {len(queries) / elapsed:8.0f} queries/s, "
+            f"p50 {latencies[len(latencies) // 2] * 1e6:6.1f} us, p99 {latencies[int(len(latencies) * 0.99)] * 1e6:6.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 20_000])
+    parser.add_argument("--queries", type=int, default=20_000)
+    main(parser.parse_args())
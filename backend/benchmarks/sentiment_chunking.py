@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass vs chunked sentiment analysis on long transcripts
+
+Runs the backend's analysis against the local fake OpenAI server, whose
+latency grows with prompt length, and compares wall-clock time.
+
+Usage: python benchmarks/sentiment_chunking.py [--words 10000 20000 30000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+PORT = 8011
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fake_openai
+import main
+
+SPEAKERS = ["CEO", "CFO", "Analyst - Kotak", "Analyst - Jefferies", "Operator"]
+SENTENCE = "Revenue grew in line with guidance while margins were pressured by input costs."
+
+
+def make_transcript(words: int, seed: int) -> str:
+    turns = []
+    count = 0
+    i = 0
+    while count < words:
+        sentences = " ".join([SENTENCE] * (5 + (i * 7 + seed) % 20))
+        turns.append(f"{SPEAKERS[i % len(SPEAKERS)]}: {sentences}")
+        count += len(sentences.split())
+        i += 1
+    return "\n".join(turns)
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+async def run(args):
+    print(f"{'words':>7} {'single s':>9} {'chunked s':>10} {'chunks':>7}")
+    for seed, words in enumerate(args.words):
+        transcript = make_transcript(words, seed)
+        single, _ = await timed(main.analyze_sentiment_with_openai(transcript, "BENCH", chunked=False))
+        chunked, _ = await timed(main.analyze_sentiment_with_openai(transcript, "BENCH", chunked=True))
+        chunks = len(main.split_transcript(transcript, main.SENTIMENT_CHUNK_WORDS))
+        print(f"{words:>7} {single:>9.2f} {chunked:>10.2f} {chunks:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[10_000, 20_000, 30_000])
+    args = parser.parse_args()
+    fake_openai.serve_in_thread(PORT)
+    asyncio.run(run(args))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: storage backends
+
+Measures write throughput and read latency of MemoryStorage and
+SQLiteStorage. SQLite writes are timed including the final flush to disk.
+Reads are measured warm (served by the read-through memory layer) and cold
+(a freshly opened SQLiteStorage over the same file, so every first read
+goes to the database).
+
+Usage: python benchmarks/storage_backends.py [--quotes 20000] [--transcripts 5000] [--reads 20000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import StockData, EarningsCallTranscript
+from storage import MemoryStorage
+from sqlite_storage import SQLiteStorage
+
+TRANSCRIPT_TEXT = "Revenue grew steadily this quarter on strong domestic demand. " * 200
+
+
+def quote(i: int) -> StockData:
+    return StockData(
+        symbol=f"SYM{i}", name=f"Company {i} Limited", price=100.0 + i, openPrice=99.0, highPrice=101.0,
+        lowPrice=98.0, volume="1.2Cr", change=1.0, changePercent=1.0, marketCap="₹1.0T", peRatio=20.0
+    )
+
+
+def transcript(i: int, symbols: int) -> EarningsCallTranscript:
+    return EarningsCallTranscript(
+        stockSymbol=f"SYM{i % symbols}", quarter=str(i // symbols % 4 + 1), year=str(2020 + i // (4 * symbols)),
+        transcript=TRANSCRIPT_TEXT, speakers=[{"name": "CEO", "role": "Chief Executive Officer"}]
+    )
+
+
+def write(storage, args) -> float:
+    start = time.perf_counter()
+    for i in range(args.quotes):
+        storage.store_stock_data(quote(i))
+    for i in range(args.transcripts):
+        storage.store_earnings_transcript(transcript(i, args.symbols))
+    if isinstance(storage, SQLiteStorage):
+        storage.flush()
+    return (args.quotes + args.transcripts) / (time.perf_counter() - start)
+
+
+def read_latencies(read, keys) -> list:
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        read(key)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def report(label: str, latencies: list):
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"  {label:<34} p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+
+
+def main(args):
+    rng = random.Random(7)
+    quote_keys = [f"SYM{rng.randrange(args.quotes)}" for _ in range(args.reads)]
+    transcript_keys = [f"SYM{rng.randrange(args.symbols)}" for _ in range(args.reads)]
+    # Caches sized to hold everything, so warm reads never fall through
+    cache = dict(max_stocks=args.quotes, max_transcripts=args.transcripts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        memory = MemoryStorage(**cache)
+        sqlite = SQLiteStorage(path, memory=MemoryStorage(**cache))
+
+        print(f"Writes: {args.quotes} quotes + {args.transcripts} transcripts")
+        print(f"  memory  {write(memory, args):10.0f} records/s")
+        print(f"  sqlite  {write(sqlite, args):10.0f} records/s (including flush)")
+
+        print(f"Reads: {args.reads} random lookups")
+        report("memory get_stock_data", read_latencies(memory.get_stock_data, quote_keys))
+        report("sqlite get_stock_data (warm)", read_latencies(sqlite.get_stock_data, quote_keys))
+        sqlite.close()
+
+        cold = SQLiteStorage(path, memory=MemoryStorage(**cache))
+        report("sqlite get_stock_data (cold)", read_latencies(cold.get_stock_data, quote_keys))
+        report("memory latest transcript", read_latencies(memory.get_latest_earnings_transcript, transcript_keys))
+        report("sqlite latest transcript", read_latencies(cold.get_latest_earnings_transcript, transcript_keys))
+        cold.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=20_000)
+    parser.add_argument("--transcripts", type=int, default=5_000)
+    parser.add_argument("--symbols", type=int, default=1_000)
+    parser.add_argument("--reads", type=int, default=20_000)
+    main(parser.parse_args())
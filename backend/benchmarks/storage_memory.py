@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MemoryStorage footprint
+
+Fills the original unbounded dict-of-pydantic storage and the bounded,
+compact MemoryStorage with the same records (10k symbols, 50k transcripts
+by default) and reports the memory each holds, measured with tracemalloc.
+
+Usage: python benchmarks/storage_memory.py [--symbols 10000] [--transcripts 50000] [--words 400]
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import StockData, SentimentAnalysis, EarningsCallTranscript
+from storage import MemoryStorage
+
+VOCABULARY = (
+    "revenue growth margin quarter guidance demand pricing capex ebitda segment india exports retail "
+    "digital customers volume outlook headwinds tailwinds inflation costs rural urban deposits credit "
+    "the and of in to we our for with on this that is are as by from at year strong weak"
+).split()
+
+
+class LegacyMemoryStorage:
+    """The original storage: unbounded dicts and lists of pydantic objects"""
+
+    def __init__(self):
+        self.stock_data: Dict[str, StockData] = {}
+        self.sentiment_analyses: Dict[str, SentimentAnalysis] = {}
+        self.earnings_transcripts: Dict[str, List[EarningsCallTranscript]] = {}
+
+    def store_stock_data(self, stock_data):
+        stock_data.createdAt = datetime.now().isoformat()
+        self.stock_data[stock_data.symbol] = stock_data
+
+    def store_sentiment_analysis(self, sentiment):
+        sentiment.createdAt = datetime.now().isoformat()
+        self.sentiment_analyses[sentiment.stockSymbol] = sentiment
+
+    def store_earnings_transcript(self, transcript):
+        transcript.createdAt = datetime.now().isoformat()
+        self.earnings_transcripts.setdefault(transcript.stockSymbol, []).append(transcript)
+
+
+def fill(storage, symbols: int, transcripts: int, words: int):
+    rng = random.Random(42)
+    for i in range(symbols):
+        storage.store_stock_data(StockData(
+            id=i, symbol=f"SYM{i}", name=f"Company {i} Limited", price=100.0 + i, openPrice=99.0,
+            highPrice=101.0, lowPrice=98.0, volume="1.2Cr", change=1.0, changePercent=1.0,
+            marketCap="₹1.0T", peRatio=20.0
+        ))
+    for i in range(transcripts):
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+        symbol = f"SYM{i % symbols}"
+        storage.store_earnings_transcript(EarningsCallTranscript(
+            id=i, stockSymbol=symbol, quarter=str(i % 4 + 1), year=str(2000 + i // (4 * symbols)),
+            transcript=text, speakers=[{"name": "CEO", "role": "Chief Executive Officer"}]
+        ))
+        if i < symbols:
+            storage.store_sentiment_analysis(SentimentAnalysis(
+                id=i, stockSymbol=symbol, transcriptText=text, sentimentScore=7.0, positiveCount=3,
+                neutralCount=2, negativeCount=1, confidence=0.8, summary="Solid quarter.",
+                keyHighlights=["Revenue up"], riskFactors=["Input costs"]
+            ))
+
+
+def measure(factory, args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    storage = factory()
+    fill(storage, args.symbols, args.transcripts, args.words)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del storage
+    return current
+
+
+def main(args):
+    print(f"{args.symbols} symbols, {args.transcripts} transcripts of {args.words} words")
+    legacy = measure(LegacyMemoryStorage, args)
+    compact = measure(lambda: MemoryStorage(max_stocks=args.symbols, max_sentiments=args.symbols, max_transcripts=args.transcripts), args)
+    print(f"legacy storage:  {legacy / 2**20:9.1f} MiB")
+    print(f"compact storage: {compact / 2**20:9.1f} MiB ({legacy / compact:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=10_000)
+    parser.add_argument("--transcripts", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=400)
+    main(parser.parse_args())
@@ -0,0 +1,134 @@
+"""
+Map-reduce sentiment analysis for long transcripts
+
+A transcript is split at speaker turns and section headings into chunks of
+bounded size, each chunk is scored concurrently, and the chunk results are
+merged back into a single analysis. Wall-clock time then tracks the slowest
+chunk rather than the transcript length.
+"""
+
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, List
+
+# "CEO:", "Rajesh Kumar - CFO:", "Q&A Session", "Operator:" and similar
+TURN_START = re.compile(r"^\s*(?:#+\s|[A-Z][^:\n]{0,60}:(?:\s|$)|[A-Z][A-Z &\-]{3,}\s*$)")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+MAX_HIGHLIGHTS = 10
+
+# Neutral analysis for a transcript with nothing to score; 5.5 is the middle of the 1-10 scale
+NO_TEXT_RESULT = {
+    "sentimentScore": 5.5,
+    "positiveCount": 0,
+    "neutralCount": 0,
+    "negativeCount": 0,
+    "confidence": 0.0,
+    "summary": "The transcript contains no text to analyze.",
+    "keyHighlights": [],
+    "riskFactors": [],
+}
+
+
+def split_turns(transcript: str) -> List[str]:
+    """Split a transcript into speaker turns / sections"""
+    turns: List[str] = []
+    current: List[str] = []
+    for line in transcript.splitlines():
+        if TURN_START.match(line) and current:
+            turns.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        turns.append("\n".join(current).strip())
+    return [turn for turn in turns if turn]
+
+
+def split_long_turn(turn: str, max_words: int) -> List[str]:
+    """Break a single oversized turn at sentence boundaries, or word boundaries for run-on sentences"""
+    pieces: List[str] = []
+    current: List[str] = []
+    count = 0
+    sentences = []
+    for sentence in SENTENCE_END.split(turn):
+        words = sentence.split()
+        if len(words) > max_words:
+            sentences.extend(" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words))
+        else:
+            sentences.append(sentence)
+    for sentence in sentences:
+        words = len(sentence.split())
+        if current and count + words > max_words:
+            pieces.append(" ".join(current))
+            current, count = [], 0
+        current.append(sentence)
+        count += words
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_transcript(transcript: str, max_words: int) -> List[str]:
+    """Group speaker turns into chunks of at most max_words words where possible"""
+    chunks: List[str] = []
+    current: List[str] = []
+    count = 0
+    for turn in split_turns(transcript):
+        for piece in (split_long_turn(turn, max_words) if len(turn.split()) > max_words else [turn]):
+            words = len(piece.split())
+            if current and count + words > max_words:
+                chunks.append("\n\n".join(current))
+                current, count = [], 0
+            current.append(piece)
+            count += words
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def dedupe(items: List[str], limit: int) -> List[str]:
+    seen = set()
+    result = []
+    for item in items:
+        key = item.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            result.append(item.strip())
+    return result[:limit]
+
+
+def merge_chunk_results(results: List[Dict[str, Any]], chunk_words: List[int]) -> Dict[str, Any]:
+    """Combine per-chunk analyses: counts are summed, score and confidence are weighted"""
+    if not results:
+        # An empty or whitespace-only transcript splits into no chunks
+        return dict(NO_TEXT_RESULT)
+    # Each chunk's score counts in proportion to its length and the model's confidence in it
+    score_weights = [words * max(float(r["confidence"]), 0.01) for r, words in zip(results, chunk_words)]
+    total_score_weight = sum(score_weights)
+    total_words = sum(chunk_words)
+    return {
+        "sentimentScore": sum(float(r["sentimentScore"]) * w for r, w in zip(results, score_weights)) / total_score_weight,
+        "positiveCount": sum(int(r["positiveCount"]) for r in results),
+        "neutralCount": sum(int(r["neutralCount"]) for r in results),
+        "negativeCount": sum(int(r["negativeCount"]) for r in results),
+        "confidence": sum(float(r["confidence"]) * words for r, words in zip(results, chunk_words)) / total_words,
+        "summary": " ".join(r["summary"].strip() for r in results if r.get("summary")),
+        "keyHighlights": dedupe([h for r in results for h in r.get("keyHighlights", [])], MAX_HIGHLIGHTS),
+        "riskFactors": dedupe([f for r in results for f in r.get("riskFactors", [])], MAX_HIGHLIGHTS),
+    }
+
+
+async def analyze_in_chunks(
+    chunks: List[str],
+    score_chunk: Callable[[str, int, int], Awaitable[Dict[str, Any]]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Score chunks concurrently (at most `concurrency` at once) and merge the results"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score(index: int, chunk: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await score_chunk(chunk, index + 1, len(chunks))
+
+    results = await asyncio.gather(*(score(i, chunk) for i, chunk in enumerate(chunks)))
+    return merge_chunk_results(list(results), [max(len(chunk.split()), 1) for chunk in chunks])
@@ -0,0 +1,54 @@
+"""
+Fast JSON responses
+
+Routes declare response_model for the OpenAPI schema, but when a route
+returns a model or a list of them, FastAPI validates it again against that
+model and encodes it with jsonable_encoder and json.dumps, even though our
+own code built it moments before. Returning a Response skips both, leaving
+the schema untouched. These helpers encode with orjson instead, and
+JSONBytesResponse sends bytes that are already encoded, such as the ones
+MemoryStorage keeps next to each cached quote.
+"""
+
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """content as JSON; models are dumped the way FastAPI would return them"""
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    return orjson.dumps(content, default=_default)
+
+
+def join_array(items: Iterable[bytes]) -> bytes:
+    """A JSON array of already encoded items"""
+    return b"[" + b",".join(items) + b"]"
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose content is either encoded bytes or anything dumps accepts"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def respond(response: Response, content: Any) -> JSONBytesResponse:
+    """content as a response carrying the headers a route set on its injected Response
+
+    FastAPI only applies those to content it serializes itself.
+    """
+    return JSONBytesResponse(content, status_code=response.status_code or 200, headers=response.headers)
@@ -0,0 +1,192 @@
+"""
+Fundamentals: key ratios with lazily fetched financial statements
+
+Most ratios come straight from the provider's info. Interest coverage and
+asset turnover are derived from the income statement and balance sheet,
+which are separate and comparatively slow upstream requests, so a
+statement is fetched only when a requested field needs it. Each part
+(info or one statement) is cached per symbol for a long time, since
+fundamentals only move when a company reports.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Response field -> provider info key
+INFO_FIELDS = {
+    "marketCap": "marketCap",
+    "peRatio": "trailingPE",
+    "pegRatio": "pegRatio",
+    "bookValue": "bookValue",
+    "dividendYield": "dividendYield",
+    "roe": "returnOnEquity",
+    "debtToEquity": "debtToEquity",
+    "currentRatio": "currentRatio",
+    "revenueGrowth": "revenueGrowth",
+    "profitMargin": "profitMargins",
+    "operatingMargin": "operatingMargins",
+    "eps": "trailingEps",
+    "priceToBook": "priceToBook",
+    "priceToSales": "priceToSalesTrailing12Months",
+    "quickRatio": "quickRatio",
+    "returnOnAssets": "returnOnAssets",
+}
+
+# Derived field -> statements it is computed from
+DERIVED_FIELDS = {
+    "interestCoverage": ("financials",),
+    "assetTurnover": ("financials", "balance_sheet"),
+}
+
+FIELDS = (*INFO_FIELDS, *DERIVED_FIELDS)
+
+
+def parse_fields(fields: Optional[Iterable[str]]) -> List[str]:
+    """Requested fields in response order; all of them when none are given
+
+    Raises ValueError naming any unknown field.
+    """
+    if fields is None:
+        return list(FIELDS)
+    requested = {field.strip() for field in fields if field.strip()}
+    unknown = sorted(requested - set(FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(FIELDS)}")
+    return [field for field in FIELDS if field in requested]
+
+
+def required_parts(fields: Iterable[str]) -> List[str]:
+    """Upstream parts ("info" or a statement name) needed for fields"""
+    parts: List[str] = []
+    for field in fields:
+        for part in DERIVED_FIELDS.get(field, ("info",)):
+            if part not in parts:
+                parts.append(part)
+    return parts
+
+
+def fetch_part(provider, symbol: str, part: str) -> Any:
+    """Blocking fetch of one part from a MarketDataProvider"""
+    if part == "info":
+        return provider.info(symbol)
+    return provider.statement(symbol, part)
+
+
+def line_item(statement: pd.DataFrame, *names: str) -> Optional[pd.Series]:
+    """First of names present in the statement, newest fiscal year first"""
+    for name in names:
+        if name in statement.index:
+            values = statement.loc[name]
+            values = values.sort_index(ascending=False) if isinstance(values.index, pd.DatetimeIndex) else values
+            values = pd.to_numeric(values, errors="coerce").dropna()
+            if not values.empty:
+                return values
+    return None
+
+
+def interest_coverage(financials: pd.DataFrame) -> Optional[float]:
+    """Latest EBIT over interest expense"""
+    ebit = line_item(financials, "EBIT", "Operating Income")
+    interest = line_item(financials, "Interest Expense", "Interest Expense Non Operating")
+    if ebit is None or interest is None or interest.iloc[0] == 0:
+        return None
+    return float(ebit.iloc[0] / abs(interest.iloc[0]))
+
+
+def asset_turnover(financials: pd.DataFrame, balance_sheet: pd.DataFrame) -> Optional[float]:
+    """Latest revenue over total assets averaged across the year"""
+    revenue = line_item(financials, "Total Revenue", "Operating Revenue")
+    assets = line_item(balance_sheet, "Total Assets")
+    if revenue is None or assets is None:
+        return None
+    average_assets = assets.iloc[:2].mean()
+    if average_assets == 0:
+        return None
+    return float(revenue.iloc[0] / average_assets)
+
+
+def build_fundamentals(symbol: str, fields: Iterable[str], parts: Dict[str, Any]) -> Dict[str, Any]:
+    """Response body for the requested fields from the fetched parts
+
+    Missing values are reported as 0, as the Flask service always has.
+    """
+    info = parts.get("info") or {}
+    result: Dict[str, Any] = {"stockSymbol": symbol.upper()}
+    for field in fields:
+        if field == "interestCoverage":
+            value = interest_coverage(parts["financials"])
+        elif field == "assetTurnover":
+            value = asset_turnover(parts["financials"], parts["balance_sheet"])
+        else:
+            value = info.get(INFO_FIELDS[field])
+        result[field] = round(value, 4) if isinstance(value, float) else (value or 0)
+    return result
+
+
+def load_fundamentals(provider, cache: "FundamentalsCache", symbol: str, yf_symbol: str, fields: List[str]) -> Dict[str, Any]:
+    """Blocking fetch through the cache, for callers without an event loop"""
+    parts = {}
+    for part in required_parts(fields):
+        value = cache.get(yf_symbol, part)
+        if value is None:
+            value = fetch_part(provider, yf_symbol, part)
+            cache.put(yf_symbol, part, value)
+        parts[part] = value
+    return build_fundamentals(symbol, fields, parts)
+
+
+class FundamentalsCache:
+    """LRU of fetched parts per symbol, with separate TTLs for info and statements"""
+
+    def __init__(self, max_entries: int, info_ttl: float, statement_ttl: float):
+        self.max_entries = max_entries
+        self.info_ttl = info_ttl
+        self.statement_ttl = statement_ttl
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+
+    def ttl(self, part: str) -> float:
+        return self.info_ttl if part == "info" else self.statement_ttl
+
+    def get(self, symbol: str, part: str) -> Optional[Any]:
+        key = (symbol, part)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl(part):
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses[part] = self.misses.get(part, 0) + 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits[part] = self.hits.get(part, 0) + 1
+            return entry[1]
+
+    def put(self, symbol: str, part: str, value: Any):
+        key = (symbol, part)
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hits = sum(self.hits.values())
+            lookups = hits + sum(self.misses.values())
+            return {
+                "entries": len(self.entries),
+                "maxEntries": self.max_entries,
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "hitRate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,208 @@
+"""
+On-disk OHLCV history store
+
+Bars are kept per (symbol, interval) as a structured NumPy array on disk and
+read back memory-mapped. A request for a window only asks the provider for
+the date ranges the store doesn't already cover (the tail since the last
+stored bar, or a backfill before the first), then appends them.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+# Calendar lookback used to find the start of each yfinance period
+PERIOD_LOOKBACK = {
+    "1d": timedelta(days=7),
+    "5d": timedelta(days=14),
+    "1mo": timedelta(days=31),
+    "3mo": timedelta(days=92),
+    "6mo": timedelta(days=183),
+    "1y": timedelta(days=366),
+    "2y": timedelta(days=731),
+    "5y": timedelta(days=1827),
+}
+
+# Periods counted in trading sessions rather than calendar time
+SESSION_PERIODS = {"1d": 1, "5d": 5}
+
+# How long a fetched tail is considered current before asking the provider again
+INTRADAY_REFRESH = timedelta(minutes=1)
+DAILY_REFRESH = timedelta(minutes=5)
+
+# fetch_fn(interval, start, end) -> DataFrame with Open/High/Low/Close/Volume
+FetchFn = Callable[[str, datetime, Optional[datetime]], pd.DataFrame]
+
+
+def frame_to_bars(hist: pd.DataFrame) -> np.ndarray:
+    """Convert a yfinance history frame into the on-disk bar layout"""
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    bars["ts"] = index.tz_convert("UTC").as_unit("ns").asi8
+    bars["open"] = hist["Open"].to_numpy(dtype="f8")
+    bars["high"] = hist["High"].to_numpy(dtype="f8")
+    bars["low"] = hist["Low"].to_numpy(dtype="f8")
+    bars["close"] = hist["Close"].to_numpy(dtype="f8")
+    bars["volume"] = hist["Volume"].to_numpy(dtype="f8")
+    return bars
+
+
+def bars_to_frame(bars: np.ndarray, tz: str) -> pd.DataFrame:
+    """Wrap stored bars in a yfinance-shaped frame without copying the columns"""
+    index = pd.DatetimeIndex(pd.to_datetime(bars["ts"], utc=True)).tz_convert(tz)
+    return pd.DataFrame({
+        "Open": bars["open"],
+        "High": bars["high"],
+        "Low": bars["low"],
+        "Close": bars["close"],
+        "Volume": bars["volume"],
+    }, index=index, copy=False)
+
+
+class HistoryStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self.key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.arrays: Dict[Tuple[str, str], Tuple[int, np.ndarray]] = {}
+        self.provider_fetches = 0
+        self.provider_rows = 0
+        self.local_reads = 0
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _paths(self, symbol: str, interval: str) -> Tuple[Path, Path]:
+        directory = self.root / symbol.upper()
+        return directory / f"{interval}.npy", directory / f"{interval}.json"
+
+    def _load(self, symbol: str, interval: str) -> Tuple[np.ndarray, Dict]:
+        """Memory-map the stored bars, reusing the mapping while the file is unchanged"""
+        data_path, meta_path = self._paths(symbol, interval)
+        if not data_path.exists() or not meta_path.exists():
+            return np.empty(0, dtype=BAR_DTYPE), {}
+        key = (symbol.upper(), interval)
+        mtime = data_path.stat().st_mtime_ns
+        cached = self.arrays.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, np.load(data_path, mmap_mode="r"))
+            self.arrays[key] = cached
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return cached[1], meta
+
+    def _save(self, symbol: str, interval: str, bars: np.ndarray, meta: Dict):
+        data_path, meta_path = self._paths(symbol, interval)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to temp files and rename so readers never see a partial file
+        tmp_data = data_path.with_suffix(".npy.tmp")
+        with open(tmp_data, "wb") as f:
+            np.save(f, np.ascontiguousarray(bars))
+        os.replace(tmp_data, data_path)
+        tmp_meta = meta_path.with_suffix(".json.tmp")
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        self.arrays.pop((symbol.upper(), interval), None)
+
+    def _merge(self, stored: np.ndarray, fetched: np.ndarray) -> np.ndarray:
+        """Combine stored and fetched bars; fetched bars win on equal timestamps"""
+        merged = np.concatenate([np.asarray(stored), fetched])
+        merged = merged[np.argsort(merged["ts"], kind="stable")]
+        if len(merged) < 2:
+            return merged
+        # Stable sort keeps fetched after stored, so keep the last of each timestamp
+        keep = np.append(merged["ts"][1:] != merged["ts"][:-1], True)
+        return merged[keep]
+
+    def get_window(self, symbol: str, interval: str, period: str, fetch_fn: FetchFn) -> pd.DataFrame:
+        """Return bars for a yfinance-style period, fetching only what's missing"""
+        key = (symbol.upper(), interval)
+        intraday = interval.endswith("m") or interval.endswith("h")
+        refresh_after = INTRADAY_REFRESH if intraday else DAILY_REFRESH
+        now = datetime.now(timezone.utc)
+        window_start = now - PERIOD_LOOKBACK.get(period, timedelta(days=7))
+
+        with self._key_lock(key):
+            bars, meta = self._load(symbol, interval)
+            fetched = []
+
+            covered_from = meta.get("coveredFrom")
+            if len(bars) == 0 or covered_from is None:
+                fetched.append(fetch_fn(interval, window_start, None))
+                meta["coveredFrom"] = window_start.timestamp()
+            else:
+                # Backfill anything requested before what we hold
+                if covered_from - window_start.timestamp() >= 86400:
+                    fetched.append(fetch_fn(interval, window_start, datetime.fromtimestamp(covered_from, timezone.utc)))
+                    meta["coveredFrom"] = window_start.timestamp()
+                # Refresh the tail from the last stored bar, which may still be forming
+                fetched_at = meta.get("fetchedAt", 0)
+                if now.timestamp() - fetched_at >= refresh_after.total_seconds():
+                    last_bar = pd.Timestamp(int(bars["ts"][-1]), tz="UTC").normalize().to_pydatetime()
+                    fetched.append(fetch_fn(interval, last_bar, None))
+
+            if fetched:
+                self.provider_fetches += len(fetched)
+                frames = [frame for frame in fetched if frame is not None and not frame.empty]
+                for frame in frames:
+                    index_tz = pd.DatetimeIndex(frame.index).tz
+                    if index_tz is not None:
+                        meta["tz"] = str(index_tz)
+                new_bars = np.concatenate([frame_to_bars(frame) for frame in frames]) if frames else np.empty(0, dtype=BAR_DTYPE)
+                self.provider_rows += len(new_bars)
+                meta["fetchedAt"] = now.timestamp()
+                bars = self._merge(bars, new_bars)
+                self._save(symbol, interval, bars, meta)
+                bars, meta = self._load(symbol, interval)
+            else:
+                self.local_reads += 1
+
+        frame = self.slice(bars, meta.get("tz", "UTC"), period, window_start)
+        # For HTTP caching: when the tail was last fetched and when it will be again
+        fetched_at = meta.get("fetchedAt", now.timestamp())
+        frame.attrs["fetchedAt"] = fetched_at
+        frame.attrs["refreshAt"] = fetched_at + refresh_after.total_seconds()
+        return frame
+
+    def slice(self, bars: np.ndarray, tz: str, period: str, window_start: datetime) -> pd.DataFrame:
+        """Cut the requested period out of the stored bars"""
+        if len(bars) == 0:
+            return bars_to_frame(bars, tz)
+        start = np.searchsorted(bars["ts"], int(window_start.timestamp() * 1e9), side="left")
+        window = bars[start:]
+        sessions = SESSION_PERIODS.get(period)
+        if sessions and len(window):
+            # Keep the last N trading sessions, matching yfinance's "Nd" periods
+            local_days = pd.to_datetime(window["ts"], utc=True).tz_convert(tz).normalize().asi8
+            unique_days = np.unique(local_days)
+            first_day = unique_days[-sessions] if len(unique_days) >= sessions else unique_days[0]
+            window = window[np.searchsorted(local_days, first_day, side="left"):]
+        return bars_to_frame(window, tz)
+
+    def stats(self):
+        return {
+            "providerFetches": self.provider_fetches,
+            "providerRows": self.provider_rows,
+            "localReads": self.local_reads,
+            "mappedSeries": len(self.arrays),
+        }
+
@@ -0,0 +1,202 @@
+"""
+HTTP conditional caching and compression
+
+Market data responses carry an ETag, a Last-Modified time and a
+Cache-Control max-age matching what is left of the server's own TTL, so
+browsers and any CDN in front of the API can reuse them. A client that
+sends back a matching If-None-Match (or, without one, an If-Modified-Since
+no older than the data) gets an empty 304 instead of the body. Validators
+are computed from the stored data rather than the body, so routes can
+answer a 304 before serializing anything.
+
+ETags are weak: they identify the data rather than the bytes, so the same
+tag stays valid whether or not the body was gzipped on the way out.
+"""
+
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the values identifying a representation"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of If-None-Match against etag"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def http_date(moment: datetime) -> str:
+    # Naive datetimes are local time, as createdAt is stored
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the client's copy is current; If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have whole-second resolution
+    return int(last_modified.astimezone(timezone.utc).timestamp()) <= since.timestamp()
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], max_age: float, stale_while_revalidate: float = 0) -> Dict[str, str]:
+    cache_control = f"public, max-age={max(int(max_age), 0)}"
+    if stale_while_revalidate > 0:
+        cache_control += f", stale-while-revalidate={int(stale_while_revalidate)}"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime],
+    max_age: float,
+    stale_while_revalidate: float = 0,
+) -> Optional[Response]:
+    """Set the cache headers on response; return a 304 to send instead if the client is current"""
+    headers = cache_headers(etag, last_modified, max_age, stale_while_revalidate)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+class ResponseCache:
+    """LRU of prepared responses, each kept until its own expiry time"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self.entries), "maxEntries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def accepts_gzip(headers) -> bool:
+    for name, value in headers:
+        if name == b"accept-encoding":
+            for coding in value.decode("latin-1").lower().split(","):
+                token, _, params = coding.partition(";")
+                if token.strip() in ("gzip", "*"):
+                    return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class CompressionMiddleware:
+    """gzip for complete JSON and text bodies of at least minimum_size bytes
+
+    Only responses that declare a Content-Length and send their body in one
+    message are compressed; streaming responses (Server-Sent Events, files)
+    pass through untouched, so events are never held back in a buffer.
+    Written against raw ASGI, like MetricsMiddleware; small responses cost
+    one header scan.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 1):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    def _eligible(self, headers) -> bool:
+        length = content_type = None
+        for name, value in headers:
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"content-type":
+                content_type = value
+            elif name == b"content-encoding":
+                return False
+        return (
+            length is not None and length >= self.minimum_size
+            and content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepts_gzip(scope["headers"])
+        held = None
+
+        async def send_compressed(message):
+            nonlocal held
+            if message["type"] == "http.response.start":
+                if not self._eligible(message.get("headers", ())):
+                    await send(message)
+                    return
+                headers = [*message["headers"], (b"vary", b"Accept-Encoding")]
+                if not accepted:
+                    await send({**message, "headers": headers})
+                    return
+                # Wait for the body to decide
+                held = {**message, "headers": headers}
+                return
+            if held is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            start, held = held, None
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+            compressed = gzip.compress(body, self.level)
+            headers = [(name, value) for name, value in start["headers"] if name != b"content-length"]
+            headers += [(b"content-length", str(len(compressed)).encode()), (b"content-encoding", b"gzip")]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
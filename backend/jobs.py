@@ -0,0 +1,365 @@
+"""
+Bulk sentiment job queue
+
+Many (symbol, transcript) items are submitted as one job and worked through
+by a fixed pool of asyncio workers with retries. The transcripts are written
+to disk once, at submit; after that each item's result is appended to a small
+per-job log, so a restarted server resumes unfinished jobs and skips the items
+that already completed. Finished jobs are kept for finished_ttl seconds and at
+most keep_finished of them, on disk and in memory.
+
+Files in state_dir, per job:
+    <id>.transcripts.json  the transcripts, in item order
+    <id>.log               a header line (symbols, options, createdAt), then
+                           one JSON line per item update
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED = (COMPLETED, FAILED)
+
+# Item fields written to the log whenever an item settles
+ITEM_STATE = ("status", "attempts", "error", "sentimentId", "sentimentScore")
+
+# analyze_fn(transcript, symbol, **options) -> stored analysis with an id
+AnalyzeFn = Callable[..., Awaitable[Any]]
+
+
+class SentimentJobQueue:
+    def __init__(
+        self,
+        analyze_fn: AnalyzeFn,
+        concurrency: int,
+        max_retries: int,
+        retry_delay: float = 1.0,
+        state_dir: Optional[str] = None,
+        keep_finished: int = 1000,
+        finished_ttl: float = 7 * 24 * 3600,
+    ):
+        self.analyze_fn = analyze_fn
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.keep_finished = keep_finished
+        self.finished_ttl = finished_ttl
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
+        # Keeps log lines for a job in the order their items settled
+        self.log_lock = asyncio.Lock()
+
+    # Persistence
+
+    def _transcripts_path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.transcripts.json"
+
+    def _log_path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.log"
+
+    def _write_new(self, job: Dict[str, Any]):
+        """Transcripts and the log header of a just submitted job"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self._transcripts_path(job["id"])
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump([item["transcript"] for item in job["items"]], f)
+        os.replace(tmp, path)
+        header = {
+            "id": job["id"],
+            "options": job["options"],
+            "createdAt": job["createdAt"],
+            "symbols": [item["symbol"] for item in job["items"]],
+        }
+        with open(self._log_path(job["id"]), "w") as f:
+            f.write(json.dumps(header) + "\n")
+
+    def _append(self, job_id: str, records: List[Dict[str, Any]]):
+        with open(self._log_path(job_id), "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    async def _record(self, job: Dict[str, Any], indexes: Iterable[int]):
+        """Append the current state of some items to the job's log, off the event loop"""
+        if self.state_dir is None:
+            return
+        records = [
+            {"index": index, "updatedAt": job["updatedAt"], **{key: job["items"][index][key] for key in ITEM_STATE}}
+            for index in indexes
+        ]
+        if records:
+            async with self.log_lock:
+                await asyncio.to_thread(self._append, job["id"], records)
+
+    def _read_transcripts(self, job_id: str) -> List[str]:
+        with open(self._transcripts_path(job_id)) as f:
+            return json.load(f)
+
+    async def _ensure_transcripts(self, job: Dict[str, Any]):
+        """Reload the transcripts that were dropped when the job finished"""
+        if all("transcript" in item for item in job["items"]):
+            return
+        transcripts = await asyncio.to_thread(self._read_transcripts, job["id"])
+        for item, transcript in zip(job["items"], transcripts):
+            item["transcript"] = transcript
+
+    def _read_log(self, path: Path) -> Dict[str, Any]:
+        """A job rebuilt from its log, without transcripts"""
+        with open(path) as f:
+            lines = f.read().splitlines()
+        header = json.loads(lines[0])
+        job = {
+            "id": header["id"],
+            "status": PENDING,
+            "options": header["options"],
+            "createdAt": header["createdAt"],
+            "updatedAt": header["createdAt"],
+            "items": [
+                {"symbol": symbol, "status": PENDING, "attempts": 0, "error": None,
+                 "sentimentId": None, "sentimentScore": None}
+                for symbol in header["symbols"]
+            ],
+        }
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; the item just runs again
+                continue
+            job["items"][record.pop("index")].update({key: record[key] for key in ITEM_STATE})
+            job["updatedAt"] = record["updatedAt"]
+        self._refresh_status(job, touch=False)
+        return job
+
+    def _load_saved(self) -> List[Dict[str, Any]]:
+        if self.state_dir is None or not self.state_dir.exists():
+            return []
+        jobs = []
+        for path in self.state_dir.glob("*.log"):
+            try:
+                job = self._read_log(path)
+                if job["status"] not in FINISHED:
+                    # Only jobs that still have work need their transcripts back
+                    for item, transcript in zip(job["items"], self._read_transcripts(job["id"])):
+                        item["transcript"] = transcript
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"Skipping unreadable sentiment job {path.name}: {e}")
+                continue
+            jobs.append(job)
+        return jobs
+
+    def _delete_files(self, job_ids: List[str]):
+        for job_id in job_ids:
+            for path in (self._log_path(job_id), self._transcripts_path(job_id)):
+                path.unlink(missing_ok=True)
+
+    def _expired(self) -> List[str]:
+        """Finished jobs past finished_ttl or beyond the newest keep_finished, dropped from memory"""
+        finished = sorted(
+            (job for job in self.jobs.values() if job["status"] in FINISHED and job["id"] not in self.subscribers),
+            key=lambda job: job["updatedAt"],
+            reverse=True,
+        )
+        cutoff = (datetime.now() - timedelta(seconds=self.finished_ttl)).isoformat()
+        expired = [
+            job["id"] for rank, job in enumerate(finished)
+            if rank >= self.keep_finished or job["updatedAt"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return expired
+
+    async def _prune(self):
+        expired = self._expired()
+        if expired and self.state_dir is not None:
+            await asyncio.to_thread(self._delete_files, expired)
+
+    # Lifecycle
+
+    def start(self):
+        """Start workers and re-enqueue items of jobs interrupted by a restart"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue()
+        for job in self._load_saved():
+            self.jobs[job["id"]] = job
+            if job["status"] in FINISHED:
+                continue
+            for index, item in enumerate(job["items"]):
+                # Anything mid-flight when we stopped starts over; completed items are kept
+                if item["status"] in (PENDING, RUNNING):
+                    item["status"] = PENDING
+                    self.queue.put_nowait((job["id"], index))
+            self._refresh_status(job, touch=False)
+        if self.state_dir is not None:
+            self._delete_files(self._expired())
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    # Jobs
+
+    async def submit(self, items: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if self.queue is None:
+            raise RuntimeError("Sentiment job queue is not running")
+        now = datetime.now().isoformat()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": PENDING,
+            "options": options or {},
+            "createdAt": now,
+            "updatedAt": now,
+            "items": [
+                {
+                    "symbol": item["symbol"].upper(),
+                    "transcript": item["transcript"],
+                    "status": PENDING,
+                    "attempts": 0,
+                    "error": None,
+                    "sentimentId": None,
+                    "sentimentScore": None,
+                }
+                for item in items
+            ],
+        }
+        if self.state_dir is not None:
+            await asyncio.to_thread(self._write_new, job)
+        self.jobs[job["id"]] = job
+        for index in range(len(job["items"])):
+            self.queue.put_nowait((job["id"], index))
+        return job
+
+    async def retry_failed(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Re-enqueue the failed items of a job"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        failed = [index for index, item in enumerate(job["items"]) if item["status"] == FAILED]
+        if not failed:
+            return job
+        await self._ensure_transcripts(job)
+        for index in failed:
+            job["items"][index].update(status=PENDING, attempts=0, error=None)
+        self._refresh_status(job)
+        await self._record(job, failed)
+        for index in failed:
+            self.queue.put_nowait((job_id, index))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def summary(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job status without transcript text"""
+        counts = {PENDING: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        for item in job["items"]:
+            counts[item["status"]] += 1
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "total": len(job["items"]),
+            "pending": counts[PENDING],
+            "running": counts[RUNNING],
+            "completed": counts[COMPLETED],
+            "failed": counts[FAILED],
+            "createdAt": job["createdAt"],
+            "updatedAt": job["updatedAt"],
+            "items": [
+                {key: value for key, value in item.items() if key != "transcript"}
+                for item in job["items"]
+            ],
+        }
+
+    def _refresh_status(self, job: Dict[str, Any], touch: bool = True):
+        statuses = {item["status"] for item in job["items"]}
+        if statuses & {PENDING, RUNNING}:
+            job["status"] = RUNNING if statuses - {PENDING} else PENDING
+        else:
+            job["status"] = FAILED if FAILED in statuses else COMPLETED
+        if touch:
+            job["updatedAt"] = datetime.now().isoformat()
+
+    def _publish(self, job: Dict[str, Any], index: int):
+        event = {"job": job["id"], "jobStatus": job["status"], "index": index}
+        event.update({key: value for key, value in job["items"][index].items() if key != "transcript"})
+        for subscriber in self.subscribers.get(job["id"], []):
+            subscriber.put_nowait(event)
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Per-item progress events for a job until it finishes"""
+        job = self.jobs[job_id]
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(job_id, []).append(subscriber)
+        try:
+            yield self.summary(job)
+            while job["status"] in (PENDING, RUNNING) or not subscriber.empty():
+                yield await subscriber.get()
+        finally:
+            self.subscribers[job_id].remove(subscriber)
+            if not self.subscribers[job_id]:
+                del self.subscribers[job_id]
+
+    # Workers
+
+    async def _worker(self):
+        while True:
+            job_id, index = await self.queue.get()
+            try:
+                await self._process(job_id, index)
+            except Exception as e:
+                print(f"Sentiment job {job_id} item {index} crashed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, job_id: str, index: int):
+        job = self.jobs.get(job_id)
+        if job is None or job["items"][index]["status"] != PENDING:
+            return
+        item = job["items"][index]
+        item["status"] = RUNNING
+        self._refresh_status(job)
+        self._publish(job, index)
+
+        while True:
+            item["attempts"] += 1
+            try:
+                analysis = await self.analyze_fn(item["transcript"], item["symbol"], **job["options"])
+                item.update(
+                    status=COMPLETED,
+                    error=None,
+                    sentimentId=analysis.id,
+                    sentimentScore=analysis.sentimentScore,
+                )
+                break
+            except Exception as e:
+                item["error"] = str(getattr(e, "detail", e))
+                if item["attempts"] > self.max_retries:
+                    item["status"] = FAILED
+                    break
+                await asyncio.sleep(self.retry_delay * 2 ** (item["attempts"] - 1))
+
+        self._refresh_status(job)
+        # Published before awaiting the log write: events() stops once the job
+        # has finished and its queue is empty, so the event must already be in it
+        self._publish(job, index)
+        await self._record(job, [index])
+        if job["status"] in FINISHED:
+            if self.state_dir is not None:
+                # Saved on disk; retry_failed reads them back if it needs them
+                for finished_item in job["items"]:
+                    finished_item.pop("transcript", None)
+            await self._prune()
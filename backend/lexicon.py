@@ -0,0 +1,143 @@
+"""
+Local lexicon-based sentiment scorer
+
+Scores transcripts against a finance sentiment word list (Loughran-McDonald
+style) without any network call. Tokens are mapped to class codes once and
+all counting is done with NumPy, so thousands of transcripts per second fit
+on one core. Results use the same fields as the LLM analysis.
+"""
+
+import csv
+import json
+import re
+from collections import Counter
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Token class codes
+NEUTRAL = 0
+POSITIVE = 1
+NEGATIVE = 2
+UNCERTAIN = 3
+NEGATION = 4
+SENTENCE_END = 5
+
+# Words, contractions, and sentence terminators as their own tokens
+TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|[.!?]")
+
+# A positive word preceded within this many tokens by a negation counts as negative
+NEGATION_WINDOW = 3
+
+DEFAULT_LEXICON = Path(__file__).parent / "data" / "finance_lexicon.json"
+
+
+class LexiconScorer:
+    def __init__(self, positive: List[str], negative: List[str], uncertainty: List[str], negation: List[str]):
+        self.codes: Dict[str, int] = {}
+        # Later assignments win: negation > negative > positive > uncertainty
+        for words, code in ((uncertainty, UNCERTAIN), (positive, POSITIVE), (negative, NEGATIVE), (negation, NEGATION)):
+            for word in words:
+                self.codes[word.lower()] = code
+        self.words = len(self.codes)
+        for terminator in ".!?":
+            self.codes[terminator] = SENTENCE_END
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "LexiconScorer":
+        """Load the bundled word list, or a Loughran-McDonald Master Dictionary CSV"""
+        path = Path(path) if path else DEFAULT_LEXICON
+        if path.suffix.lower() == ".csv":
+            positive, negative, uncertainty = [], [], []
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    word = row["Word"].lower()
+                    # Non-zero category columns hold the year the word was added
+                    if row.get("Positive", "0") not in ("0", ""):
+                        positive.append(word)
+                    if row.get("Negative", "0") not in ("0", ""):
+                        negative.append(word)
+                    if row.get("Uncertainty", "0") not in ("0", ""):
+                        uncertainty.append(word)
+            with open(DEFAULT_LEXICON) as f:
+                negation = json.load(f)["negation"]
+            return cls(positive, negative, uncertainty, negation)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["positive"], data["negative"], data["uncertainty"], data["negation"])
+
+    def encode(self, transcript: str) -> Tuple[List[str], np.ndarray]:
+        """Tokenize and map every token to its class code"""
+        tokens = TOKEN.findall(transcript.lower())
+        encoded = np.fromiter(map(self.codes.get, tokens, repeat(NEUTRAL)), dtype=np.int8, count=len(tokens))
+        return tokens, encoded
+
+    def score(self, transcript: str) -> Dict[str, Any]:
+        """Analysis in the shape of the LLM result, plus the net tone in [-1, 1]"""
+        tokens, codes = self.encode(transcript)
+
+        # Flip positive words that follow a negation in the same sentence ("not strong")
+        if (codes == NEGATION).any():
+            positions = np.arange(len(codes))
+            last_negation = np.maximum.accumulate(np.where(codes == NEGATION, positions, -1))
+            last_end = np.maximum.accumulate(np.where(codes == SENTENCE_END, positions, -1))
+            negated = (
+                (codes == POSITIVE)
+                & (last_negation > last_end)
+                & (positions - last_negation <= NEGATION_WINDOW)
+            )
+            codes = np.where(negated, NEGATIVE, codes)
+
+        positive = codes == POSITIVE
+        negative = codes == NEGATIVE
+        n_positive = int(positive.sum())
+        n_negative = int(negative.sum())
+        n_uncertain = int((codes == UNCERTAIN).sum())
+
+        # Classify each sentence by its net polarity
+        sentence_ids = np.cumsum(codes == SENTENCE_END)
+        sentences = int(sentence_ids[-1]) + 1 if len(codes) else 0
+        net = (
+            np.bincount(sentence_ids, weights=positive, minlength=sentences)
+            - np.bincount(sentence_ids, weights=negative, minlength=sentences)
+        )
+        # Drop empty trailing "sentences" after a final terminator
+        has_words = np.bincount(sentence_ids, weights=codes != SENTENCE_END, minlength=sentences) > 0
+        net = net[has_words]
+        positive_sentences = int((net > 0).sum())
+        negative_sentences = int((net < 0).sum())
+        neutral_sentences = int(len(net) - positive_sentences - negative_sentences)
+
+        polar = n_positive + n_negative
+        tone = (n_positive - n_negative) / polar if polar else 0.0
+        coverage = polar / (polar + 5)
+        uncertainty_share = n_uncertain / (polar + n_uncertain) if polar + n_uncertain else 0.0
+        confidence = 0.3 + 0.6 * coverage * (1 - min(uncertainty_share, 0.5))
+
+        top_positive = self.top_terms(tokens, positive)
+        top_negative = self.top_terms(tokens, negative)
+        return {
+            "sentimentScore": round(5.5 + 4.5 * tone, 2),
+            "positiveCount": positive_sentences,
+            "neutralCount": neutral_sentences,
+            "negativeCount": negative_sentences,
+            "confidence": round(confidence, 2),
+            "summary": (
+                f"Lexicon tone {tone:+.2f}: {n_positive} positive and {n_negative} negative terms, "
+                f"{n_uncertain} uncertainty terms across {len(net)} sentences."
+            ),
+            "keyHighlights": [f"'{word}' mentioned {count} times" for word, count in top_positive],
+            "riskFactors": [f"'{word}' mentioned {count} times" for word, count in top_negative],
+            "tone": tone,
+        }
+
+    @staticmethod
+    def top_terms(tokens: List[str], mask: np.ndarray, limit: int = 5):
+        positions = np.flatnonzero(mask)
+        return Counter(tokens[i] for i in positions).most_common(limit)
+
+    def is_ambiguous(self, result: Dict[str, Any], tone_threshold: float, min_confidence: float) -> bool:
+        """Whether a lexicon result is too weak to trust without the LLM"""
+        return abs(result["tone"]) < tone_threshold or result["confidence"] < min_confidence
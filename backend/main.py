@@ -1,136 +1,134 @@
-from fastapi import FastAPI, HTTPException, Depends
+import time
+# Taken before the heavy imports so workers can log how long loading took
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, WebSocket, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import uvicorn
-from typing import List, Optional, Dict, Any
-import yfinance as yf
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator, Literal
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 from pydantic import BaseModel
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import asyncio
 from contextlib import asynccontextmanager
+from functools import cached_property
+from models import (
+    StockData,
+    HistoricalData,
+    StockSearch,
+    SentimentAnalysis,
+    EarningsCallTranscript,
+    AnalyzeRequest,
+    EarningsGenerateRequest,
+    BulkAnalyzeItem,
+    BulkAnalyzeRequest,
+    SentimentJobItem,
+    SentimentJob,
+    BatchQuoteRequest,
+    BatchQuoteError,
+    BatchQuoteResponse,
+    Fundamentals,
+    BatchFundamentalsRequest,
+    BatchFundamentalsResponse,
+)
+from storage import MemoryStorage
+from sqlite_storage import SQLiteStorage
+from singleflight import SingleFlight
+from market_executor import MarketDataExecutor
+from refresher import QuoteRefresher
+from history_store import HistoryStore
+from market_data import create_provider
+from downsample import lttb_indices, format_dates
+from sentiment_cache import SentimentCache, cache_key
+from chunked_sentiment import split_transcript, analyze_in_chunks
+from jobs import SentimentJobQueue
+from lexicon import LexiconScorer
+from symbol_search import SymbolIndex
+from metrics import Registry, UpstreamMetrics, MetricsMiddleware, stats_family
+from profiling import RequestProfiler, ProfilingMiddleware
+from serving import log_ready, readiness, serve_mode, is_production, worker_count, run_api, jobs_enabled, check_worker_count
+from shared_cache import SharedCache, TIERS
+from fundamentals import FundamentalsCache, parse_fields, required_parts, fetch_part, build_fundamentals
+from quote_stream import QuoteHub
+from http_cache import make_etag, conditional, CompressionMiddleware, ResponseCache
+import fast_json
+from fast_json import JSONBytesResponse
 
-# Initialize OpenAI client
+# Initialize OpenAI clients; both honour OPENAI_BASE_URL, so a local
+# OpenAI-compatible server can stand in for the real API
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Pydantic models
-class StockData(BaseModel):
-    id: Optional[int] = None
-    symbol: str
-    name: str
-    price: float
-    openPrice: float
-    highPrice: float
-    lowPrice: float
-    volume: str
-    change: float
-    changePercent: float
-    marketCap: Optional[str] = None
-    peRatio: Optional[float] = None
-    createdAt: Optional[str] = None
-
-class HistoricalData(BaseModel):
-    date: str
-    price: float
-
-class StockSearch(BaseModel):
-    symbol: str
-    name: str
-
-class SentimentAnalysis(BaseModel):
-    id: Optional[int] = None
-    stockSymbol: str
-    transcriptText: str
-    sentimentScore: float
-    positiveCount: int
-    neutralCount: int
-    negativeCount: int
-    confidence: float
-    summary: str
-    keyHighlights: List[str]
-    riskFactors: List[str]
-    createdAt: Optional[str] = None
-
-class EarningsCallTranscript(BaseModel):
-    id: Optional[int] = None
-    stockSymbol: str
-    quarter: str
-    year: str
-    transcript: str
-    speakers: List[Dict[str, str]]
-    createdAt: Optional[str] = None
-
-class AnalyzeRequest(BaseModel):
-    transcript: str
-
-class EarningsGenerateRequest(BaseModel):
-    quarter: str
-    year: str
-
-# In-memory storage
-class MemoryStorage:
-    def __init__(self):
-        self.stock_data: Dict[str, StockData] = {}
-        self.sentiment_analyses: Dict[str, SentimentAnalysis] = {}
-        self.earnings_transcripts: Dict[str, List[EarningsCallTranscript]] = {}
-        self.next_id = 1
-    
-    def get_next_id(self) -> int:
-        current_id = self.next_id
-        self.next_id += 1
-        return current_id
-    
-    def store_stock_data(self, stock_data: StockData) -> StockData:
-        if stock_data.id is None:
-            stock_data.id = self.get_next_id()
-        stock_data.createdAt = datetime.now().isoformat()
-        self.stock_data[stock_data.symbol] = stock_data
-        return stock_data
-    
-    def get_stock_data(self, symbol: str) -> Optional[StockData]:
-        return self.stock_data.get(symbol)
-    
-    def get_all_stock_data(self) -> List[StockData]:
-        return list(self.stock_data.values())
-    
-    def store_sentiment_analysis(self, sentiment: SentimentAnalysis) -> SentimentAnalysis:
-        if sentiment.id is None:
-            sentiment.id = self.get_next_id()
-        sentiment.createdAt = datetime.now().isoformat()
-        self.sentiment_analyses[sentiment.stockSymbol] = sentiment
-        return sentiment
-    
-    def get_sentiment_analysis(self, symbol: str) -> Optional[SentimentAnalysis]:
-        return self.sentiment_analyses.get(symbol)
-    
-    def store_earnings_transcript(self, transcript: EarningsCallTranscript) -> EarningsCallTranscript:
-        if transcript.id is None:
-            transcript.id = self.get_next_id()
-        transcript.createdAt = datetime.now().isoformat()
-        
-        if transcript.stockSymbol not in self.earnings_transcripts:
-            self.earnings_transcripts[transcript.stockSymbol] = []
-        
-        self.earnings_transcripts[transcript.stockSymbol].append(transcript)
-        return transcript
-    
-    def get_earnings_transcript(self, symbol: str, quarter: str, year: str) -> Optional[EarningsCallTranscript]:
-        transcripts = self.earnings_transcripts.get(symbol, [])
-        for transcript in transcripts:
-            if transcript.quarter == quarter and transcript.year == year:
-                return transcript
-        return None
-    
-    def get_latest_earnings_transcript(self, symbol: str) -> Optional[EarningsCallTranscript]:
-        transcripts = self.earnings_transcripts.get(symbol, [])
-        return transcripts[-1] if transcripts else None
+# uvicorn started directly with --workers or WEB_CONCURRENCY never goes through run_api
+if is_production():
+    check_worker_count(worker_count())
+
+# Global storage instance; STORAGE_BACKEND=sqlite persists it across restarts
+if os.getenv("STORAGE_BACKEND", "memory").lower() == "sqlite":
+    storage = SQLiteStorage(os.getenv("STORAGE_SQLITE_PATH", "data/sentimentocks.db"))
+else:
+    storage = MemoryStorage()
+
+# Coalesces concurrent cache misses for the same upstream fetch
+inflight = SingleFlight()
+
+# Cache tier shared by every worker on the host, with cross-process single-flight.
+# On by default when running several workers; without it only tier hits are counted
+SHARED_CACHE_ENABLED = os.getenv(
+    "SHARED_CACHE_ENABLED", "true" if is_production() and worker_count() > 1 else "false"
+).lower() == "true"
+shared_cache = SharedCache(
+    os.getenv("SHARED_CACHE_PATH", "data/shared_cache.db") if SHARED_CACHE_ENABLED else None,
+    lease_seconds=float(os.getenv("SHARED_CACHE_LEASE_SECONDS", "30"))
+)
+
+# Prometheus metrics served at /metrics
+metrics = Registry()
+upstream_metrics = UpstreamMetrics(metrics)
+
+# Source of quotes, history and fundamentals; MARKET_DATA_PROVIDER=synthetic runs offline
+market_data = create_provider()
+
+def observe_market_data(method: str, seconds: float, failed: bool):
+    upstream_metrics.observe(market_data.name, method, seconds, failed)
+
+market_data.observers.append(observe_market_data)
 
-# Global storage instance
-storage = MemoryStorage()
+# All blocking provider calls run here so they never stall the event loop
+market_executor = MarketDataExecutor(max_workers=int(os.getenv("MARKET_DATA_WORKERS", "16")))
+
+# Repeat analyses of the same transcript are served from here
+sentiment_cache = SentimentCache(
+    max_entries=int(os.getenv("SENTIMENT_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("SENTIMENT_CACHE_TTL", str(7 * 24 * 3600))),
+    disk_dir=os.getenv("SENTIMENT_CACHE_DIR") or None
+)
+
+# Fundamentals change when companies report, so info and statements are kept long
+fundamentals_cache = FundamentalsCache(
+    max_entries=int(os.getenv("FUNDAMENTALS_CACHE_SIZE", "5000")),
+    info_ttl=float(os.getenv("FUNDAMENTALS_TTL", str(24 * 3600))),
+    statement_ttl=float(os.getenv("FUNDAMENTALS_STATEMENT_TTL", str(7 * 24 * 3600)))
+)
+
+# Offline finance-lexicon scorer used for mode=fast and as the first tier of mode=hybrid
+lexicon_scorer = LexiconScorer.load(os.getenv("SENTIMENT_LEXICON_PATH") or None)
+HYBRID_TONE_THRESHOLD = float(os.getenv("HYBRID_TONE_THRESHOLD", "0.2"))
+HYBRID_MIN_CONFIDENCE = float(os.getenv("HYBRID_MIN_CONFIDENCE", "0.5"))
+sentiment_mode_counts = {"fast": 0, "llm": 0, "hybridLocal": 0, "hybridEscalated": 0}
+
+# Local OHLCV store so history requests only fetch missing bars
+history_store = (
+    HistoryStore(os.getenv("HISTORY_STORE_DIR", "data/history"))
+    if os.getenv("HISTORY_STORE_ENABLED", "true").lower() == "true"
+    else None
+)
+# Serialized history responses, each kept until the store would refetch its bars
+history_payloads = ResponseCache(int(os.getenv("HISTORY_PAYLOAD_CACHE_SIZE", "500")))
 
 # NSE stock symbols mapping
 NSE_STOCKS = {
@@ -192,6 +190,9 @@ NSE_STOCKS = {
     'SAIL': 'SAIL.NS'
 }
 
+# Autocomplete over the full equity list (symbols and company names, typo tolerant)
+symbol_index = SymbolIndex.load(os.getenv("NSE_EQUITY_LIST_PATH") or None)
+
 def get_nse_symbol(symbol: str) -> str:
     """Convert NSE symbol to Yahoo Finance format"""
     return NSE_STOCKS.get(symbol.upper(), f"{symbol.upper()}.NS")
@@ -224,54 +225,267 @@ def format_volume(volume: float) -> str:
     else:
         return str(int(volume))
 
-async def get_stock_data_from_yfinance(symbol: str) -> StockData:
-    """Get stock data from yfinance"""
+# Quotes are served from storage for this long before refetching
+QUOTE_CACHE_TTL = timedelta(minutes=5)
+
+# Past the TTL a quote is still served while it refreshes in the background,
+# up to this age; older quotes are fetched synchronously
+QUOTE_MAX_STALE = timedelta(seconds=int(os.getenv("QUOTE_MAX_STALE_SECONDS", "1800")))
+
+# Batch quote limits
+MAX_BATCH_SYMBOLS = int(os.getenv("MAX_BATCH_SYMBOLS", "100"))
+# Read routes send orjson-encoded bodies (cached ones for quotes) instead of
+# having FastAPI re-validate and re-encode models built moments before
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "true").lower() == "true"
+BATCH_INFO_CONCURRENCY = int(os.getenv("BATCH_INFO_CONCURRENCY", "8"))
+
+def is_quote_fresh(stock_data: Optional[StockData]) -> bool:
+    """Check whether cached stock data is still within the quote TTL"""
+    if not stock_data or not stock_data.createdAt:
+        return False
+    created_time = datetime.fromisoformat(stock_data.createdAt)
+    return datetime.now() - created_time < QUOTE_CACHE_TTL
+
+def quote_age_seconds(stock_data: Optional[StockData]) -> Optional[float]:
+    """Seconds since cached stock data was fetched"""
+    if not stock_data or not stock_data.createdAt:
+        return None
+    return (datetime.now() - datetime.fromisoformat(stock_data.createdAt)).total_seconds()
+
+def is_quote_servable_stale(stock_data: Optional[StockData]) -> bool:
+    """Check whether expired stock data is recent enough to serve while revalidating"""
+    age = quote_age_seconds(stock_data)
+    return age is not None and age < QUOTE_MAX_STALE.total_seconds()
+
+def build_stock_data(symbol: str, info: Dict[str, Any], hist: pd.DataFrame) -> StockData:
+    """Build StockData from a yfinance info dict and a recent daily history frame"""
+    current_data = hist.iloc[-1]
+    previous_data = hist.iloc[-2] if len(hist) > 1 else current_data
+    
+    current_price = float(current_data['Close'])
+    previous_close = float(previous_data['Close'])
+    change = current_price - previous_close
+    change_percent = (change / previous_close) * 100
+    
+    # Get additional info
+    market_cap = info.get('marketCap')
+    pe_ratio = info.get('trailingPE')
+    company_name = info.get('longName', info.get('shortName', symbol))
+    
+    return StockData(
+        symbol=symbol.upper(),
+        name=company_name,
+        price=current_price,
+        openPrice=float(current_data['Open']),
+        highPrice=float(current_data['High']),
+        lowPrice=float(current_data['Low']),
+        volume=format_volume(current_data['Volume']),
+        change=change,
+        changePercent=change_percent,
+        marketCap=format_market_cap(market_cap),
+        peRatio=float(pe_ratio) if pe_ratio and not pd.isna(pe_ratio) else None
+    )
+
+def fetch_quote_from_provider(yf_symbol: str) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """Blocking fetch of info and the last two daily bars for one ticker"""
+    # Get basic info
+    info = market_data.info(yf_symbol)
+    
+    # Get current price data
+    hist = market_data.history(yf_symbol, period="2d")
+    return info, hist
+
+async def get_stock_data_from_provider(symbol: str) -> StockData:
+    """Get stock data from the market data provider"""
     try:
         yf_symbol = get_nse_symbol(symbol)
-        stock = yf.Ticker(yf_symbol)
-        
-        # Get basic info
-        info = stock.info
-        
-        # Get current price data
-        hist = stock.history(period="2d")
+        info, hist = await market_executor.run(fetch_quote_from_provider, yf_symbol)
         if hist.empty:
             raise HTTPException(status_code=404, detail=f"No data found for symbol {symbol}")
         
-        current_data = hist.iloc[-1]
-        previous_data = hist.iloc[-2] if len(hist) > 1 else current_data
-        
-        current_price = float(current_data['Close'])
-        previous_close = float(previous_data['Close'])
-        change = current_price - previous_close
-        change_percent = (change / previous_close) * 100
-        
-        # Get additional info
-        market_cap = info.get('marketCap')
-        pe_ratio = info.get('trailingPE')
-        company_name = info.get('longName', info.get('shortName', symbol))
-        
-        stock_data = StockData(
-            symbol=symbol.upper(),
-            name=company_name,
-            price=current_price,
-            openPrice=float(current_data['Open']),
-            highPrice=float(current_data['High']),
-            lowPrice=float(current_data['Low']),
-            volume=format_volume(current_data['Volume']),
-            change=change,
-            changePercent=change_percent,
-            marketCap=format_market_cap(market_cap),
-            peRatio=float(pe_ratio) if pe_ratio and not pd.isna(pe_ratio) else None
-        )
-        
-        return storage.store_stock_data(stock_data)
+        return storage.store_stock_data(build_stock_data(symbol, info, hist))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stock data: {str(e)}")
 
-async def get_historical_data_from_yfinance(symbol: str, period: str = "1D") -> List[HistoricalData]:
-    """Get historical stock data from yfinance"""
+def extract_ticker_history(data: pd.DataFrame, yf_symbol: str) -> pd.DataFrame:
+    """Pull one ticker's OHLCV frame out of a multi-ticker yf.download result"""
+    if isinstance(data.columns, pd.MultiIndex):
+        if yf_symbol not in data.columns.get_level_values(0):
+            return pd.DataFrame()
+        data = data[yf_symbol]
+    return data.dropna(how="all")
+
+async def get_batch_stock_data_from_provider(symbols: List[str]) -> Tuple[List[StockData], List[BatchQuoteError]]:
+    """Get stock data for many symbols with one bulk history download"""
+    yf_symbols = {symbol: get_nse_symbol(symbol) for symbol in symbols}
+    
+    # One round trip for all price history
+    try:
+        data = await market_executor.run(market_data.download, list(yf_symbols.values()), "2d")
+    except Exception as e:
+        errors = [BatchQuoteError(symbol=symbol, detail=f"Failed to fetch stock data: {str(e)}") for symbol in symbols]
+        return [], errors
+    
+    # info has no bulk API, so fetch it with bounded parallelism
+    semaphore = asyncio.Semaphore(BATCH_INFO_CONCURRENCY)
+    
+    async def fetch_info(yf_symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await market_executor.run(market_data.info, yf_symbol)
+    
+    infos = await asyncio.gather(
+        *(fetch_info(yf_symbol) for yf_symbol in yf_symbols.values()),
+        return_exceptions=True
+    )
+    
+    quotes: List[StockData] = []
+    errors: List[BatchQuoteError] = []
+    for (symbol, yf_symbol), info in zip(yf_symbols.items(), infos):
+        try:
+            hist = extract_ticker_history(data, yf_symbol)
+            if hist.empty:
+                errors.append(BatchQuoteError(symbol=symbol, detail=f"No data found for symbol {symbol}"))
+                continue
+            if isinstance(info, Exception):
+                # Price data is still useful without the company metadata
+                info = {}
+            quotes.append(storage.store_stock_data(build_stock_data(symbol, info, hist)))
+        except Exception as e:
+            errors.append(BatchQuoteError(symbol=symbol, detail=f"Failed to fetch stock data: {str(e)}"))
+    
+    return quotes, errors
+
+async def load_fundamentals_part(yf_symbol: str, part: str) -> Any:
+    """Info or one statement for a ticker, from the cache or one shared upstream fetch"""
+    cached = fundamentals_cache.get(yf_symbol, part)
+    if cached is not None:
+        shared_cache.record("fundamentals", "local")
+        return cached
+    
+    async def fetch() -> Any:
+        value = await shared_cache.get_or_fetch(
+            "fundamentals", f"{yf_symbol}:{part}", fundamentals_cache.ttl(part),
+            lambda: market_executor.run(fetch_part, market_data, yf_symbol, part)
+        )
+        fundamentals_cache.put(yf_symbol, part, value)
+        return value
+    
+    return await inflight.do(("fundamentals", yf_symbol, part), fetch)
+
+async def get_fundamentals_from_provider(symbol: str, fields: List[str]) -> Fundamentals:
+    """Requested fundamentals, fetching only the statements those fields need"""
+    yf_symbol = get_nse_symbol(symbol)
+    parts = required_parts(fields)
+    values = await asyncio.gather(*(load_fundamentals_part(yf_symbol, part) for part in parts))
+    return Fundamentals(**build_fundamentals(symbol, fields, dict(zip(parts, values))))
+
+def requested_fundamentals_fields(fields: Optional[List[str]]) -> List[str]:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Stale-while-revalidate bookkeeping
+background_tasks = set()
+swr_stats = {"staleServed": 0, "backgroundRefreshes": 0, "backgroundFailures": 0}
+
+async def load_shared_quote(symbol: str, max_age: Optional[float] = None) -> StockData:
+    """Quote from the shared tier, from another worker fetching it, or from the provider"""
+    async def fetch() -> Dict[str, Any]:
+        return (await get_stock_data_from_provider(symbol)).model_dump()
+    
+    value = await shared_cache.get_or_fetch("quote", symbol.upper(), QUOTE_CACHE_TTL.total_seconds(), fetch, max_age)
+    # Keeps the original createdAt, so freshness is judged the same in every worker
+    return storage.cache_stock_data(StockData(**value))
+
+async def refresh_quote(symbol: str, max_age: Optional[float] = None) -> StockData:
+    """Fetch a quote, sharing the fetch with any concurrent caller in any worker"""
+    return await inflight.do(
+        ("quote", symbol.upper(), None),
+        lambda: load_shared_quote(symbol, max_age)
+    )
+
+async def get_batch_stock_data(symbols: List[str], max_age: Optional[float] = None) -> Tuple[List[StockData], List[BatchQuoteError]]:
+    """Quotes for many symbols, bulk-downloading only those no worker has or is fetching"""
+    found = await shared_cache.get_many("quote", symbols, max_age)
+    shared_cache.record("quote", "shared", len(found))
+    quotes = [storage.cache_stock_data(StockData(**value)) for value in found.values()]
+    remaining = [symbol for symbol in symbols if symbol not in found]
+    
+    errors: List[BatchQuoteError] = []
+    claimed = await shared_cache.try_lease_many("quote", remaining)
+    if claimed:
+        try:
+            fetched, errors = await get_batch_stock_data_from_provider(claimed)
+            shared_cache.record("quote", "upstream", len(fetched))
+            await shared_cache.put_many(
+                "quote",
+                {stock_data.symbol: stock_data.model_dump() for stock_data in fetched},
+                QUOTE_CACHE_TTL.total_seconds()
+            )
+        finally:
+            await shared_cache.release_many("quote", claimed)
+        quotes.extend(fetched)
+    
+    # Symbols another worker is fetching right now: wait for its result
+    claimed_set = set(claimed)
+    waiting = [symbol for symbol in remaining if symbol not in claimed_set]
+    results = await asyncio.gather(*(refresh_quote(symbol, max_age) for symbol in waiting), return_exceptions=True)
+    for symbol, result in zip(waiting, results):
+        if isinstance(result, Exception):
+            errors.append(BatchQuoteError(symbol=symbol, detail=getattr(result, "detail", str(result))))
+        else:
+            quotes.append(result)
+    return quotes, errors
+
+async def refresh_hot_quotes(symbols: List[str]) -> Tuple[List[StockData], List[BatchQuoteError]]:
+    """Refresher pass; quotes another worker refreshed this interval are reused, not refetched"""
+    return await get_batch_stock_data(symbols, max_age=0.9 * quote_refresher.current_interval())
+
+def revalidate_in_background(symbol: str):
+    """Refresh a stale quote without making the caller wait for it"""
+    async def revalidate():
+        # Only the caller that starts the fetch counts it; others join one in flight
+        owner = ("quote", symbol.upper(), None) not in inflight.in_flight
+        if owner:
+            swr_stats["backgroundRefreshes"] += 1
+        try:
+            await refresh_quote(symbol)
+        except Exception:
+            if owner:
+                swr_stats["backgroundFailures"] += 1
+    
+    swr_stats["staleServed"] += 1
+    task = asyncio.create_task(revalidate())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def quote_freshness(symbols: List[str]) -> Dict[str, Any]:
+    """Summarise how old the cached quotes for a set of symbols are"""
+    ages = [quote_age_seconds(storage.peek_stock_data(symbol)) for symbol in symbols]
+    cached = [age for age in ages if age is not None]
+    return {
+        "symbols": len(symbols),
+        "cached": len(cached),
+        "stale": sum(age >= QUOTE_CACHE_TTL.total_seconds() for age in cached),
+        "maxAgeSeconds": max(cached) if cached else None,
+        "avgAgeSeconds": sum(cached) / len(cached) if cached else None,
+    }
+
+def serialize_history(hist: pd.DataFrame, date_format: str = '%Y-%m-%d', max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Build history rows from whole columns, optionally downsampled with LTTB"""
+    prices = hist['Close'].to_numpy(dtype=float)
+    index = hist.index
+    if max_points is not None and len(prices) > max_points:
+        keep = lttb_indices(index.asi8, prices, max_points)
+        prices = prices[keep]
+        index = index[keep]
+    dates = format_dates(index, date_format)
+    return [{"date": date, "price": price} for date, price in zip(dates, prices.tolist())]
+
+async def load_history(symbol: str, period: str = "1D") -> pd.DataFrame:
+    """Get historical stock data from the market data provider"""
     try:
         # Convert period to yfinance format
         period_map = {
@@ -283,53 +497,118 @@ async def get_historical_data_from_yfinance(symbol: str, period: str = "1D") ->
         yf_period = period_map.get(period, '1d')
         
         yf_symbol = get_nse_symbol(symbol)
-        stock = yf.Ticker(yf_symbol)
-        
-        hist = stock.history(period=yf_period)
+        if history_store is not None:
+            hist = await market_executor.run(
+                lambda: history_store.get_window(yf_symbol, "1d", yf_period, market_data.fetcher(yf_symbol))
+            )
+        else:
+            hist = await market_executor.run(lambda: market_data.history(yf_symbol, period=yf_period))
         if hist.empty:
             raise HTTPException(status_code=404, detail=f"No historical data found for symbol {symbol}")
         
-        data = []
-        for date, row in hist.iterrows():
-            data.append(HistoricalData(
-                date=date.strftime('%Y-%m-%d'),
-                price=float(row['Close'])
-            ))
-        
-        return data
+        return hist
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch historical data: {str(e)}")
 
+def fast_response(content: Any, response: Optional[Response] = None, encoded: Optional[bytes] = None):
+    """content ready-encoded when FAST_JSON_ENABLED, else left for FastAPI to validate and encode
+
+    encoded is content already encoded, if at hand; response is the route's
+    injected Response, whose headers are carried over.
+    """
+    if not FAST_JSON_ENABLED:
+        return content
+    body = encoded if encoded is not None else content
+    return fast_json.respond(response, body) if response is not None else JSONBytesResponse(body)
+
+def quote_response(request: Request, response: Response, stock_data: StockData, encoded: Optional[bytes] = None):
+    """stock_data with cache headers for what is left of its TTL, or a 304 if the client has it
+
+    encoded is its JSON as cached by storage, if at hand.
+    """
+    age = quote_age_seconds(stock_data) or 0.0
+    ttl = QUOTE_CACHE_TTL.total_seconds()
+    not_modified = conditional(
+        request,
+        response,
+        make_etag("quote", stock_data.symbol, stock_data.createdAt),
+        datetime.fromisoformat(stock_data.createdAt) if stock_data.createdAt else None,
+        max_age=ttl - age,
+        # Matches the window in which the server itself serves it stale
+        stale_while_revalidate=QUOTE_MAX_STALE.total_seconds() - max(age, ttl)
+    )
+    return not_modified or fast_response(stock_data, response, encoded)
+
+class HistoryPayload:
+    """One symbol/period/max_points history with its validators
+
+    Validators come from the bars; rows and body are only built the first
+    time a client needs them, so a 304 serializes nothing. Payloads are kept
+    in history_payloads until the store refetches the bars, so sequential
+    requests share one serialization as well as concurrent ones.
+    """
+
+    def __init__(self, symbol: str, period: str, max_points: Optional[int], hist: pd.DataFrame):
+        self.hist = hist
+        self.max_points = max_points
+        self.etag = make_etag(
+            "history", symbol.upper(), period, max_points, hist.index.tz,
+            hist.index.asi8.tobytes(), hist["Close"].to_numpy(dtype=float).tobytes()
+        )
+        # Only the history store knows when the bars were fetched and when they will be again
+        fetched_at = hist.attrs.get("fetchedAt")
+        self.last_modified = datetime.fromtimestamp(fetched_at, timezone.utc) if fetched_at is not None else None
+        self.refresh_at = hist.attrs.get("refreshAt")
+
+    @cached_property
+    def rows(self) -> List[Dict[str, Any]]:
+        return serialize_history(self.hist, max_points=self.max_points)
+
+    @cached_property
+    def body(self) -> bytes:
+        return fast_json.dumps(self.rows)
+
+    def response(self, request: Request, response: Response):
+        """The rows with cache headers until the store refreshes them, or a 304 if the client has them"""
+        not_modified = conditional(
+            request,
+            response,
+            self.etag,
+            self.last_modified,
+            max_age=self.refresh_at - time.time() if self.refresh_at is not None else 0
+        )
+        if not_modified:
+            return not_modified
+        if not FAST_JSON_ENABLED:
+            return self.rows
+        return fast_response(self.rows, response, self.body)
+
+async def load_history_payload(symbol: str, period: str, max_points: Optional[int]) -> HistoryPayload:
+    payload = HistoryPayload(symbol, period, max_points, await load_history(symbol, period))
+    if payload.refresh_at is not None:
+        history_payloads.put((symbol.upper(), period, max_points), payload, payload.refresh_at)
+    return payload
+
 async def search_stocks(query: str) -> List[StockSearch]:
     """Search for stocks with autocomplete"""
     try:
-        query = query.upper()
-        matches = []
-        
-        for symbol in NSE_STOCKS.keys():
-            if query in symbol:
-                matches.append(StockSearch(
-                    symbol=symbol,
-                    name=symbol  # We can enhance this with actual company names
-                ))
-        
-        # Limit to 10 results
-        return matches[:10]
+        return [StockSearch(symbol=symbol, name=name) for symbol, name in symbol_index.search(query, limit=10)]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to search stocks: {str(e)}")
 
-async def analyze_sentiment_with_openai(transcript: str, symbol: str) -> SentimentAnalysis:
-    """Analyze sentiment using OpenAI"""
-    try:
-        response = await asyncio.to_thread(
-            openai_client.chat.completions.create,
-            model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a financial sentiment analyst. Analyze the earnings call transcript and provide a comprehensive sentiment analysis. Return JSON in this exact format:
+# Sentiment prompt settings; bump the version whenever the prompt changes so
+# cached analyses from the old prompt are not reused
+SENTIMENT_MODEL = "gpt-4o"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
+SENTIMENT_TEMPERATURE = 0.3
+SENTIMENT_PROMPT_VERSION = "1"
+
+# Long transcripts are split into chunks of about this many words and scored in parallel
+SENTIMENT_CHUNK_WORDS = int(os.getenv("SENTIMENT_CHUNK_WORDS", "2500"))
+SENTIMENT_CHUNK_CONCURRENCY = int(os.getenv("SENTIMENT_CHUNK_CONCURRENCY", "4"))
+SENTIMENT_CHUNKED_MIN_WORDS = int(os.getenv("SENTIMENT_CHUNKED_MIN_WORDS", "4000"))
+SENTIMENT_SYSTEM_PROMPT = """You are a financial sentiment analyst. Analyze the earnings call transcript and provide a comprehensive sentiment analysis. Return JSON in this exact format:
                     {
                         "sentimentScore": number (1-10 scale),
                         "positiveCount": number,
@@ -340,6 +619,17 @@ async def analyze_sentiment_with_openai(transcript: str, symbol: str) -> Sentime
                         "keyHighlights": ["highlight1", "highlight2"],
                         "riskFactors": ["risk1", "risk2"]
                     }"""
+
+async def request_sentiment_completion(transcript: str, symbol: str) -> Tuple[Dict[str, Any], Optional[Dict[str, int]]]:
+    """Ask OpenAI for a sentiment analysis; returns the parsed JSON and token usage"""
+    with upstream_metrics.track("openai", "sentiment"):
+        response = await asyncio.to_thread(
+            openai_client.chat.completions.create,
+            model=SENTIMENT_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SENTIMENT_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -347,10 +637,71 @@ async def analyze_sentiment_with_openai(transcript: str, symbol: str) -> Sentime
                 }
             ],
             response_format={"type": "json_object"},
-            temperature=0.3
+            temperature=SENTIMENT_TEMPERATURE
         )
+    
+    usage = None
+    if getattr(response, "usage", None) is not None:
+        usage = {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens
+        }
+    return json.loads(response.choices[0].message.content), usage
 
-        analysis_result = json.loads(response.choices[0].message.content)
+async def request_chunked_sentiment(transcript: str, symbol: str) -> Tuple[Dict[str, Any], Optional[Dict[str, int]]]:
+    """Score transcript chunks concurrently through the async client and merge them"""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    
+    async def score_chunk(chunk: str, part: int, parts: int) -> Dict[str, Any]:
+        with upstream_metrics.track("openai", "sentiment_chunk"):
+            response = await async_openai_client.chat.completions.create(
+                model=SENTIMENT_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SENTIMENT_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Analyze part {part} of {parts} of this earnings call transcript for {symbol}:\n\n{chunk}"
+                    }
+                ],
+                response_format={"type": "json_object"},
+                temperature=SENTIMENT_TEMPERATURE
+            )
+        if getattr(response, "usage", None) is not None:
+            usage["prompt_tokens"] += response.usage.prompt_tokens
+            usage["completion_tokens"] += response.usage.completion_tokens
+        return json.loads(response.choices[0].message.content)
+    
+    chunks = split_transcript(transcript, SENTIMENT_CHUNK_WORDS)
+    result = await analyze_in_chunks(chunks, score_chunk, SENTIMENT_CHUNK_CONCURRENCY)
+    return result, usage
+
+async def analyze_sentiment_with_openai(transcript: str, symbol: str, chunked: Optional[bool] = None) -> SentimentAnalysis:
+    """Analyze sentiment using OpenAI"""
+    try:
+        if chunked is None:
+            chunked = len(transcript.split()) >= SENTIMENT_CHUNKED_MIN_WORDS
+        # Chunked results differ from single-pass ones, so they are cached separately
+        prompt_version = f"{SENTIMENT_PROMPT_VERSION}-chunked-{SENTIMENT_CHUNK_WORDS}" if chunked else SENTIMENT_PROMPT_VERSION
+        key = cache_key(transcript, symbol, prompt_version, SENTIMENT_MODEL, SENTIMENT_TEMPERATURE)
+        analysis_result = sentiment_cache.get(key)
+        if analysis_result is not None:
+            shared_cache.record("sentiment", "local")
+        else:
+            request_fn = request_chunked_sentiment if chunked else request_sentiment_completion
+            
+            async def fetch() -> Dict[str, Any]:
+                result, usage = await request_fn(transcript, symbol)
+                return {"result": result, "usage": usage}
+            
+            entry = await inflight.do(
+                ("analyze", symbol, key),
+                lambda: shared_cache.get_or_fetch("sentiment", key, sentiment_cache.ttl_seconds, fetch)
+            )
+            analysis_result = entry["result"]
+            sentiment_cache.put(key, analysis_result, entry["usage"])
         
         sentiment = SentimentAnalysis(
             stockSymbol=symbol,
@@ -370,16 +721,48 @@ async def analyze_sentiment_with_openai(transcript: str, symbol: str) -> Sentime
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
 
-async def generate_earnings_transcript_with_openai(company_name: str, quarter: str, year: str) -> str:
-    """Generate earnings call transcript using OpenAI"""
-    try:
-        response = await asyncio.to_thread(
-            openai_client.chat.completions.create,
-            model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""You are tasked with generating a realistic earnings call transcript for {company_name} for Q{quarter} {year}. 
+def analyze_sentiment_with_lexicon(transcript: str, symbol: str, result: Optional[Dict[str, Any]] = None) -> SentimentAnalysis:
+    """Analyze sentiment locally with the finance lexicon"""
+    result = result or lexicon_scorer.score(transcript)
+    sentiment = SentimentAnalysis(
+        stockSymbol=symbol,
+        transcriptText=transcript,
+        sentimentScore=result["sentimentScore"],
+        positiveCount=result["positiveCount"],
+        neutralCount=result["neutralCount"],
+        negativeCount=result["negativeCount"],
+        confidence=result["confidence"],
+        summary=result["summary"],
+        keyHighlights=result["keyHighlights"],
+        riskFactors=result["riskFactors"]
+    )
+    return storage.store_sentiment_analysis(sentiment)
+
+async def analyze_sentiment(transcript: str, symbol: str, mode: str = "llm", chunked: Optional[bool] = None) -> SentimentAnalysis:
+    """Analyze sentiment with the lexicon (fast), OpenAI (llm), or the lexicon escalating ambiguous cases to OpenAI (hybrid)"""
+    if mode == "fast":
+        sentiment_mode_counts["fast"] += 1
+        return analyze_sentiment_with_lexicon(transcript, symbol)
+    if mode == "hybrid":
+        result = lexicon_scorer.score(transcript)
+        if not lexicon_scorer.is_ambiguous(result, HYBRID_TONE_THRESHOLD, HYBRID_MIN_CONFIDENCE):
+            sentiment_mode_counts["hybridLocal"] += 1
+            return analyze_sentiment_with_lexicon(transcript, symbol, result)
+        sentiment_mode_counts["hybridEscalated"] += 1
+    else:
+        sentiment_mode_counts["llm"] += 1
+    return await analyze_sentiment_with_openai(transcript, symbol, chunked)
+
+EARNINGS_MODEL = "gpt-4o"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
+EARNINGS_TEMPERATURE = 0.7
+EARNINGS_MAX_TOKENS = 2000
+
+def earnings_transcript_messages(company_name: str, quarter: str, year: str) -> List[Dict[str, str]]:
+    """Chat messages asking OpenAI for an earnings call transcript"""
+    return [
+        {
+            "role": "system",
+            "content": f"""You are tasked with generating a realistic earnings call transcript for {company_name} for Q{quarter} {year}. 
                     Include:
                     - CEO opening remarks about quarterly performance
                     - CFO financial highlights (revenue, profit, margins)
@@ -389,29 +772,107 @@ async def generate_earnings_transcript_with_openai(company_name: str, quarter: s
                     - Forward-looking statements and guidance
                     
                     Make it sound professional and realistic, with specific financial metrics and business insights relevant to the Indian market and NSE-listed companies."""
-                },
-                {
-                    "role": "user",
-                    "content": f"Generate an earnings call transcript for {company_name} Q{quarter} {year} earnings call."
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
+        },
+        {
+            "role": "user",
+            "content": f"Generate an earnings call transcript for {company_name} Q{quarter} {year} earnings call."
+        }
+    ]
+
+async def generate_earnings_transcript_with_openai(company_name: str, quarter: str, year: str) -> str:
+    """Generate earnings call transcript using OpenAI"""
+    try:
+        with upstream_metrics.track("openai", "earnings"):
+            response = await asyncio.to_thread(
+                openai_client.chat.completions.create,
+                model=EARNINGS_MODEL,
+                messages=earnings_transcript_messages(company_name, quarter, year),
+                temperature=EARNINGS_TEMPERATURE,
+                max_tokens=EARNINGS_MAX_TOKENS
+            )
 
         return response.choices[0].message.content
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate transcript: {str(e)}")
 
+async def stream_earnings_transcript_with_openai(company_name: str, quarter: str, year: str) -> AsyncIterator[str]:
+    """Generate earnings call transcript using OpenAI, yielding text as it is produced"""
+    # Timed until the last token, not just until the stream opens
+    with upstream_metrics.track("openai", "earnings_stream"):
+        stream = await async_openai_client.chat.completions.create(
+            model=EARNINGS_MODEL,
+            messages=earnings_transcript_messages(company_name, quarter, year),
+            temperature=EARNINGS_TEMPERATURE,
+            max_tokens=EARNINGS_MAX_TOKENS,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+# Worker pool for bulk sentiment jobs; jobs live in this process, so it is
+# off by default in production and refused alongside several workers
+SENTIMENT_JOBS_ENABLED = jobs_enabled()
+sentiment_jobs = SentimentJobQueue(
+    analyze_fn=analyze_sentiment,
+    concurrency=int(os.getenv("SENTIMENT_JOB_WORKERS", "4")),
+    max_retries=int(os.getenv("SENTIMENT_JOB_RETRIES", "2")),
+    state_dir=os.getenv("SENTIMENT_JOB_DIR", "data/jobs"),
+    keep_finished=int(os.getenv("SENTIMENT_JOB_KEEP", "1000")),
+    finished_ttl=float(os.getenv("SENTIMENT_JOB_TTL_HOURS", "168")) * 3600
+)
+
+# Background refresher for the hot symbol set
+REFRESH_SYMBOLS = [
+    symbol.strip().upper()
+    for symbol in os.getenv("QUOTE_REFRESH_SYMBOLS", ",".join(NSE_STOCKS.keys())).split(",")
+    if symbol.strip()
+]
+quote_refresher = QuoteRefresher(
+    refresh_fn=refresh_hot_quotes,
+    symbols=REFRESH_SYMBOLS,
+    market_interval=float(os.getenv("QUOTE_REFRESH_INTERVAL", "60")),
+    off_hours_interval=float(os.getenv("QUOTE_REFRESH_OFF_HOURS_INTERVAL", "1800")),
+    quote_age_fn=lambda symbol: quote_age_seconds(storage.peek_stock_data(symbol))
+)
+
+async def poll_streamed_quote(symbol: str) -> StockData:
+    """Quote for the live stream, reusing one fetched this tick by a request or another worker"""
+    max_age = quote_hub.interval / 2
+    cached_data = storage.get_stock_data(symbol)
+    age = quote_age_seconds(cached_data)
+    if age is not None and age < max_age:
+        return cached_data
+    return await refresh_quote(symbol, max_age=max_age)
+
+# WebSocket fan-out: one poller per subscribed symbol, whatever the number of clients
+quote_hub = QuoteHub(
+    poll_fn=poll_streamed_quote,
+    interval=float(os.getenv("QUOTE_STREAM_INTERVAL", "10")),
+    send_timeout=float(os.getenv("QUOTE_STREAM_SEND_TIMEOUT", "5")),
+    max_symbols=MAX_BATCH_SYMBOLS
+)
+
 # Lifespan event handler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting FastAPI NSE Stock Analysis Server...")
+    startup_started = time.perf_counter()
+    if os.getenv("QUOTE_REFRESHER_ENABLED", "true").lower() == "true":
+        quote_refresher.start()
+    if SENTIMENT_JOBS_ENABLED:
+        sentiment_jobs.start()
+    log_ready("nse-stock-analysis-api", IMPORT_STARTED, startup_started)
     yield
     # Shutdown
     print("Shutting down FastAPI NSE Stock Analysis Server...")
+    await quote_hub.shutdown()
+    await sentiment_jobs.stop()
+    await quote_refresher.stop()
+    market_executor.shutdown()
+    storage.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -430,42 +891,205 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling; when disabled the middleware isn't installed at all
+profiler = None
+if os.getenv("PROFILING_ENABLED", "false").lower() == "true":
+    profiler = RequestProfiler(
+        os.getenv("PROFILE_DIR", "data/profiles"),
+        sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000,
+        keep=int(os.getenv("PROFILE_KEEP", "200")),
+        token=os.getenv("PROFILE_TOKEN") or None
+    )
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# gzip for large JSON bodies such as long histories and transcript lists;
+# level 1 gets most of the size reduction for a fraction of the CPU
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")),
+    level=int(os.getenv("GZIP_LEVEL", "1"))
+)
+
+# Outermost, so the latency it records covers every other middleware
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # API Routes
 @app.get("/api/stocks/{symbol}", response_model=StockData)
-async def get_stock(symbol: str):
+async def get_stock(symbol: str, request: Request, response: Response):
     """Get stock data for a given symbol"""
-    # Check if we have cached data
+    # Check if we have cached data less than 5 minutes old
     cached_data = storage.get_stock_data(symbol.upper())
-    if cached_data:
-        # Check if data is less than 5 minutes old
-        if cached_data.createdAt:
-            created_time = datetime.fromisoformat(cached_data.createdAt)
-            if datetime.now() - created_time < timedelta(minutes=5):
-                return cached_data
+    if is_quote_fresh(cached_data):
+        shared_cache.record("quote", "local")
+        return quote_response(request, response, cached_data, storage.get_stock_json(symbol.upper()))
+    
+    # Serve a recently expired quote immediately and refresh it behind the scenes
+    if is_quote_servable_stale(cached_data):
+        shared_cache.record("quote", "local")
+        revalidate_in_background(symbol)
+        return quote_response(request, response, cached_data, storage.get_stock_json(symbol.upper()))
+    
+    # Fetch fresh data from yfinance, sharing one fetch across concurrent callers
+    return quote_response(request, response, await refresh_quote(symbol))
+
+@app.websocket("/api/stocks/stream")
+async def stream_quotes(websocket: WebSocket, symbols: Optional[str] = None):
+    """Live quotes for subscribed symbols, pushing only the fields that changed"""
+    await quote_hub.serve(websocket, symbols.split(",") if symbols else ())
+
+@app.post("/api/stocks/batch", response_model=BatchQuoteResponse)
+async def get_stocks_batch(request: BatchQuoteRequest):
+    """Get stock data for many symbols in one call"""
+    # Normalize and de-duplicate while keeping the caller's order
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.symbols if symbol.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    
+    # Serve cache hits directly and fetch only the misses
+    quotes_by_symbol: Dict[str, StockData] = {}
+    encoded_by_symbol: Dict[str, bytes] = {}
+    misses = []
+    for symbol in symbols:
+        cached_data = storage.get_stock_data(symbol)
+        fresh = is_quote_fresh(cached_data)
+        if fresh or is_quote_servable_stale(cached_data):
+            quotes_by_symbol[symbol] = cached_data
+            encoded = storage.get_stock_json(symbol)
+            if encoded is not None:
+                encoded_by_symbol[symbol] = encoded
+            if not fresh:
+                revalidate_in_background(symbol)
+        else:
+            misses.append(symbol)
+    shared_cache.record("quote", "local", len(quotes_by_symbol))
+    
+    errors: List[BatchQuoteError] = []
+    if misses:
+        fetched, errors = await get_batch_stock_data(misses)
+        for stock_data in fetched:
+            quotes_by_symbol[stock_data.symbol] = stock_data
+    
+    quotes = [quotes_by_symbol[symbol] for symbol in symbols if symbol in quotes_by_symbol]
+    if not FAST_JSON_ENABLED:
+        return BatchQuoteResponse(quotes=quotes, errors=errors)
+    # BatchQuoteResponse spliced together from the cached quote bodies
+    encoded_quotes = fast_json.join_array(
+        encoded_by_symbol.get(stock_data.symbol) or fast_json.dumps(stock_data) for stock_data in quotes
+    )
+    return JSONBytesResponse(b'{"quotes":' + encoded_quotes + b',"errors":' + fast_json.dumps(errors) + b"}")
+
+@app.get("/api/stocks/{symbol}/fundamentals", response_model=Fundamentals, response_model_exclude_unset=True)
+async def get_fundamentals(symbol: str, fields: Optional[str] = Query(None, description="Comma-separated fields, default all")):
+    """Get fundamental ratios, optionally only the listed fields"""
+    requested = requested_fundamentals_fields(fields.split(",") if fields is not None else None)
+    try:
+        return await get_fundamentals_from_provider(symbol, requested)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch fundamentals: {str(e)}")
+
+@app.post("/api/stocks/fundamentals/batch", response_model=BatchFundamentalsResponse, response_model_exclude_unset=True)
+async def get_fundamentals_batch(request: BatchFundamentalsRequest):
+    """Get fundamentals for a whole watchlist in one call"""
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.symbols if symbol.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    requested = requested_fundamentals_fields(request.fields)
+    
+    # Cache hits return at once; misses share the info fetch limit of batch quotes
+    semaphore = asyncio.Semaphore(BATCH_INFO_CONCURRENCY)
     
-    # Fetch fresh data from yfinance
-    return await get_stock_data_from_yfinance(symbol)
+    async def fetch(symbol: str) -> Fundamentals:
+        async with semaphore:
+            return await get_fundamentals_from_provider(symbol, requested)
+    
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    fundamentals: List[Fundamentals] = []
+    errors: List[BatchQuoteError] = []
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            errors.append(BatchQuoteError(symbol=symbol, detail=f"Failed to fetch fundamentals: {str(result)}"))
+        else:
+            fundamentals.append(result)
+    return BatchFundamentalsResponse(fundamentals=fundamentals, errors=errors)
 
 @app.get("/api/stocks/{symbol}/history", response_model=List[HistoricalData])
-async def get_stock_history(symbol: str, period: str = "1D"):
-    """Get historical stock data"""
-    return await get_historical_data_from_yfinance(symbol, period)
+async def get_stock_history(symbol: str, request: Request, response: Response, period: str = "1D", max_points: Optional[int] = Query(None, ge=3)):
+    """Get historical stock data, optionally downsampled to max_points"""
+    payload = history_payloads.get((symbol.upper(), period, max_points))
+    if payload is None:
+        payload = await inflight.do(
+            ("history", symbol.upper(), (period, max_points)),
+            lambda: load_history_payload(symbol, period, max_points)
+        )
+    return payload.response(request, response)
 
 @app.get("/api/stocks/search/{query}", response_model=List[StockSearch])
 async def search_stocks_endpoint(query: str):
     """Search for stocks"""
-    return await search_stocks(query)
+    return fast_response(await search_stocks(query))
 
 @app.get("/api/stocks/recent", response_model=List[StockData])
 async def get_recent_stocks():
     """Get recent stock analyses"""
     recent_stocks = storage.get_all_stock_data()
-    return recent_stocks[:10]
+    return fast_response(recent_stocks[:10])
 
 @app.post("/api/stocks/{symbol}/analyze", response_model=SentimentAnalysis)
-async def analyze_stock_sentiment(symbol: str, request: AnalyzeRequest):
+async def analyze_stock_sentiment(symbol: str, request: AnalyzeRequest, mode: Literal["fast", "llm", "hybrid"] = "llm"):
     """Analyze sentiment of earnings call transcript"""
-    return await analyze_sentiment_with_openai(request.transcript, symbol.upper())
+    if not request.transcript.strip():
+        raise HTTPException(status_code=400, detail="Transcript is empty")
+    return await analyze_sentiment(request.transcript, symbol.upper(), mode, request.chunked)
+
+@app.post("/api/sentiment/jobs", response_model=SentimentJob, status_code=202)
+async def submit_sentiment_job(request: BulkAnalyzeRequest):
+    """Submit many transcripts for background sentiment analysis"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    empty = [item.symbol for item in request.items if not item.transcript.strip()]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"Empty transcript for {', '.join(empty)}")
+    try:
+        job = await sentiment_jobs.submit(
+            [item.model_dump() for item in request.items],
+            {"mode": request.mode, "chunked": request.chunked}
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return sentiment_jobs.summary(job)
+
+@app.get("/api/sentiment/jobs/{job_id}", response_model=SentimentJob)
+async def get_sentiment_job(job_id: str):
+    """Get progress of a bulk sentiment job"""
+    job = sentiment_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No sentiment job found")
+    return sentiment_jobs.summary(job)
+
+@app.get("/api/sentiment/jobs/{job_id}/events")
+async def stream_sentiment_job(job_id: str):
+    """Stream per-item progress of a bulk sentiment job as Server-Sent Events"""
+    if not sentiment_jobs.get(job_id):
+        raise HTTPException(status_code=404, detail="No sentiment job found")
+    
+    async def event_stream():
+        async for event in sentiment_jobs.events(job_id):
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/api/sentiment/jobs/{job_id}/retry", response_model=SentimentJob)
+async def retry_sentiment_job(job_id: str):
+    """Retry the failed items of a bulk sentiment job"""
+    job = await sentiment_jobs.retry_failed(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No sentiment job found")
+    return sentiment_jobs.summary(job)
 
 @app.get("/api/stocks/{symbol}/sentiment", response_model=SentimentAnalysis)
 async def get_sentiment_analysis(symbol: str):
@@ -473,7 +1097,7 @@ async def get_sentiment_analysis(symbol: str):
     sentiment = storage.get_sentiment_analysis(symbol.upper())
     if not sentiment:
         raise HTTPException(status_code=404, detail="No sentiment analysis found")
-    return sentiment
+    return fast_response(sentiment)
 
 @app.get("/api/stocks/{symbol}/earnings/{quarter}/{year}", response_model=EarningsCallTranscript)
 async def get_earnings_transcript(symbol: str, quarter: str, year: str):
@@ -483,6 +1107,11 @@ async def get_earnings_transcript(symbol: str, quarter: str, year: str):
         raise HTTPException(status_code=404, detail="No earnings call transcript found")
     return transcript
 
+@app.get("/api/stocks/{symbol}/earnings", response_model=List[EarningsCallTranscript])
+async def list_earnings_transcripts(symbol: str, limit: Optional[int] = Query(None, ge=1)):
+    """Stored earnings call transcripts, newest quarter first (e.g. limit=8 for the last 8 quarters)"""
+    return storage.get_earnings_transcripts(symbol.upper(), limit=limit)
+
 @app.get("/api/stocks/{symbol}/earnings/latest", response_model=EarningsCallTranscript)
 async def get_latest_earnings_transcript(symbol: str):
     """Get latest earnings call transcript"""
@@ -491,25 +1120,21 @@ async def get_latest_earnings_transcript(symbol: str):
         raise HTTPException(status_code=404, detail="No earnings call transcript found")
     return transcript
 
-@app.post("/api/stocks/{symbol}/earnings/generate", response_model=EarningsCallTranscript)
-async def generate_earnings_transcript(symbol: str, request: EarningsGenerateRequest):
-    """Generate earnings call transcript"""
+async def resolve_company_name(symbol: str) -> str:
+    """Company name for a symbol from cached or freshly fetched stock data"""
     # Get company name from stock data
     stock_data = storage.get_stock_data(symbol.upper())
     if not stock_data:
         # Try to fetch from yfinance
-        stock_data = await get_stock_data_from_yfinance(symbol)
-    
-    company_name = stock_data.name if stock_data else symbol
-    
-    transcript_text = await generate_earnings_transcript_with_openai(
-        company_name, request.quarter, request.year
-    )
+        stock_data = await refresh_quote(symbol)
     
-    transcript = EarningsCallTranscript(
+    return stock_data.name if stock_data else symbol
+
+def build_earnings_transcript(symbol: str, quarter: str, year: str, transcript_text: str) -> EarningsCallTranscript:
+    return EarningsCallTranscript(
         stockSymbol=symbol.upper(),
-        quarter=request.quarter,
-        year=request.year,
+        quarter=quarter,
+        year=year,
         transcript=transcript_text,
         speakers=[
             {"name": "CEO", "role": "Chief Executive Officer"},
@@ -517,8 +1142,205 @@ async def generate_earnings_transcript(symbol: str, request: EarningsGenerateReq
             {"name": "Analyst", "role": "Financial Analyst"}
         ]
     )
+
+def earnings_flight_key(symbol: str, quarter: str, year: str) -> Tuple[str, str, Tuple[str, str]]:
+    return ("earnings", symbol.upper(), (quarter, year))
+
+async def generate_and_store_earnings_transcript(symbol: str, quarter: str, year: str) -> EarningsCallTranscript:
+    """Generate an earnings call transcript with OpenAI and store it"""
+    company_name = await resolve_company_name(symbol)
+    
+    transcript_text = await generate_earnings_transcript_with_openai(
+        company_name, quarter, year
+    )
     
-    return storage.store_earnings_transcript(transcript)
+    return storage.store_earnings_transcript(build_earnings_transcript(symbol, quarter, year, transcript_text))
+
+@app.post("/api/stocks/{symbol}/earnings/generate", response_model=EarningsCallTranscript)
+async def generate_earnings_transcript(symbol: str, request: EarningsGenerateRequest):
+    """Generate earnings call transcript
+    
+    Idempotent per (symbol, quarter, year): a stored transcript is returned
+    as is, and a generation already running for that period is awaited.
+    """
+    existing = storage.get_earnings_transcript(symbol.upper(), request.quarter, request.year)
+    if existing:
+        return existing
+    return await inflight.do(
+        earnings_flight_key(symbol, request.quarter, request.year),
+        lambda: generate_and_store_earnings_transcript(symbol, request.quarter, request.year)
+    )
+
+# Text chunks a streamed transcript generation may get ahead of its client
+EARNINGS_STREAM_BUFFER = 256
+
+def log_generation_failure(task: asyncio.Task):
+    """Retrieve a finished generation's exception so it is logged once, not reported as never retrieved"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Earnings transcript generation failed: {task.exception()}")
+
+@app.post("/api/stocks/{symbol}/earnings/generate/stream")
+async def stream_earnings_transcript(symbol: str, request: EarningsGenerateRequest):
+    """Generate earnings call transcript, streaming text as Server-Sent Events
+    
+    Emits `data: {"text": ...}` events as the model produces output, then a
+    final `event: done` carrying the stored transcript (or `event: error`).
+    A stored transcript, or one another request is already generating, is
+    sent as a single text event once available.
+    """
+    existing = storage.get_earnings_transcript(symbol.upper(), request.quarter, request.year)
+    key = earnings_flight_key(symbol, request.quarter, request.year)
+    chunks: Optional[asyncio.Queue] = None
+    generation: Optional[asyncio.Task] = None
+    # Cleared when the client goes away, so generation stops queueing text for it
+    listening = True
+    
+    if existing is None:
+        owner = key not in inflight.in_flight
+        # Bounded, so a slow client holds the model stream back rather than growing a buffer
+        chunks = asyncio.Queue(maxsize=EARNINGS_STREAM_BUFFER) if owner else None
+        
+        async def generate() -> EarningsCallTranscript:
+            parts = []
+            try:
+                company_name = await resolve_company_name(symbol)
+                async for text in stream_earnings_transcript_with_openai(company_name, request.quarter, request.year):
+                    parts.append(text)
+                    if listening:
+                        await chunks.put(text)
+            finally:
+                if listening:
+                    await chunks.put(None)
+            transcript_text = "".join(parts)
+            if not transcript_text.strip():
+                raise RuntimeError("the model returned no text")
+            return storage.store_earnings_transcript(
+                build_earnings_transcript(symbol, request.quarter, request.year, transcript_text)
+            )
+        
+        generation = inflight.start(key, generate)
+        if owner:
+            # Retrieved here, since the client awaiting it may have disconnected
+            generation.add_done_callback(log_generation_failure)
+    
+    async def event_stream():
+        nonlocal listening
+        transcript = existing
+        if transcript is None:
+            try:
+                if chunks is not None:
+                    while (text := await chunks.get()) is not None:
+                        yield f"data: {json.dumps({'text': text})}\n\n"
+            finally:
+                listening = False
+                if chunks is not None:
+                    # Free a producer blocked on a full queue; it sees listening next time
+                    while not chunks.empty():
+                        chunks.get_nowait()
+            try:
+                # Shield so a disconnecting client doesn't cancel the shared generation
+                transcript = await asyncio.shield(generation)
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Failed to generate transcript: {str(e)}'})}\n\n"
+                return
+            if chunks is not None:
+                yield f"event: done\ndata: {transcript.model_dump_json()}\n\n"
+                return
+        
+        yield f"data: {json.dumps({'text': transcript.transcript})}\n\n"
+        yield f"event: done\ndata: {transcript.model_dump_json()}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/stats")
+async def get_stats():
+    """Get internal counters for caching and request coalescing"""
+    return {
+        "storage": storage.stats(),
+        "singleflight": inflight.stats(),
+        "marketDataProvider": market_data.stats(),
+        "marketDataExecutor": market_executor.stats(),
+        "quoteCache": {**swr_stats, "hotSet": quote_freshness(REFRESH_SYMBOLS)},
+        "quoteRefresher": quote_refresher.stats(),
+        "historyStore": history_store.stats() if history_store is not None else None,
+        "historyPayloads": history_payloads.stats(),
+        "sentimentCache": sentiment_cache.stats(),
+        "fundamentalsCache": fundamentals_cache.stats(),
+        "sharedCache": shared_cache.stats(),
+        "quoteStream": quote_hub.stats(),
+        "worker": {"mode": serve_mode(), **readiness},
+        "sentimentModes": sentiment_mode_counts
+    }
+
+@metrics.collector
+def collect_service_stats():
+    """Cache, executor and coalescing counters, read at scrape time"""
+    collections = {name: stats for name, stats in storage.stats().items() if name != "sqlite"}
+    for key, name, kind, help in [
+        ("hits", "storage_cache_hits_total", "counter", "Storage lookups served from memory"),
+        ("misses", "storage_cache_misses_total", "counter", "Storage lookups not found in memory"),
+        ("evictions", "storage_cache_evictions_total", "counter", "Storage entries evicted to stay within capacity"),
+        ("expirations", "storage_cache_expirations_total", "counter", "Storage entries dropped after their TTL"),
+        ("entries", "storage_cache_entries", "gauge", "Storage entries held in memory"),
+    ]:
+        yield stats_family(name, kind, help, (({"collection": collection}, stats.get(key)) for collection, stats in collections.items()))
+    
+    executor = market_executor.stats()
+    yield stats_family("market_data_executor_queue_depth", "gauge", "Market data calls waiting for a worker thread", [({}, executor["queued"])])
+    yield stats_family("market_data_executor_running", "gauge", "Market data calls running on worker threads", [({}, executor["running"])])
+    yield stats_family("singleflight_in_flight", "gauge", "Distinct upstream fetches currently shared by concurrent callers", [({}, inflight.stats()["inFlight"])])
+    
+    cache = sentiment_cache.stats()
+    yield stats_family("sentiment_cache_hits_total", "counter", "Sentiment analyses served from the cache", [({"tier": "memory"}, cache["memoryHits"]), ({"tier": "disk"}, cache["diskHits"])])
+    yield stats_family("sentiment_cache_misses_total", "counter", "Sentiment analyses not found in the cache", [({}, cache["misses"])])
+    yield stats_family("sentiment_cache_evictions_total", "counter", "Sentiment analyses evicted from the cache", [({}, cache["evictions"])])
+    
+    tiers = shared_cache.stats()["namespaces"]
+    yield stats_family("cache_lookups_total", "counter", "Cache lookups by the tier that answered (local, shared, peer worker, upstream)", (
+        ({"cache": cache, "tier": tier}, counts[tier]) for cache, counts in tiers.items() for tier in TIERS
+    ))
+    
+    stream = quote_hub.stats()
+    yield stats_family("quote_stream_connections", "gauge", "Open live quote WebSocket connections", [({}, stream["connections"])])
+    yield stats_family("quote_stream_symbols", "gauge", "Symbols with a live quote poller", [({}, stream["symbols"])])
+    yield stats_family("quote_stream_messages_total", "counter", "Live quote messages sent to clients", [({}, stream["messagesSent"])])
+    yield stats_family("quote_stream_updates_merged_total", "counter", "Quote updates merged into one still waiting for a slow client", [({}, stream["updatesMerged"])])
+    yield stats_family("quote_stream_evictions_total", "counter", "Live quote clients disconnected for not keeping up", [({}, stream["slowConsumersEvicted"])])
+    
+    cache = fundamentals_cache.stats()
+    yield stats_family("fundamentals_cache_hits_total", "counter", "Fundamentals parts served from the cache", (({"part": part}, hits) for part, hits in cache["hits"].items()))
+    yield stats_family("fundamentals_cache_misses_total", "counter", "Fundamentals parts fetched upstream", (({"part": part}, misses) for part, misses in cache["misses"].items()))
+
+async def require_profile_token(authorization: Optional[str] = Header(None)):
+    """Admin profile routes take PROFILE_TOKEN as a bearer token"""
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if profiler.token is None:
+        raise HTTPException(status_code=403, detail="Set PROFILE_TOKEN to read profiles")
+    if not profiler.authorized(authorization):
+        raise HTTPException(status_code=401, detail="Invalid profile token", headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """Recent request profiles, newest first"""
+    return await asyncio.to_thread(profiler.recent, limit)
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    """One profile as collapsed stacks, ready for flamegraph.pl, inferno or speedscope"""
+    folded = await asyncio.to_thread(profiler.load, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="No profile found")
+    return PlainTextResponse(folded)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Health check endpoint
 @app.get("/health")
@@ -535,9 +1357,5 @@ if os.path.exists("dist"):
         return FileResponse("dist/index.html")
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=int(os.getenv("PORT", "5000")),
-        reload=True
-    )
\ No newline at end of file
+    # Reload in development, worker processes with SERVE_MODE=production
+    run_api()
\ No newline at end of file
@@ -0,0 +1,440 @@
+"""
+Market data providers
+
+Every quote, history and fundamentals fetch goes through a MarketDataProvider,
+so the upstream can be swapped without touching the routes:
+
+- YFinanceProvider calls Yahoo Finance through yfinance;
+- SyntheticProvider generates deterministic NSE-like OHLCV and info data
+  offline, with configurable latency, jitter and failure rate, for load
+  tests, benchmarks and CI.
+
+Providers are blocking; callers run them on the market data executor.
+Frames use yfinance's layout (Open/High/Low/Close/Volume columns on a
+tz-aware DatetimeIndex).
+"""
+
+import abc
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from history_store import FetchFn
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+# Financial statements, named after the yfinance Ticker attributes
+STATEMENTS = ("financials", "balance_sheet", "cashflow")
+
+
+class ProviderError(Exception):
+    """Upstream market data request failed"""
+
+
+class MarketDataProvider(abc.ABC):
+    name = "base"
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        # Called as observer(method, seconds, failed) after every upstream call
+        self.observers: List[Callable[[str, float, bool], None]] = []
+
+    def _call(self, method: str, fn):
+        self.calls[method] += 1
+        started = time.perf_counter()
+        failed = False
+        try:
+            return fn()
+        except Exception:
+            self.failures[method] += 1
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for observer in self.observers:
+                observer(method, elapsed, failed)
+
+    @abc.abstractmethod
+    def info(self, symbol: str) -> Dict[str, Any]:
+        """Company metadata and key ratios, keyed like yfinance's Ticker.info"""
+
+    @abc.abstractmethod
+    def history(
+        self,
+        symbol: str,
+        period: Optional[str] = None,
+        interval: str = "1d",
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+    ) -> pd.DataFrame:
+        """OHLCV bars for a yfinance-style period, or for [start, end)"""
+
+    @abc.abstractmethod
+    def download(self, symbols: List[str], period: str) -> pd.DataFrame:
+        """Daily bars for many symbols in one request, columns grouped by ticker"""
+
+    @abc.abstractmethod
+    def statement(self, symbol: str, name: str) -> pd.DataFrame:
+        """One financial statement (see STATEMENTS), line items by fiscal year"""
+
+    def financials(self, symbol: str) -> Dict[str, pd.DataFrame]:
+        """Income statement, balance sheet and cash flow statements"""
+        return {name: self.statement(symbol, name) for name in STATEMENTS}
+
+    def fetcher(self, symbol: str) -> FetchFn:
+        """A HistoryStore fetch_fn that pulls an explicit date range for symbol"""
+        def fetch(interval: str, start: datetime, end: Optional[datetime]) -> pd.DataFrame:
+            return self.history(
+                symbol,
+                interval=interval,
+                start=start.strftime("%Y-%m-%d"),
+                end=end.strftime("%Y-%m-%d") if end is not None else None,
+            )
+        return fetch
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": self.name, "calls": dict(self.calls), "failures": dict(self.failures)}
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        return self._call("info", lambda: yf.Ticker(symbol).info)
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None) -> pd.DataFrame:
+        kwargs: Dict[str, Any] = {"interval": interval}
+        if start is not None:
+            kwargs["start"] = start
+            if end is not None:
+                kwargs["end"] = end
+        else:
+            kwargs["period"] = period or "1mo"
+        return self._call("history", lambda: yf.Ticker(symbol).history(**kwargs))
+
+    def download(self, symbols: List[str], period: str) -> pd.DataFrame:
+        return self._call("download", lambda: yf.download(
+            tickers=symbols,
+            period=period,
+            group_by="ticker",
+            auto_adjust=False,
+            threads=True,
+            progress=False
+        ))
+
+    def statement(self, symbol: str, name: str) -> pd.DataFrame:
+        if name not in STATEMENTS:
+            raise ValueError(f"Unknown statement {name!r}")
+        # Each Ticker statement attribute is its own request
+        return self._call("statement", lambda: getattr(yf.Ticker(symbol), name))
+
+
+# Synthetic data
+
+IST = "Asia/Kolkata"
+EPOCH = pd.Timestamp("2000-01-03")  # a Monday; the daily random walk starts here
+# The walk is pinned to each symbol's base price here, keeping recent prices realistic
+ANCHOR_ORDINAL = int(np.busday_count(EPOCH.date(), pd.Timestamp("2025-01-01").date()))
+# Symbols whose full daily walk is kept (about 55 KB each)
+CLOSES_CACHE_SIZE = 256
+SESSION_OPEN = timedelta(hours=9, minutes=15)
+SESSION_CLOSE = timedelta(hours=15, minutes=30)
+
+INTERVALS = {
+    "1m": timedelta(minutes=1), "2m": timedelta(minutes=2), "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15), "30m": timedelta(minutes=30), "60m": timedelta(hours=1),
+    "90m": timedelta(minutes=90), "1h": timedelta(hours=1), "1d": timedelta(days=1),
+}
+# Periods counted in trading sessions; the rest are calendar offsets
+SESSION_PERIODS = {"1d": 1, "2d": 2, "5d": 5}
+CALENDAR_PERIODS = {
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def naive_ist(value: DateLike) -> pd.Timestamp:
+    """A date or timestamp as naive IST wall time"""
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_convert(IST).tz_localize(None) if timestamp.tz is not None else timestamp
+
+
+def business_days(start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+    """Weekdays in [start, end); numpy's calendar is far cheaper than pd.bdate_range"""
+    days = np.arange(start.to_datetime64().astype("datetime64[D]"), end.to_datetime64().astype("datetime64[D]"))
+    return pd.DatetimeIndex(days[np.is_busday(days)].astype("datetime64[ns]"))
+
+
+def symbol_seed(symbol: str, seed: int) -> int:
+    digest = hashlib.sha256(f"{seed}:{symbol.upper()}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def hashed_uniform(keys: np.ndarray, salt: int) -> np.ndarray:
+    """Uniform (0, 1) values that depend only on (key, salt), via splitmix64"""
+    with np.errstate(over="ignore"):
+        z = keys.astype(np.uint64) + np.uint64(salt & 0xFFFFFFFFFFFFFFFF)
+        z = (z + np.uint64(0x9E3779B97F4A7C15)) & MASK64
+        z = ((z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & MASK64
+        z = ((z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & MASK64
+        z = z ^ (z >> np.uint64(31))
+    return ((z >> np.uint64(11)).astype(np.float64) + 0.5) / float(1 << 53)
+
+
+def hashed_normal(keys: np.ndarray, salt: int) -> np.ndarray:
+    u1 = hashed_uniform(keys, salt)
+    u2 = hashed_uniform(keys, salt ^ 0x5DEECE66D)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic offline market data
+
+    Each symbol follows a daily geometric random walk from 2000-01-03 whose
+    drift, volatility and 2025-01-01 price level derive from a hash of the
+    symbol, so any window of the same series is identical across calls,
+    processes and machines. Intraday bars follow a Brownian bridge from each session's
+    open to its close over NSE hours (09:15-15:30 IST, weekdays).
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        names: Optional[Dict[str, str]] = None,
+        clock=None,
+    ):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.names = names or {}
+        self.clock = clock or (lambda: pd.Timestamp.now(tz=IST))
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.closes: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.closes_lock = threading.Lock()
+
+    # Request simulation
+
+    def _call(self, method: str, fn):
+        def simulated():
+            self._simulate(method)
+            return fn()
+        return super()._call(method, simulated)
+
+    def _simulate(self, method: str):
+        with self.rng_lock:
+            delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+            fail = self.rng.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ProviderError(f"Synthetic {method} failure")
+
+    # Price model
+
+    def _params(self, symbol: str):
+        h = symbol_seed(symbol, self.seed)
+        base_price = 50 * 10 ** ((h & 0xFFFF) / 0xFFFF * 2.5)  # 50 .. ~16,000
+        drift = ((h >> 16) & 0xFF) / 0xFF * 0.0008 - 0.0002  # daily log drift
+        volatility = 0.01 + ((h >> 24) & 0xFF) / 0xFF * 0.025  # daily log volatility
+        return h, base_price, drift, volatility
+
+    def _daily_closes(self, symbol: str, days: int) -> np.ndarray:
+        """Close for each business day from EPOCH through day index `days`"""
+        with self.closes_lock:
+            closes = self.closes.get(symbol)
+            if closes is not None and len(closes) > days:
+                self.closes.move_to_end(symbol)
+                return closes[:days + 1]
+        h, base_price, drift, volatility = self._params(symbol)
+        shocks = hashed_normal(np.arange(max(days, ANCHOR_ORDINAL) + 1), h)
+        log_path = np.cumsum(drift + volatility * shocks)
+        closes = base_price * np.exp(log_path[:days + 1] - log_path[ANCHOR_ORDINAL])
+        with self.closes_lock:
+            self.closes[symbol] = closes
+            while len(self.closes) > CLOSES_CACHE_SIZE:
+                self.closes.popitem(last=False)
+        return closes
+
+    def _sessions(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+        """Business days in [start, end), as naive IST dates"""
+        return business_days(max(start.normalize(), EPOCH), end)
+
+    def _daily_bars(self, symbol: str, days: pd.DatetimeIndex) -> pd.DataFrame:
+        h, _, _, volatility = self._params(symbol)
+        day_index = np.asarray((days - EPOCH).days, dtype=np.int64)
+        # Business-day ordinal so weekends don't leave gaps in the walk
+        ordinals = np.busday_count(EPOCH.date(), days.values.astype("datetime64[D]"))
+        closes = self._daily_closes(symbol, int(ordinals.max()) if len(ordinals) else 0)
+        close = closes[ordinals]
+        previous = np.where(ordinals > 0, closes[np.maximum(ordinals - 1, 0)], close)
+        gap = 1 + 0.3 * volatility * hashed_normal(day_index, h ^ 1)
+        open_ = previous * gap
+        spread = np.abs(hashed_normal(day_index, h ^ 2)) * volatility * 0.6
+        high = np.maximum(open_, close) * (1 + spread)
+        low = np.minimum(open_, close) * (1 - spread * hashed_uniform(day_index, h ^ 3))
+        volume = np.round(5e5 * 10 ** (1.5 * hashed_uniform(day_index, h ^ 4)) * (1 + 20 * np.abs(close / previous - 1)))
+        index = pd.DatetimeIndex(days).tz_localize(IST)
+        return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+    def _intraday_bars(self, symbol: str, days: pd.DatetimeIndex, step: timedelta, until: pd.Timestamp) -> pd.DataFrame:
+        h, _, _, volatility = self._params(symbol)
+        daily = self._daily_bars(symbol, days)
+        per_session = int((SESSION_CLOSE - SESSION_OPEN) / step)
+        frames = []
+        offsets = pd.TimedeltaIndex(SESSION_OPEN + step * np.arange(per_session))
+        fraction = np.arange(1, per_session + 1) / per_session
+        for day, row in zip(days, daily.itertuples()):
+            times = pd.Timestamp(day).tz_localize(IST) + offsets
+            keys = times.as_unit("s").asi8
+            # Brownian bridge from the session open to its close; built for the
+            # whole session before trimming so a session in progress matches
+            # the same session fetched later
+            walk = np.cumsum(hashed_normal(keys, h ^ 5) * volatility / np.sqrt(per_session))
+            path = row.Open * np.exp(np.log(row.Close / row.Open) * fraction + walk - fraction * walk[-1])
+            opens = np.concatenate(([row.Open], path[:-1]))
+            wick = np.abs(hashed_normal(keys, h ^ 6)) * volatility / np.sqrt(per_session) * 0.5
+            bars = pd.DataFrame({
+                "Open": opens,
+                "High": np.maximum(opens, path) * (1 + wick),
+                "Low": np.minimum(opens, path) * (1 - wick),
+                "Close": path,
+                "Volume": np.round(row.Volume / per_session * (0.5 + hashed_uniform(keys, h ^ 7))),
+            }, index=times)
+            frames.append(bars[bars.index < until])
+        frames = [bars for bars in frames if len(bars)]
+        if not frames:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"], index=pd.DatetimeIndex([], tz=IST))
+        return pd.concat(frames)
+
+    def _window(self, period: Optional[str], start: Optional[DateLike], end: Optional[DateLike], now: pd.Timestamp):
+        today = now.tz_localize(None).normalize()
+        tomorrow = today + timedelta(days=1)
+        if start is not None:
+            last = min(naive_ist(end), tomorrow) if end is not None else tomorrow
+            return self._sessions(naive_ist(start), last)
+        period = period or "1mo"
+        # Today's session counts once it has opened
+        sessions_end = tomorrow if now.tz_localize(None) >= today + SESSION_OPEN else today
+        if period in SESSION_PERIODS:
+            last = sessions_end.to_datetime64().astype("datetime64[D]") - 1
+            first = np.busday_offset(last, 1 - SESSION_PERIODS[period], roll="backward")
+            return business_days(pd.Timestamp(first), sessions_end)
+        if period == "ytd":
+            return self._sessions(today.replace(month=1, day=1), sessions_end)
+        if period == "max":
+            return self._sessions(EPOCH, sessions_end)
+        return self._sessions(today - CALENDAR_PERIODS.get(period, CALENDAR_PERIODS["1mo"]), sessions_end)
+
+    def _bars(self, symbol: str, period=None, interval="1d", start=None, end=None) -> pd.DataFrame:
+        now = self.clock()
+        days = self._window(period, start, end, now)
+        step = INTERVALS.get(interval, INTERVALS["1d"])
+        if step >= INTERVALS["1d"]:
+            bars = self._daily_bars(symbol, days)
+            # A session in progress shows today's bar only after the open
+            return bars[bars.index <= now]
+        return self._intraday_bars(symbol, days, step, now)
+
+    def _info(self, symbol: str) -> Dict[str, Any]:
+        h, _, _, _ = self._params(symbol)
+        base = symbol.upper().split(".")[0]
+        price = float(self._bars(symbol, "5d")["Close"].iloc[-1])
+        u = hashed_uniform(np.arange(12, dtype=np.int64), h)
+        shares = 10 ** (7.5 + 2.5 * u[0])
+        eps = price / (8 + 52 * u[1])
+        book_value = price / (1 + 9 * u[2])
+        name = self.names.get(base, f"{base.title()} Limited")
+        return {
+            "symbol": symbol.upper(),
+            "longName": name,
+            "shortName": name.upper(),
+            "currency": "INR",
+            "exchange": "NSI",
+            "regularMarketPrice": price,
+            "marketCap": price * shares,
+            "sharesOutstanding": shares,
+            "trailingPE": price / eps,
+            "trailingEps": eps,
+            "pegRatio": 0.5 + 2.5 * u[3],
+            "bookValue": book_value,
+            "priceToBook": price / book_value,
+            "priceToSalesTrailing12Months": 0.5 + 9.5 * u[4],
+            "dividendYield": round(3 * u[5], 2),
+            "returnOnEquity": 0.05 + 0.25 * u[6],
+            "returnOnAssets": 0.01 + 0.12 * u[7],
+            "debtToEquity": 150 * u[8],
+            "currentRatio": 0.8 + 2.2 * u[9],
+            "quickRatio": 0.5 + 1.8 * u[9],
+            "revenueGrowth": -0.1 + 0.4 * u[10],
+            "profitMargins": 0.02 + 0.25 * u[11],
+            "operatingMargins": 0.05 + 0.3 * u[11],
+        }
+
+    def _statement(self, symbol: str, name: str) -> pd.DataFrame:
+        h = self._params(symbol)[0]
+        # Four fiscal years ending in March, newest first like yfinance
+        latest = self.clock().year - 1
+        years = pd.DatetimeIndex([f"{year}-03-31" for year in range(latest, latest - 4, -1)])
+        growth = 1 + 0.1 * hashed_normal(np.arange(4, dtype=np.int64), h)
+        revenue = 1e10 * (1 + (h & 0xFF)) * np.cumprod(1 / growth)
+        if name == "financials":
+            interest = revenue * 0.15 / (2 + 18 * ((h >> 8) & 0xFF) / 255)
+            return pd.DataFrame(
+                [revenue, revenue * 0.15, revenue * 0.15, interest, revenue * 0.1],
+                index=["Total Revenue", "Operating Income", "EBIT", "Interest Expense", "Net Income"], columns=years
+            )
+        if name == "balance_sheet":
+            return pd.DataFrame([revenue * 1.5, revenue * 0.6], index=["Total Assets", "Total Debt"], columns=years)
+        if name == "cashflow":
+            return pd.DataFrame([revenue * 0.12, -revenue * 0.05], index=["Operating Cash Flow", "Capital Expenditure"], columns=years)
+        raise ValueError(f"Unknown statement {name!r}")
+
+    # Provider interface
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        return self._call("info", lambda: self._info(symbol))
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None) -> pd.DataFrame:
+        return self._call("history", lambda: self._bars(symbol, period, interval, start, end))
+
+    def download(self, symbols: List[str], period: str) -> pd.DataFrame:
+        return self._call("download", lambda: pd.concat({symbol: self._bars(symbol, period) for symbol in symbols}, axis=1))
+
+    def statement(self, symbol: str, name: str) -> pd.DataFrame:
+        return self._call("statement", lambda: self._statement(symbol, name))
+
+
+def create_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """Provider named by MARKET_DATA_PROVIDER (yfinance or synthetic)"""
+    name = (name or os.getenv("MARKET_DATA_PROVIDER", "yfinance")).lower()
+    if name == "synthetic":
+        return SyntheticProvider(
+            latency=float(os.getenv("SYNTHETIC_LATENCY_MS", "0")) / 1000,
+            jitter=float(os.getenv("SYNTHETIC_JITTER_MS", "0")) / 1000,
+            failure_rate=float(os.getenv("SYNTHETIC_FAILURE_RATE", "0")),
+            seed=int(os.getenv("SYNTHETIC_SEED", "0")),
+        )
+    if name == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Unknown market data provider: {name}")
@@ -0,0 +1,71 @@
+"""
+Bounded executor for blocking market-data I/O
+
+yfinance is synchronous, so every call is pushed onto a dedicated thread
+pool to keep the event loop free for other requests.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class MarketDataExecutor:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _wrap(self, fn: Callable[[], Any], submitted_at: float) -> Any:
+        """Track queue wait time and running count around fn"""
+        wait = time.perf_counter() - submitted_at
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+            self.started += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return fn()
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the pool and await its result"""
+        with self.lock:
+            self.queued += 1
+        call = functools.partial(fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._wrap, call, time.perf_counter())
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, utilisation and wait times"""
+        with self.lock:
+            return {
+                "maxWorkers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avgWaitMs": (self.total_wait / self.started * 1000) if self.started else 0.0,
+                "maxWaitMs": self.max_wait * 1000,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
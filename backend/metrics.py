@@ -0,0 +1,289 @@
+"""
+Prometheus metrics
+
+A small in-process registry that renders the Prometheus text exposition
+format, so /metrics needs no client library and can be read directly in
+tests. Metrics updated on request paths (counters, gauges, histograms) are
+plain Python objects whose updates cost about a microsecond; figures
+that already live elsewhere (storage and cache counters, executor queue
+depth) are pulled from collectors at scrape time instead of being
+mirrored on every call.
+"""
+
+import abc
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+# (metric name, type, help, [(label values by name, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+HTTP_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Labels, object] = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for one combination of label values, created on first use"""
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """State for one combination of label values"""
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for every child"""
+
+
+class Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield self.name, dict(zip(self.labelnames, values)), child.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Buckets:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            labels = dict(zip(self.labelnames, values))
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[Family]]):
+        """Register fn to produce metric families from existing stats at scrape time"""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class UpstreamMetrics:
+    """Latency, error and in-flight metrics for calls to an external service"""
+
+    def __init__(self, registry: Registry):
+        self.duration = registry.histogram(
+            "upstream_request_duration_seconds", "Latency of calls to upstream services",
+            ("upstream", "operation"), UPSTREAM_BUCKETS
+        )
+        self.errors = registry.counter(
+            "upstream_errors_total", "Failed calls to upstream services", ("upstream", "operation")
+        )
+        self.in_flight = registry.gauge(
+            "upstream_requests_in_flight", "Calls to upstream services currently outstanding", ("upstream",)
+        )
+
+    def observe(self, upstream: str, operation: str, seconds: float, failed: bool):
+        self.duration.labels(upstream, operation).observe(seconds)
+        if failed:
+            self.errors.labels(upstream, operation).inc()
+
+    def track(self, upstream: str, operation: str) -> "UpstreamCall":
+        """Context manager timing one call, including across awaits"""
+        return UpstreamCall(self, upstream, operation)
+
+
+class UpstreamCall:
+    __slots__ = ("metrics", "upstream", "operation", "started")
+
+    def __init__(self, metrics: UpstreamMetrics, upstream: str, operation: str):
+        self.metrics = metrics
+        self.upstream = upstream
+        self.operation = operation
+
+    def __enter__(self):
+        self.metrics.in_flight.labels(self.upstream).inc()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.upstream, self.operation, time.perf_counter() - self.started, exc_type is not None)
+        self.metrics.in_flight.labels(self.upstream).dec()
+        return False
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template and status
+
+    Written against raw ASGI rather than BaseHTTPMiddleware, which adds a
+    task and a memory stream to every request.
+    """
+
+    def __init__(self, app, registry: Registry, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template and status",
+            ("method", "route", "status")
+        )
+        # Only touched on the event loop, so a plain int read at scrape time
+        # is enough and saves two locked updates per request
+        self.in_flight = 0
+        registry.collector(lambda: [stats_family(
+            "http_requests_in_flight", "gauge", "HTTP requests currently being handled", [({}, self.in_flight)]
+        )])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            # The router leaves the matched route in scope; label by its
+            # template so /api/stocks/TCS and /api/stocks/INFY share a series
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            self.duration.labels(scope["method"], template, str(status)).observe(elapsed)
+
+
+def stats_family(name: str, kind: str, help: str, samples: Iterable[Tuple[Dict[str, str], Optional[float]]]) -> Family:
+    """A collector family, skipping samples whose value is missing"""
+    return name, kind, help, [(labels, value) for labels, value in samples if value is not None]
@@ -0,0 +1,131 @@
+"""
+Pydantic models for the NSE Stock Analysis API
+"""
+
+from typing import List, Optional, Dict, Literal
+from pydantic import BaseModel
+
+class StockData(BaseModel):
+    id: Optional[int] = None
+    symbol: str
+    name: str
+    price: float
+    openPrice: float
+    highPrice: float
+    lowPrice: float
+    volume: str
+    change: float
+    changePercent: float
+    marketCap: Optional[str] = None
+    peRatio: Optional[float] = None
+    createdAt: Optional[str] = None
+
+class HistoricalData(BaseModel):
+    date: str
+    price: float
+
+class StockSearch(BaseModel):
+    symbol: str
+    name: str
+
+class SentimentAnalysis(BaseModel):
+    id: Optional[int] = None
+    stockSymbol: str
+    transcriptText: str
+    sentimentScore: float
+    positiveCount: int
+    neutralCount: int
+    negativeCount: int
+    confidence: float
+    summary: str
+    keyHighlights: List[str]
+    riskFactors: List[str]
+    createdAt: Optional[str] = None
+
+class EarningsCallTranscript(BaseModel):
+    id: Optional[int] = None
+    stockSymbol: str
+    quarter: str
+    year: str
+    transcript: str
+    speakers: List[Dict[str, str]]
+    createdAt: Optional[str] = None
+
+class AnalyzeRequest(BaseModel):
+    transcript: str
+    # None picks chunked map-reduce automatically for long transcripts
+    chunked: Optional[bool] = None
+
+class EarningsGenerateRequest(BaseModel):
+    quarter: str
+    year: str
+
+class BulkAnalyzeItem(BaseModel):
+    symbol: str
+    transcript: str
+
+class BulkAnalyzeRequest(BaseModel):
+    items: List[BulkAnalyzeItem]
+    chunked: Optional[bool] = None
+    mode: Literal["fast", "llm", "hybrid"] = "llm"
+
+class SentimentJobItem(BaseModel):
+    symbol: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    sentimentId: Optional[int] = None
+    sentimentScore: Optional[float] = None
+
+class SentimentJob(BaseModel):
+    id: str
+    status: str
+    total: int
+    pending: int
+    running: int
+    completed: int
+    failed: int
+    createdAt: str
+    updatedAt: str
+    items: List[SentimentJobItem]
+
+class BatchQuoteRequest(BaseModel):
+    symbols: List[str]
+
+class BatchQuoteError(BaseModel):
+    symbol: str
+    detail: str
+
+class BatchQuoteResponse(BaseModel):
+    quotes: List[StockData]
+    errors: List[BatchQuoteError]
+
+class Fundamentals(BaseModel):
+    # Only the requested fields are set, and only set fields are returned
+    stockSymbol: str
+    marketCap: Optional[float] = None
+    peRatio: Optional[float] = None
+    pegRatio: Optional[float] = None
+    bookValue: Optional[float] = None
+    dividendYield: Optional[float] = None
+    roe: Optional[float] = None
+    debtToEquity: Optional[float] = None
+    currentRatio: Optional[float] = None
+    revenueGrowth: Optional[float] = None
+    profitMargin: Optional[float] = None
+    operatingMargin: Optional[float] = None
+    eps: Optional[float] = None
+    priceToBook: Optional[float] = None
+    priceToSales: Optional[float] = None
+    quickRatio: Optional[float] = None
+    interestCoverage: Optional[float] = None
+    assetTurnover: Optional[float] = None
+    returnOnAssets: Optional[float] = None
+
+class BatchFundamentalsRequest(BaseModel):
+    symbols: List[str]
+    fields: Optional[List[str]] = None
+
+class BatchFundamentalsResponse(BaseModel):
+    fundamentals: List[Fundamentals]
+    errors: List[BatchQuoteError]
@@ -0,0 +1,291 @@
+"""
+On-demand request profiling
+
+A profiled request gets a sampler thread that, every few milliseconds,
+records where the request's asyncio task is:
+
+- running on the event loop: the live Python stack, trimmed to the
+  task's own frames;
+- suspended: the chain of awaiting coroutines down to the future it is
+  blocked on, so time spent waiting on OpenAI or the market data executor
+  shows up under the coroutine that awaited it.
+
+Tasks the request spawns (single-flight leaders, gathered chunks) are
+followed through a task factory and drawn under the frame awaiting them.
+
+Each sample is weighted by the wall time since the previous one and the
+result is written as collapsed stacks ("frame;frame;frame weight"), the
+input format of flamegraph.pl, inferno and speedscope. Nothing here runs
+unless the middleware is installed.
+"""
+
+import asyncio
+import hmac
+import json
+import random
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+SLUG = re.compile(r"[^A-Za-z0-9]+")
+PROFILE_ID = re.compile(r"^[A-Za-z0-9-]+$")
+
+
+def frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        path = Path(code.co_filename)
+        name = getattr(code, "co_qualname", code.co_name)
+        # Semicolons separate frames in the collapsed format
+        label = f"{name} ({path.parent.name}/{path.name}:{code.co_firstlineno})".replace(";", ":")
+        cache[code] = label
+    return label
+
+
+class ProfileSession:
+    def __init__(self, task: asyncio.Task, root_frame, thread_id: int, interval: float):
+        self.task = task
+        # Stacks start here, so the server's own frames above the request are left out
+        self.root_frame = root_frame
+        self.thread_id = thread_id
+        self.interval = interval
+        # Tasks spawned while handling the request, by the task that spawned them
+        self.children: Dict[asyncio.Task, List[asyncio.Task]] = {}
+        self.weights: Counter = Counter()
+        self.labels: Dict[Any, str] = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+    def stop(self) -> float:
+        self.stopped.set()
+        self.thread.join()
+        return time.perf_counter() - self.started
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+            live = []
+            frame = sys._current_frames().get(self.thread_id)
+            while frame is not None:
+                live.append(frame)
+                frame = frame.f_back
+            live.reverse()
+            self._sample(self.task, [], self.root_frame, live, (now - last) * 1e6)
+            last = now
+
+    def _task_stack(self, task: asyncio.Task, start_frame, live: List[Any]) -> List[str]:
+        """Frames of one task from start_frame down, ending in what it awaits if suspended"""
+        coro = task.get_coro()
+        outer = getattr(coro, "cr_frame", None)
+        if outer is None:
+            return []
+        start_frame = start_frame or outer
+        # Running: the loop thread's stack passes through the task's frames
+        for index, frame in enumerate(live):
+            if frame is start_frame:
+                return [frame_label(f.f_code, self.labels) for f in live[index:]]
+        # Suspended: follow the await chain down to whatever it is waiting on
+        stack = []
+        awaitable = coro
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                if stack:
+                    stack.append(f"[await {type(awaitable).__name__}]")
+                break
+            if stack or frame is start_frame:
+                stack.append(frame_label(frame.f_code, self.labels))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return stack
+
+    def _sample(self, task: asyncio.Task, prefix: List[str], start_frame, live: List[Any], weight: float):
+        stack = prefix + self._task_stack(task, start_frame, live)
+        if len(stack) == len(prefix):
+            return
+        children = [child for child in self.children.get(task, ()) if not child.done()]
+        if children and stack[-1].startswith("[await"):
+            # A task waiting on its own children: show their stacks under the
+            # awaiting frame instead, sharing the time so widths stay wall time
+            for child in children:
+                self._sample(child, stack[:-1], None, live, weight / len(children))
+            return
+        self.weights[";".join(stack)] += max(int(weight), 1)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {weight}\n" for stack, weight in self.weights.most_common())
+
+
+class RequestProfiler:
+    """Writes one collapsed-stack profile per sampled or explicitly requested request"""
+
+    def __init__(
+        self,
+        out_dir: str,
+        sample_rate: float = 0.0,
+        interval: float = 0.002,
+        keep: int = 200,
+        token: Optional[str] = None,
+    ):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        # X-Profile must carry this value; without a token the header is ignored
+        self.token = token.encode() if token else None
+        self.interval = interval
+        self.keep = keep
+        self.sequence = count()
+        self.profiled = 0
+        # Every task belonging to a request being profiled, root or spawned
+        self.sessions: Dict[asyncio.Task, ProfileSession] = {}
+        self.loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+    def should_profile(self, headers: Sequence) -> bool:
+        for name, value in headers:
+            if name == b"x-profile" and self.token is not None:
+                return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def authorized(self, authorization: Optional[str]) -> bool:
+        """Whether an Authorization header carries the token as a bearer credential
+
+        Saved profiles expose source paths and arguments, so without a
+        token nobody may read them.
+        """
+        if self.token is None or not authorization:
+            return False
+        scheme, _, credentials = authorization.partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), self.token)
+
+    def _track_spawned_tasks(self, loop: asyncio.AbstractEventLoop):
+        """Wrap the loop's task factory so tasks spawned by a profiled request are followed"""
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            parent = asyncio.current_task(loop)
+            session = self.sessions.get(parent)
+            if session is not None:
+                session.children.setdefault(parent, []).append(task)
+                self.sessions[task] = session
+                task.add_done_callback(self._forget)
+            return task
+
+        loop.set_task_factory(factory)
+        self.loops.add(loop)
+
+    def _forget(self, task: asyncio.Task):
+        self.sessions.pop(task, None)
+
+    def start(self, root_frame) -> ProfileSession:
+        loop = asyncio.get_running_loop()
+        if loop not in self.loops:
+            self._track_spawned_tasks(loop)
+        task = asyncio.current_task()
+        session = ProfileSession(task, root_frame, threading.get_ident(), self.interval)
+        self.sessions[task] = session
+        session.start()
+        return session
+
+    def finish(self, session: ProfileSession) -> float:
+        elapsed = session.stop()
+        self.sessions.pop(session.task, None)
+        return elapsed
+
+    def new_id(self, method: str, route: str) -> str:
+        """Sortable, filesystem-safe id such as 20250718T101500-3-get-api-stocks-symbol"""
+        slug = SLUG.sub("-", route).strip("-")[:60] or "root"
+        return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{next(self.sequence)}-{method.lower()}-{slug}"
+
+    def save(self, session: ProfileSession, profile_id: str, elapsed: float, meta: Dict[str, Any]):
+        (self.out_dir / f"{profile_id}.folded").write_text(session.collapsed())
+        (self.out_dir / f"{profile_id}.json").write_text(json.dumps({
+            "id": profile_id,
+            **meta,
+            "durationMs": round(elapsed * 1000, 3),
+            "stacks": len(session.weights),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        }))
+        self.profiled += 1
+        self._prune()
+
+    def _prune(self):
+        metas = sorted(self.out_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in metas[:max(len(metas) - self.keep, 0)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Metadata of the newest profiles first"""
+        metas = sorted(self.out_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        profiles = []
+        for path in metas[:limit]:
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def load(self, profile_id: str) -> Optional[str]:
+        """Collapsed stacks of one profile, or None if unknown"""
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self.out_dir / f"{profile_id}.folded"
+        return path.read_text() if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """Profiles requests whose X-Profile header carries the token, plus a random sample
+
+    The response carries X-Profile-Id naming the saved profile.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_profile(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = None
+        status = 500
+
+        def assign_id() -> str:
+            # Named after the matched route template once routing has happened
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            return self.profiler.new_id(scope["method"], route)
+
+        async def send_with_id(message):
+            nonlocal profile_id, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                profile_id = assign_id()
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        session = self.profiler.start(sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = self.profiler.finish(session)
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status,
+            }
+            # Files are written off the event loop
+            await asyncio.to_thread(self.profiler.save, session, profile_id or assign_id(), elapsed, meta)
@@ -0,0 +1,300 @@
+"""
+Live quotes over WebSocket
+
+Clients subscribe to sets of symbols on one connection instead of each tab
+polling GET /api/stocks/{symbol}. One poller per subscribed symbol fetches
+the quote on an interval, however many clients follow it, and only fields
+that changed since the last push are sent.
+
+Fan-out never waits on a client. Each connection has a writer task and a
+pending map of symbol -> changed fields. Writers are woken once per
+batch window rather than once per update, so the symbols a client follows
+that change within the same tick go out as one message. A new update for a symbol that is
+still pending is merged into it, so a slow reader receives the latest
+values rather than a growing backlog, and memory per connection stays
+bounded by its subscriptions. A connection whose send does not complete
+within send_timeout is evicted with close code 1013.
+
+Per-symbol deltas are encoded to JSON once per poll and the encoded
+fragments are joined per connection, so a tick costs one dict update per
+subscriber rather than one json.dumps. For the same reason the server runs
+without permessage-deflate (see serving.websocket_options): compression
+is per connection, and for small deltas it cost more CPU than the sends.
+
+Protocol (JSON text frames):
+    -> {"action": "subscribe", "symbols": ["TCS", "INFY"]}
+    -> {"action": "unsubscribe", "symbols": ["INFY"]}
+    <- {"type": "quotes", "ts": 1720000000.123, "quotes": {"TCS": {"price": 3990.5, ...}}}
+    <- {"type": "error", "detail": "..."}
+ts is when the oldest update in the message was published. The first push
+for a symbol after subscribing carries every field.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+# Only the quote itself is streamed; record bookkeeping is not
+SKIP_FIELDS = ("id",)
+
+CLOSE_SLOW_CONSUMER = 1013
+
+
+def encode(symbol: str, changes: Dict[str, Any]) -> str:
+    """One symbol's entry in a quotes message"""
+    return f'{json.dumps(symbol)}:{json.dumps(changes, separators=(",", ":"))}'
+
+
+class Subscriber:
+    __slots__ = ("websocket", "symbols", "pending", "since", "wake", "writer", "sent", "merged")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.symbols: Set[str] = set()
+        # symbol -> (changed fields, their "symbol":{...} fragment or None once merged)
+        self.pending: Dict[str, tuple] = {}
+        self.since = 0.0
+        self.wake = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.merged = 0
+
+    def push(self, symbol: str, changes: Dict[str, Any], fragment: str):
+        if not self.pending:
+            self.since = time.time()
+        previous = self.pending.get(symbol)
+        if previous is None:
+            self.pending[symbol] = (changes, fragment)
+        else:
+            # Not yet sent: conflate into one update carrying the latest values
+            self.pending[symbol] = ({**previous[0], **changes}, None)
+            self.merged += 1
+
+    def take(self) -> Optional[str]:
+        """The pending updates as one message, or None if there are none"""
+        if not self.pending:
+            return None
+        pending, self.pending = self.pending, {}
+        quotes = ",".join(
+            fragment if fragment is not None else encode(symbol, changes)
+            for symbol, (changes, fragment) in pending.items()
+        )
+        return f'{{"type":"quotes","ts":{self.since:.3f},"quotes":{{{quotes}}}}}'
+
+
+class QuoteHub:
+    def __init__(
+        self,
+        poll_fn: Callable[[str], Awaitable[Any]],
+        interval: float,
+        send_timeout: float = 5.0,
+        max_symbols: int = 100,
+        batch_window: float = 0.05,
+    ):
+        self.poll_fn = poll_fn
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.max_symbols = max_symbols
+        self.batch_window = batch_window
+        self.subscribers: Set[Subscriber] = set()
+        # Subscribers with updates that their writer has not been woken for
+        self.dirty: Set[Subscriber] = set()
+        self.flush_scheduled = False
+        # symbol -> subscribers following it, its poller and its last quote
+        self.followers: Dict[str, Set[Subscriber]] = {}
+        self.pollers: Dict[str, asyncio.Task] = {}
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self.polls = 0
+        self.poll_failures = 0
+        self.unchanged_polls = 0
+        self.messages_sent = 0
+        self.updates_merged = 0
+        self.evictions = 0
+
+    # Subscriptions
+
+    def subscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> List[str]:
+        added = []
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if not symbol or symbol in subscriber.symbols:
+                continue
+            if len(subscriber.symbols) >= self.max_symbols:
+                raise ValueError(f"At most {self.max_symbols} symbols per connection")
+            subscriber.symbols.add(symbol)
+            self.followers.setdefault(symbol, set()).add(subscriber)
+            added.append(symbol)
+            latest = self.latest.get(symbol)
+            if latest is not None:
+                subscriber.push(symbol, latest, encode(symbol, latest))
+                self._mark_dirty(subscriber)
+            if symbol not in self.pollers:
+                self.pollers[symbol] = asyncio.create_task(self._poll(symbol))
+        return added
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Iterable[str]):
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if symbol not in subscriber.symbols:
+                continue
+            subscriber.symbols.discard(symbol)
+            subscriber.pending.pop(symbol, None)
+            followers = self.followers.get(symbol)
+            if followers is not None:
+                followers.discard(subscriber)
+                if not followers:
+                    # Nobody follows it any more: stop polling it
+                    del self.followers[symbol]
+                    self.latest.pop(symbol, None)
+                    poller = self.pollers.pop(symbol, None)
+                    if poller is not None:
+                        poller.cancel()
+
+    # Polling and fan-out
+
+    async def _poll(self, symbol: str):
+        while True:
+            try:
+                quote = await self.poll_fn(symbol)
+                self.polls += 1
+                self.publish(symbol, quote.model_dump() if hasattr(quote, "model_dump") else dict(quote))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.poll_failures += 1
+            # Ticks are aligned to the wall clock, so every worker polls a symbol
+            # at the same moment (one shared fetch) and a client's symbols tend
+            # to arrive together in one message
+            await asyncio.sleep(self.interval - time.time() % self.interval)
+
+    def publish(self, symbol: str, quote: Dict[str, Any]):
+        """Push the fields of quote that changed since the last one to every follower"""
+        quote = {field: value for field, value in quote.items() if field not in SKIP_FIELDS}
+        previous = self.latest.get(symbol, {})
+        changes = {field: value for field, value in quote.items() if previous.get(field) != value}
+        if not changes or set(changes) == {"createdAt"}:
+            self.unchanged_polls += 1
+            return
+        self.latest[symbol] = quote
+        fragment = encode(symbol, changes)
+        followers = self.followers.get(symbol, ())
+        for subscriber in followers:
+            subscriber.push(symbol, changes, fragment)
+        self.dirty.update(followers)
+        self._schedule_flush()
+
+    def _mark_dirty(self, subscriber: Subscriber):
+        self.dirty.add(subscriber)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        self.flush_scheduled = False
+        dirty, self.dirty = self.dirty, set()
+        for subscriber in dirty:
+            subscriber.wake.set()
+
+    async def _write(self, subscriber: Subscriber):
+        websocket = subscriber.websocket
+        try:
+            while True:
+                await subscriber.wake.wait()
+                subscriber.wake.clear()
+                message = subscriber.take()
+                if message is None:
+                    continue
+                try:
+                    # A timeout context rather than wait_for, which costs a task per send
+                    async with asyncio.timeout(self.send_timeout):
+                        await websocket.send_text(message)
+                except TimeoutError:
+                    self.evictions += 1
+                    await self._close(subscriber, CLOSE_SLOW_CONSUMER, "slow consumer")
+                    return
+                subscriber.sent += 1
+                self.messages_sent += 1
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            # Client went away mid-send
+            return
+
+    async def _close(self, subscriber: Subscriber, code: int, reason: str):
+        try:
+            # A client that stopped reading may never complete the handshake
+            await asyncio.wait_for(subscriber.websocket.close(code=code, reason=reason), 1.0)
+        except Exception:
+            pass
+
+    # Connections
+
+    async def serve(self, websocket: WebSocket, symbols: Iterable[str] = ()):
+        """Handle one client connection until it closes or is evicted"""
+        await websocket.accept()
+        subscriber = Subscriber(websocket)
+        self.subscribers.add(subscriber)
+        subscriber.writer = asyncio.create_task(self._write(subscriber))
+        try:
+            try:
+                self.subscribe(subscriber, symbols)
+            except ValueError as e:
+                await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+            while True:
+                receive = asyncio.ensure_future(websocket.receive_text())
+                await asyncio.wait((receive, subscriber.writer), return_when=asyncio.FIRST_COMPLETED)
+                if not receive.done():
+                    # The writer stopped: evicted, or the connection failed under it
+                    receive.cancel()
+                    break
+                message = receive.result()
+                try:
+                    request = json.loads(message)
+                    action = request.get("action")
+                    requested = request.get("symbols") or []
+                    if not isinstance(requested, list) or not all(isinstance(symbol, str) for symbol in requested):
+                        raise ValueError("symbols must be a list of strings")
+                    if action == "subscribe":
+                        self.subscribe(subscriber, requested)
+                    elif action == "unsubscribe":
+                        self.unsubscribe(subscriber, requested)
+                    else:
+                        raise ValueError("action must be subscribe or unsubscribe")
+                except (ValueError, AttributeError) as e:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.unsubscribe(subscriber, list(subscriber.symbols))
+            self.subscribers.discard(subscriber)
+            self.dirty.discard(subscriber)
+            self.updates_merged += subscriber.merged
+            subscriber.writer.cancel()
+
+    async def shutdown(self):
+        for poller in self.pollers.values():
+            poller.cancel()
+        await asyncio.gather(*self.pollers.values(), return_exceptions=True)
+        self.pollers.clear()
+        subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.writer.cancel()
+        await asyncio.gather(*(self._close(subscriber, 1001, "server shutting down") for subscriber in subscribers))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.subscribers),
+            "symbols": len(self.followers),
+            "subscriptions": sum(len(followers) for followers in self.followers.values()),
+            "intervalSeconds": self.interval,
+            "polls": self.polls,
+            "pollFailures": self.poll_failures,
+            "unchangedPolls": self.unchanged_polls,
+            "messagesSent": self.messages_sent,
+            "updatesMerged": self.updates_merged + sum(subscriber.merged for subscriber in self.subscribers),
+            "slowConsumersEvicted": self.evictions,
+        }
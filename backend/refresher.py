@@ -0,0 +1,125 @@
+"""
+Background quote refresher
+
+Keeps a hot set of symbols warm in storage so user requests are served from
+cache. Refreshes frequently during NSE trading hours and backs off outside
+them.
+"""
+
+import asyncio
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# India has no DST, so a fixed offset is enough
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Whether NSE is in its regular session (weekday 09:15-15:30 IST, holidays not considered)"""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+class QuoteRefresher:
+    def __init__(
+        self,
+        refresh_fn: Callable[[List[str]], Awaitable[Tuple[List[Any], List[Any]]]],
+        symbols: List[str],
+        market_interval: float,
+        off_hours_interval: float,
+        batch_size: int = 50,
+        quote_age_fn: Optional[Callable[[str], Optional[float]]] = None,
+    ):
+        self.refresh_fn = refresh_fn
+        self.symbols = symbols
+        self.market_interval = market_interval
+        self.off_hours_interval = off_hours_interval
+        self.batch_size = batch_size
+        # Seconds since a symbol's cached quote was fetched, None when not cached
+        self.quote_age_fn = quote_age_fn
+        self.task: Optional[asyncio.Task] = None
+        self.cycles = 0
+        self.refreshed = 0
+        self.failures = 0
+        self.last_run_at: Optional[str] = None
+        self.last_duration = 0.0
+        self.last_errors: List[Dict[str, str]] = []
+
+    def current_interval(self) -> float:
+        return self.market_interval if is_market_open() else self.off_hours_interval
+
+    async def refresh_once(self):
+        """Refresh every symbol in the hot set once"""
+        started = time.perf_counter()
+        errors: List[Dict[str, str]] = []
+        for i in range(0, len(self.symbols), self.batch_size):
+            chunk = self.symbols[i:i + self.batch_size]
+            try:
+                quotes, chunk_errors = await self.refresh_fn(chunk)
+                self.refreshed += len(quotes)
+                errors.extend({"symbol": e.symbol, "detail": e.detail} for e in chunk_errors)
+            except Exception as e:
+                errors.extend({"symbol": symbol, "detail": str(e)} for symbol in chunk)
+        self.failures += len(errors)
+        self.last_errors = errors[-10:]
+        self.cycles += 1
+        self.last_duration = time.perf_counter() - started
+        self.last_run_at = datetime.now().isoformat()
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                print(f"Quote refresh failed: {e}")
+            await asyncio.sleep(self.current_interval())
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def staleness(self) -> Dict[str, Any]:
+        """Age of the oldest cached quote in the hot set, in seconds and in refresh intervals
+
+        Above one interval means the refresher is falling behind; symbols
+        with no cached quote at all are counted separately.
+        """
+        if self.quote_age_fn is None:
+            return {}
+        ages = [self.quote_age_fn(symbol) for symbol in self.symbols]
+        cached = [age for age in ages if age is not None]
+        oldest = max(cached) if cached else None
+        return {
+            "oldestQuoteAgeSeconds": oldest,
+            "oldestQuoteAgeIntervals": oldest / self.current_interval() if oldest is not None else None,
+            "uncachedSymbols": len(ages) - len(cached),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "marketOpen": is_market_open(),
+            "intervalSeconds": self.current_interval(),
+            "symbols": len(self.symbols),
+            "cycles": self.cycles,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "lastRunAt": self.last_run_at,
+            "lastDurationMs": self.last_duration * 1000,
+            **self.staleness(),
+            "lastErrors": self.last_errors,
+        }
@@ -0,0 +1,143 @@
+"""
+Content-addressed cache for LLM sentiment analyses
+
+Entries are keyed by a hash of everything that determines the model output
+(normalized transcript, symbol, prompt version, model, temperature), so a
+resubmitted transcript is answered without another completion. An in-memory
+LRU with TTL sits in front of an optional on-disk tier.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# gpt-4o list prices in USD per 1K tokens, used to report spend avoided
+INPUT_COST_PER_1K = float(os.getenv("OPENAI_INPUT_COST_PER_1K", "0.0025"))
+OUTPUT_COST_PER_1K = float(os.getenv("OPENAI_OUTPUT_COST_PER_1K", "0.01"))
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return WHITESPACE.sub(" ", transcript).strip()
+
+
+def cache_key(transcript: str, symbol: str, prompt_version: str, model: str, temperature: float) -> str:
+    payload = json.dumps(
+        [normalize_transcript(transcript), symbol.upper(), prompt_version, model, temperature],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def completion_cost(usage: Optional[Dict[str, int]]) -> float:
+    if not usage:
+        return 0.0
+    return (
+        usage.get("prompt_tokens", 0) / 1000 * INPUT_COST_PER_1K
+        + usage.get("completion_tokens", 0) / 1000 * OUTPUT_COST_PER_1K
+    )
+
+
+class SentimentCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spend_avoided = 0.0
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["storedAt"] > self.ttl_seconds
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry):
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached analysis result for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self.entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                self.spend_avoided += completion_cost(entry.get("usage"))
+                return entry["result"]
+
+        entry = self._read_disk(key)
+        if entry is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        self._remember(key, entry)
+        with self.lock:
+            self.disk_hits += 1
+            self.spend_avoided += completion_cost(entry.get("usage"))
+        return entry["result"]
+
+    def put(self, key: str, result: Dict[str, Any], usage: Optional[Dict[str, int]] = None):
+        entry = {"result": result, "usage": usage, "storedAt": time.time()}
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "maxEntries": self.max_entries,
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "spendAvoidedUsd": round(self.spend_avoided, 4),
+            }
@@ -0,0 +1,220 @@
+"""
+Launch modes for the Python services
+
+Development runs a single auto-reloading process. Production
+(SERVE_MODE=production, or NODE_ENV=production as set by `npm start`)
+runs the API in WEB_CONCURRENCY worker processes without reload, and the
+Flask yfinance service on a multithreaded WSGI server instead of Flask's
+debug server. Dependencies are only installed when requirements.txt is
+not already satisfied, and every worker logs how long it took to become
+ready.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Set by the launcher and inherited by workers, so they can report time since launch
+LAUNCHED_AT_ENV = "SERVER_LAUNCHED_AT"
+
+REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?:(==|>=)\s*([^\s;,]+))?")
+
+# Filled in by log_ready and reported by /api/stats
+readiness: Dict[str, float] = {}
+
+
+def serve_mode() -> str:
+    default = "production" if os.getenv("NODE_ENV") == "production" else "development"
+    return os.getenv("SERVE_MODE", default).lower()
+
+
+def is_production() -> bool:
+    return serve_mode() == "production"
+
+
+def worker_count() -> int:
+    """API worker processes: WEB_CONCURRENCY, or one per CPU"""
+    return max(1, int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+
+
+def jobs_enabled() -> bool:
+    """Whether the bulk sentiment job queue runs: by default in development only"""
+    return os.getenv("SENTIMENT_JOBS_ENABLED", "false" if is_production() else "true").lower() == "true"
+
+
+def process_local_features() -> List[str]:
+    """Enabled features whose state lives in a single worker process
+
+    The bulk sentiment job queue keeps jobs in the process that accepted
+    them and resumes saved jobs at startup: with several workers, polling a
+    job 404s on the workers that did not accept it, and every worker
+    resumes the same interrupted jobs. SQLiteStorage keeps rows in memory
+    per process, so other workers would serve stale reads.
+    """
+    features = []
+    if jobs_enabled():
+        features.append("SENTIMENT_JOBS_ENABLED=true")
+    if os.getenv("STORAGE_BACKEND", "memory").lower() == "sqlite":
+        features.append("STORAGE_BACKEND=sqlite")
+    return features
+
+
+def check_worker_count(workers: int):
+    """Refuse to run several API workers alongside a process-local feature"""
+    features = process_local_features()
+    if workers > 1 and features:
+        raise RuntimeError(
+            f"{workers} API workers requested, but {' and '.join(features)} keeps state in one process; "
+            "set WEB_CONCURRENCY=1 or turn the feature off"
+        )
+
+
+def version_tuple(version: str):
+    parts = [int(part) if part.isdigit() else part for part in re.split(r"[.+-]", version)]
+    # 2.0 and 2.0.0 are the same release
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def unmet_requirements(requirements_file: Path) -> List[str]:
+    """Lines of requirements_file whose package is missing or at the wrong version
+
+    Understands the name[extras]==x / >=x pins this repo uses; anything else
+    is only checked for being installed.
+    """
+    unmet = []
+    for line in requirements_file.read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        match = REQUIREMENT.match(line)
+        if not match:
+            continue
+        name, op, wanted = match.groups()
+        try:
+            installed = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            unmet.append(line)
+            continue
+        if op == "==" and version_tuple(installed) != version_tuple(wanted):
+            unmet.append(line)
+        elif op == ">=":
+            try:
+                if version_tuple(installed) < version_tuple(wanted):
+                    unmet.append(line)
+            except TypeError:
+                unmet.append(line)
+    return unmet
+
+
+def ensure_requirements(requirements_file: Path = BACKEND_DIR / "requirements.txt"):
+    """pip install requirements_file, unless everything in it is already installed"""
+    if os.getenv("SKIP_PIP_INSTALL", "false").lower() == "true":
+        print("SKIP_PIP_INSTALL set, not checking requirements")
+        return
+    if not requirements_file.exists():
+        print("No requirements.txt found, skipping installation")
+        return
+
+    started = time.perf_counter()
+    unmet = unmet_requirements(requirements_file)
+    if not unmet:
+        print(f"Requirements already satisfied ({(time.perf_counter() - started) * 1000:.0f} ms to check)")
+        return
+    print(f"Installing Python requirements, unmet: {', '.join(unmet)}")
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", str(requirements_file)])
+    print(f"Installed requirements in {time.perf_counter() - started:.1f}s")
+
+
+def mark_launched():
+    os.environ.setdefault(LAUNCHED_AT_ENV, str(time.time()))
+
+
+def log_ready(service: str, import_started: float, startup_started: float):
+    """Log one worker's startup breakdown: module load, startup hooks, time since launch"""
+    now = time.perf_counter()
+    readiness.update(
+        pid=os.getpid(),
+        moduleLoadSeconds=round(startup_started - import_started, 3),
+        startupSeconds=round(now - startup_started, 3),
+        readyAt=time.time(),
+    )
+    launched = os.getenv(LAUNCHED_AT_ENV)
+    since_launch = ""
+    if launched:
+        readiness["sinceLaunchSeconds"] = round(time.time() - float(launched), 3)
+        since_launch = f", {readiness['sinceLaunchSeconds']:.2f}s since launch"
+    print(
+        f"{service} worker {os.getpid()} ready: module load {readiness['moduleLoadSeconds']:.2f}s, "
+        f"startup {readiness['startupSeconds']:.2f}s{since_launch}",
+        flush=True
+    )
+
+
+def websocket_options() -> Dict[str, Any]:
+    """uvicorn WebSocket settings
+
+    permessage-deflate is opt-in: the live quote stream sends many small
+    messages, which cost more to compress per connection than to send.
+    """
+    return {"ws_per_message_deflate": os.getenv("WS_PER_MESSAGE_DEFLATE", "false").lower() == "true"}
+
+
+def run_api(host: str = "0.0.0.0", port: Optional[int] = None, workers: Optional[int] = None):
+    """Serve main:app, with reload in development and worker processes in production"""
+    import uvicorn
+
+    mark_launched()
+    port = port or int(os.getenv("PORT", "5000"))
+    if is_production():
+        workers = workers or worker_count()
+        check_worker_count(workers)
+        # Workers size their shared cache defaults from this
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        print(f"Starting API in production mode with {workers} worker(s) on port {port}")
+        uvicorn.run(
+            "main:app",
+            app_dir=str(BACKEND_DIR),
+            host=host,
+            port=port,
+            workers=workers,
+            reload=False,
+            log_level=os.getenv("LOG_LEVEL", "info"),
+            timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "20")),
+            **websocket_options(),
+        )
+    else:
+        print(f"Starting API in development mode with reload on port {port}")
+        uvicorn.run(
+            "main:app",
+            app_dir=str(BACKEND_DIR),
+            host=host,
+            port=port,
+            reload=True,
+            reload_dirs=[str(BACKEND_DIR)],
+            log_level=os.getenv("LOG_LEVEL", "info"),
+            **websocket_options(),
+        )
+
+
+def serve_wsgi(app, service: str, host: str, port: int, threads: int, import_started: float):
+    """Serve a WSGI app on a multithreaded server: waitress if installed, else werkzeug's"""
+    startup_started = time.perf_counter()
+    try:
+        from waitress import create_server
+    except ImportError:
+        from werkzeug.serving import make_server
+        print("waitress is not installed, using werkzeug's threaded server (a thread per request)")
+        server = make_server(host, port, app, threaded=True)
+        run = server.serve_forever
+    else:
+        server = create_server(app, host=host, port=port, threads=threads)
+        run = server.run
+    log_ready(service, import_started, startup_started)
+    run()
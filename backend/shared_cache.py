@@ -0,0 +1,324 @@
+"""
+Host-wide cache tier shared by all worker processes
+
+Each uvicorn worker keeps its own in-memory caches. Behind them sits one
+SQLite file (WAL mode) that every worker on the host reads and writes, so a
+quote, analysis or statement fetched by one worker is served to the others
+without another upstream call.
+
+Values are stored as JSON (orjson), never pickled, so a tampered file can
+at worst serve bad data; DataFrames such as financial statements go
+through to_dict and are rebuilt on read. Statements run in a worker thread
+so lock waits on the file never block the event loop.
+
+Misses are coalesced across processes with leases: the first worker to
+claim a key fetches it, and the others poll the shared tier, backing off
+exponentially, until the result lands (or the lease lapses, in which case
+one of them takes over).
+Together with the in-process SingleFlight this keeps upstream calls per
+key independent of the number of workers.
+
+Every lookup is counted by the tier that answered it (local, shared, peer
+for a result another worker fetched while we waited, upstream), so hit
+rates can be read per tier. Without a path the shared tier is disabled and
+the class only does that accounting.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import pandas as pd
+
+TIERS = ("local", "shared", "peer", "upstream")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+def _default(value: Any) -> Any:
+    # Timestamps, such as the fiscal year columns of a statement
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode(value: Any) -> bytes:
+    """value as JSON; a DataFrame is stored in to_dict's split form"""
+    if isinstance(value, pd.DataFrame):
+        entry = {
+            "frame": value.to_dict(orient="split"),
+            "datetimeColumns": isinstance(value.columns, pd.DatetimeIndex),
+        }
+    else:
+        entry = {"value": value}
+    return orjson.dumps(entry, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def decode(data: bytes) -> Any:
+    entry = orjson.loads(data)
+    if "frame" not in entry:
+        return entry["value"]
+    frame = pd.DataFrame(**entry["frame"])
+    if entry["datetimeColumns"]:
+        frame.columns = pd.to_datetime(frame.columns)
+    return frame
+
+
+class SharedCache:
+    def __init__(
+        self,
+        path: Optional[str],
+        lease_seconds: float = 30.0,
+        poll_interval: float = 0.05,
+        max_poll_interval: float = 1.0,
+        sweep_every: int = 1000,
+    ):
+        self.path = Path(path) if path else None
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.sweep_every = sweep_every
+        # Identifies this process's leases
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.connections = threading.local()
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(TIERS, 0))
+        self.writes = 0
+        self.takeovers = 0
+        self.errors = 0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection().executescript(SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # Waits in a worker thread, but the request waits with it; on
+            # timeout the caller falls back to fetching upstream
+            connection.execute("PRAGMA busy_timeout=1000")
+            self.connections.connection = connection
+        return connection
+
+    def record(self, namespace: str, tier: str, count: int = 1):
+        self.counts[namespace][tier] += count
+
+    # Entries
+
+    async def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Unexpired value for key, or None; max_age also rejects older entries"""
+        return (await self.get_many(namespace, [key], max_age)).get(key)
+
+    async def get_many(self, namespace: str, keys: List[str], max_age: Optional[float] = None) -> Dict[str, Any]:
+        if not self.enabled or not keys:
+            return {}
+        return await asyncio.to_thread(self._get_many, namespace, keys, max_age)
+
+    def _get_many(self, namespace: str, keys: List[str], max_age: Optional[float]) -> Dict[str, Any]:
+        now = time.time()
+        oldest = now - max_age if max_age is not None else 0.0
+        placeholders = ",".join("?" * len(keys))
+        try:
+            rows = self._connection().execute(
+                f"SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders}) "
+                "AND expires_at > ? AND stored_at >= ?",
+                (namespace, *keys, now, oldest)
+            ).fetchall()
+        except sqlite3.Error:
+            # The shared tier is an optimisation; fall through to upstream
+            self.errors += 1
+            return {}
+        values = {}
+        for key, value in rows:
+            try:
+                values[key] = decode(value)
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                # Not written by this version; treat it as a miss
+                self.errors += 1
+        return values
+
+    async def put_many(self, namespace: str, values: Dict[str, Any], ttl: float):
+        if not self.enabled or not values:
+            return
+        await asyncio.to_thread(self._put_many, namespace, values, ttl)
+
+    def _put_many(self, namespace: str, values: Dict[str, Any], ttl: float):
+        now = time.time()
+        try:
+            rows = [(namespace, key, encode(value), now, now + ttl) for key, value in values.items()]
+        except TypeError:
+            # Not JSON serializable; leave it to the local caches
+            self.errors += 1
+            return
+        try:
+            connection = self._connection()
+            connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+            self.writes += len(rows)
+            if self.writes % self.sweep_every < len(rows):
+                connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        except sqlite3.Error:
+            self.errors += 1
+
+    async def put(self, namespace: str, key: str, value: Any, ttl: float):
+        await self.put_many(namespace, {key: value}, ttl)
+
+    # Leases
+
+    async def try_lease_many(self, namespace: str, keys: Iterable[str]) -> List[str]:
+        """Claim the keys nobody else is fetching; returns the ones claimed"""
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return keys
+        return await asyncio.to_thread(self._try_lease_many, namespace, keys)
+
+    def _try_lease_many(self, namespace: str, keys: List[str]) -> List[str]:
+        now = time.time()
+        claimed = []
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for key in keys:
+                cursor = connection.execute(
+                    "INSERT INTO leases VALUES (?, ?, ?, ?) ON CONFLICT (namespace, key) DO UPDATE "
+                    "SET owner = excluded.owner, expires_at = excluded.expires_at WHERE leases.expires_at <= ?",
+                    (namespace, key, self.owner, now + self.lease_seconds, now)
+                )
+                if cursor.rowcount:
+                    claimed.append(key)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            self.errors += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            # Fetching without the lease only risks a duplicate upstream call
+            return keys
+        return claimed
+
+    async def release_many(self, namespace: str, keys: Iterable[str]):
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._release_many, namespace, list(keys))
+
+    def _release_many(self, namespace: str, keys: List[str]):
+        try:
+            self._connection().executemany(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+                [(namespace, key, self.owner) for key in keys]
+            )
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _poll(self, namespace: str, key: str, max_age: Optional[float]) -> Tuple[Optional[Any], bool]:
+        """The key's value if it has landed, and whether its lease is still held"""
+        value = self._get_many(namespace, [key], max_age).get(key)
+        if value is not None:
+            return value, True
+        return None, self._lease_held(namespace, key)
+
+    def _lease_held(self, namespace: str, key: str) -> bool:
+        try:
+            row = self._connection().execute(
+                "SELECT 1 FROM leases WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return False
+        return row is not None
+
+    # Cross-process single-flight
+
+    async def get_or_fetch(
+        self,
+        namespace: str,
+        key: str,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]],
+        max_age: Optional[float] = None,
+    ) -> Any:
+        """Value from the shared tier, from a peer already fetching it, or from fetch()
+
+        Callers should already have missed their local cache and record that
+        hit themselves; this counts the shared, peer and upstream tiers.
+        """
+        value = await self.get(namespace, key, max_age)
+        if value is not None:
+            self.record(namespace, "shared")
+            return value
+
+        waited = False
+        while True:
+            if await self.try_lease_many(namespace, [key]):
+                if waited:
+                    self.takeovers += 1
+                break
+            # Another worker is fetching it: wait for its result, polling
+            # quickly at first and backing off for slow fetches
+            waited = True
+            delay = self.poll_interval
+            deadline = time.monotonic() + self.lease_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+                value, held = await asyncio.to_thread(self._poll, namespace, key, max_age)
+                if value is not None:
+                    self.record(namespace, "peer")
+                    return value
+                if not held:
+                    # The peer failed or died; try to take over
+                    break
+
+        try:
+            value = await fetch()
+            self.record(namespace, "upstream")
+            await self.put(namespace, key, value, ttl)
+            return value
+        finally:
+            await self.release_many(namespace, [key])
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace, counts in sorted(self.counts.items()):
+            lookups = sum(counts.values())
+            namespaces[namespace] = {
+                **counts,
+                "lookups": lookups,
+                "hitRates": {tier: counts[tier] / lookups if lookups else 0.0 for tier in TIERS},
+            }
+        return {
+            "enabled": self.enabled,
+            "path": str(self.path) if self.path else None,
+            "namespaces": namespaces,
+            "writes": self.writes,
+            "leaseTakeovers": self.takeovers,
+            "errors": self.errors,
+        }
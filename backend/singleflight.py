@@ -0,0 +1,49 @@
+"""
+Single-flight request coalescing
+
+Concurrent callers asking for the same key share one in-flight task instead
+of each hitting the upstream API.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.started: Dict[str, int] = defaultdict(int)
+        self.coalesced: Dict[str, int] = defaultdict(int)
+
+    def start(self, key: Tuple[str, Hashable, Hashable], fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Shared task for key, starting fn if nothing is in flight for it yet"""
+        endpoint = key[0]
+        task = self.in_flight.get(key)
+        if task is None:
+            self.started[endpoint] += 1
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced[endpoint] += 1
+        return task
+
+    async def do(self, key: Tuple[str, Hashable, Hashable], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once per key; concurrent callers with the same key await the same result"""
+        # Shield so one disconnecting caller doesn't cancel the shared fetch
+        return await asyncio.shield(self.start(key, fn))
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of upstream calls started and requests coalesced, per endpoint"""
+        endpoints = sorted(set(self.started) | set(self.coalesced))
+        return {
+            "inFlight": len(self.in_flight),
+            "endpoints": {
+                endpoint: {
+                    "started": self.started[endpoint],
+                    "coalesced": self.coalesced[endpoint],
+                }
+                for endpoint in endpoints
+            },
+        }
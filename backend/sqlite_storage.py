@@ -0,0 +1,510 @@
+"""
+SQLite storage backend
+
+Same method surface as MemoryStorage, persisted to a local SQLite database in
+WAL mode so quotes, analyses and generated transcripts survive a restart.
+Tables mirror stock_data, sentiment_analysis and earnings_call_transcripts in
+shared/schema.ts.
+
+A MemoryStorage instance serves as a read-through cache in front of the
+database. Writes land in that cache and in a pending buffer immediately, and
+a background thread commits the buffer in batches, so request handlers never
+wait on an fsync.
+
+Ids are handed out from blocks reserved in the id_blocks table, so several
+processes opening one database file never hand out the same id. Reserving a
+block is a short write transaction; the flush thread reserves the next block
+before the current one runs out, so taking an id is a memory operation.
+Writes of a quote or transcript period are upserts on the natural key that
+keep the row's first id; ids left in a block when the process exits are
+skipped.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import StockData, SentimentAnalysis, EarningsCallTranscript
+from storage import MemoryStorage, period_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_data (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    open_price REAL NOT NULL,
+    high_price REAL NOT NULL,
+    low_price REAL NOT NULL,
+    volume TEXT NOT NULL,
+    change REAL NOT NULL,
+    change_percent REAL NOT NULL,
+    market_cap TEXT,
+    pe_ratio REAL,
+    last_updated TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS stock_data_symbol ON stock_data (symbol);
+
+CREATE TABLE IF NOT EXISTS sentiment_analysis (
+    id INTEGER PRIMARY KEY,
+    stock_symbol TEXT NOT NULL,
+    transcript_text TEXT NOT NULL,
+    sentiment_score REAL NOT NULL,
+    positive_count REAL NOT NULL,
+    neutral_count REAL NOT NULL,
+    negative_count REAL NOT NULL,
+    confidence REAL NOT NULL,
+    summary TEXT NOT NULL,
+    key_highlights TEXT,
+    risk_factors TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS sentiment_analysis_symbol ON sentiment_analysis (stock_symbol, id);
+
+CREATE TABLE IF NOT EXISTS earnings_call_transcripts (
+    id INTEGER PRIMARY KEY,
+    stock_symbol TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    year TEXT NOT NULL,
+    transcript TEXT NOT NULL,
+    speakers TEXT,
+    created_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS earnings_call_transcripts_period
+    ON earnings_call_transcripts (stock_symbol, year, quarter);
+
+CREATE TABLE IF NOT EXISTS id_blocks (
+    name TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+"""
+
+
+class Table:
+    """Column mapping between a pydantic model and a table row"""
+
+    def __init__(
+        self,
+        name: str,
+        model: Type[BaseModel],
+        columns: Dict[str, str],
+        json_columns: Tuple[str, ...] = (),
+        key: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.model = model
+        self.columns = columns  # column name -> model field
+        self.json_columns = set(json_columns)
+        self.key = key
+        self.written = list(columns)
+        self.insert_sql = (
+            f"INSERT INTO {name} ({', '.join(self.written)}) "
+            f"VALUES ({', '.join('?' for _ in self.written)})"
+        )
+        if key:
+            # Upsert on the natural key: a conflicting row keeps its id
+            updates = ", ".join(
+                f"{column} = excluded.{column}" for column in self.written if column not in key and column != "id"
+            )
+            self.insert_sql += f" ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+        self.select_sql = f"SELECT {', '.join(columns)} FROM {name}"
+
+    def to_row(self, obj: BaseModel) -> tuple:
+        return tuple(
+            json.dumps(getattr(obj, self.columns[column])) if column in self.json_columns
+            else getattr(obj, self.columns[column])
+            for column in self.written
+        )
+
+    def from_row(self, row: tuple) -> BaseModel:
+        values = {}
+        for (column, field), value in zip(self.columns.items(), row):
+            if column in self.json_columns:
+                value = json.loads(value) if value is not None else []
+            values[field] = value
+        return self.model(**values)
+
+
+STOCK_DATA = Table("stock_data", StockData, {
+    "id": "id", "symbol": "symbol", "name": "name", "price": "price",
+    "open_price": "openPrice", "high_price": "highPrice", "low_price": "lowPrice",
+    "volume": "volume", "change": "change", "change_percent": "changePercent",
+    "market_cap": "marketCap", "pe_ratio": "peRatio", "last_updated": "createdAt",
+}, key=("symbol",))
+
+SENTIMENT_ANALYSIS = Table("sentiment_analysis", SentimentAnalysis, {
+    "id": "id", "stock_symbol": "stockSymbol", "transcript_text": "transcriptText",
+    "sentiment_score": "sentimentScore", "positive_count": "positiveCount",
+    "neutral_count": "neutralCount", "negative_count": "negativeCount",
+    "confidence": "confidence", "summary": "summary", "key_highlights": "keyHighlights",
+    "risk_factors": "riskFactors", "created_at": "createdAt",
+}, json_columns=("key_highlights", "risk_factors"))
+
+EARNINGS_CALL_TRANSCRIPTS = Table("earnings_call_transcripts", EarningsCallTranscript, {
+    "id": "id", "stock_symbol": "stockSymbol", "quarter": "quarter", "year": "year",
+    "transcript": "transcript", "speakers": "speakers", "created_at": "createdAt",
+}, json_columns=("speakers",), key=("stock_symbol", "year", "quarter"))
+
+TABLES = (STOCK_DATA, SENTIMENT_ANALYSIS, EARNINGS_CALL_TRANSCRIPTS)
+TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+
+class SQLiteStorage:
+    def __init__(
+        self,
+        path: str,
+        memory: Optional[MemoryStorage] = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        max_retry_rows: int = 10000,
+        id_block_size: int = 1000,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.memory = memory if memory is not None else MemoryStorage()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retry_rows = max_retry_rows
+        self.id_block_size = id_block_size
+
+        self.writer = self._connect()
+        self.writer.executescript(SCHEMA)
+        self.readers = threading.local()
+
+        # (table name, key) -> record; `flushing` holds the batch being committed
+        self.pending: Dict[Tuple[str, Hashable], BaseModel] = {}
+        self.flushing: Dict[Tuple[str, Hashable], BaseModel] = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.retried = 0
+        self.db_hits = 0
+        self.db_misses = 0
+
+        # Table name -> ids reserved for this process and not yet handed out
+        self.id_lock = threading.Lock()
+        self.free_ids: Dict[str, List[range]] = {}
+        self.refill: Set[str] = set()
+        self.id_blocks = 0
+        for table in TABLES:
+            self.free_ids[table.name] = [self._reserve_ids(table)]
+
+        self.flusher = threading.Thread(target=self._flush_loop, name="sqlite-storage-flush", daemon=True)
+        self.flusher.start()
+
+    # Connections
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        # WAL lets each thread read on its own connection while the flusher
+        # writes; id block reservations use it too
+        connection = getattr(self.readers, "connection", None)
+        if connection is None:
+            connection = self.readers.connection = self._connect()
+        return connection
+
+    # Ids
+
+    def _reserve_ids(self, table: Table) -> range:
+        """Claim the next id_block_size ids of table in id_blocks"""
+        with self.id_lock:
+            connection = self._reader()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT next_id FROM id_blocks WHERE name = ?", (table.name,)).fetchone()
+                (last,) = connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table.name}").fetchone()
+                start = max(row[0] if row else 1, last + 1)
+                connection.execute(
+                    "INSERT INTO id_blocks (name, next_id) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET next_id = excluded.next_id",
+                    (table.name, start + self.id_block_size),
+                )
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            self.id_blocks += 1
+            return range(start, start + self.id_block_size)
+
+    def _next_id(self, table: Table) -> int:
+        with self.lock:
+            blocks = self.free_ids[table.name]
+            if blocks:
+                id_ = blocks[0][0]
+                blocks[0] = blocks[0][1:]
+                if not blocks[0]:
+                    blocks.pop(0)
+                if sum(len(block) for block in blocks) < self.id_block_size // 2 and table.name not in self.refill:
+                    # Let the flush thread reserve the next block before this one runs out
+                    self.refill.add(table.name)
+                    self.wake.set()
+                return id_
+        # The flush thread fell behind; reserve here rather than fail the write
+        block = self._reserve_ids(table)
+        with self.lock:
+            self.free_ids[table.name].append(block[1:])
+        return block[0]
+
+    def _refill_ids(self):
+        with self.lock:
+            names, self.refill = self.refill, set()
+        for name in names:
+            block = self._reserve_ids(TABLES_BY_NAME[name])
+            with self.lock:
+                self.free_ids[name].append(block)
+
+    def _query(self, table: Table, where: str, params: tuple) -> Optional[BaseModel]:
+        row = self._reader().execute(f"{table.select_sql} WHERE {where}", params).fetchone()
+        if row is None:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        return table.from_row(row)
+
+    # Write buffer
+
+    def _enqueue(self, table: Table, key: Hashable, obj: BaseModel):
+        with self.lock:
+            self.pending[(table.name, key)] = obj
+            if len(self.pending) >= self.batch_size:
+                self.wake.set()
+
+    def _buffered(self, table: Table, key: Hashable) -> Optional[BaseModel]:
+        with self.lock:
+            return self.pending.get((table.name, key)) or self.flushing.get((table.name, key))
+
+    def _buffered_records(self, table: Table) -> List[BaseModel]:
+        with self.lock:
+            merged = {**self.flushing, **self.pending}
+        return [obj for (name, _), obj in merged.items() if name == table.name]
+
+    def _flush_loop(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self._refill_ids()
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"SQLite storage flush failed: {e}")
+
+    def flush(self):
+        """Commit buffered writes in one transaction
+
+        If the batch fails, its rows are written one at a time so a single bad
+        row cannot hold back the rest. Rows SQLite rejects are logged and
+        dropped; rows that failed on a busy or unwritable database go back to
+        the buffer for the next flush, up to max_retry_rows.
+        """
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                self.flushing, self.pending = self.pending, {}
+            tables = TABLES_BY_NAME
+            items = list(self.flushing.items())
+            written = 0
+            retry: Dict[Tuple[str, Hashable], BaseModel] = {}
+            try:
+                self.writer.execute("BEGIN")
+                for (name, _), obj in items:
+                    self.writer.execute(tables[name].insert_sql, tables[name].to_row(obj))
+                self.writer.execute("COMMIT")
+                written = len(items)
+            except sqlite3.Error as e:
+                self.writer.execute("ROLLBACK")
+                print(f"SQLite storage batch of {len(items)} failed ({e}), writing rows one at a time")
+                for key, obj in items:
+                    name = key[0]
+                    try:
+                        self.writer.execute(tables[name].insert_sql, tables[name].to_row(obj))
+                        written += 1
+                    except sqlite3.OperationalError:
+                        # Locked or unwritable: not this row's fault, try again later
+                        retry[key] = obj
+                    except sqlite3.Error as e:
+                        self.rows_dropped += 1
+                        print(f"SQLite storage dropped {name} row {key[1]!r}: {e}")
+            with self.lock:
+                self.flushing = {}
+                if retry:
+                    # Newer writes of the same key win over the retried ones
+                    retry = {key: obj for key, obj in retry.items() if key not in self.pending}
+                    overflow = min(len(retry) + len(self.pending) - self.max_retry_rows, len(retry))
+                    if overflow > 0:
+                        for key in list(retry)[:overflow]:
+                            del retry[key]
+                        self.rows_dropped += overflow
+                        print(f"SQLite storage retry buffer full, dropped {overflow} rows")
+                    self.pending = {**retry, **self.pending}
+                    self.retried += len(retry)
+            self.flushes += 1
+            self.rows_written += written
+            if retry:
+                raise sqlite3.OperationalError(f"{len(retry)} rows kept for retry")
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.flusher.join()
+        self.flush()
+        self.writer.close()
+
+    # MemoryStorage surface
+
+    def store_stock_data(self, stock_data: StockData) -> StockData:
+        stock_data.createdAt = datetime.now().isoformat()
+        if stock_data.id is None:
+            existing = self.get_stock_data(stock_data.symbol)
+            stock_data.id = existing.id if existing is not None else None
+        if stock_data.id is None:
+            stock_data.id = self._next_id(STOCK_DATA)
+        self._enqueue(STOCK_DATA, stock_data.symbol, stock_data)
+        self.memory.cache_stock_data(stock_data)
+        return stock_data
+
+    def cache_stock_data(self, stock_data: StockData) -> StockData:
+        """Keep a record another process already persisted, in memory only"""
+        return self.memory.cache_stock_data(stock_data)
+
+    def get_stock_data(self, symbol: str) -> Optional[StockData]:
+        stock_data = self.memory.get_stock_data(symbol) or self._buffered(STOCK_DATA, symbol)
+        if stock_data is None:
+            stock_data = self._query(STOCK_DATA, "symbol = ?", (symbol,))
+            if stock_data is not None:
+                self.memory.cache_stock_data(stock_data)
+        return stock_data
+
+    def peek_stock_data(self, symbol: str) -> Optional[StockData]:
+        """Stored quote for symbol without counting a hit or miss or filling the cache, for stats"""
+        stock_data = self.memory.peek_stock_data(symbol) or self._buffered(STOCK_DATA, symbol)
+        if stock_data is None:
+            row = self._reader().execute(f"{STOCK_DATA.select_sql} WHERE symbol = ?", (symbol,)).fetchone()
+            stock_data = STOCK_DATA.from_row(row) if row is not None else None
+        return stock_data
+
+    def get_stock_json(self, symbol: str) -> Optional[bytes]:
+        return self.memory.get_stock_json(symbol)
+
+    def get_all_stock_data(self) -> List[StockData]:
+        """Every stored quote, least recently updated first"""
+        rows = self._reader().execute(STOCK_DATA.select_sql).fetchall()
+        quotes = {row[1]: STOCK_DATA.from_row(row) for row in rows}
+        for stock_data in self._buffered_records(STOCK_DATA):
+            quotes[stock_data.symbol] = stock_data
+        return sorted(quotes.values(), key=lambda stock_data: stock_data.createdAt or "")
+
+    def store_sentiment_analysis(self, sentiment: SentimentAnalysis) -> SentimentAnalysis:
+        sentiment.createdAt = datetime.now().isoformat()
+        # Every analysis is kept as a new row; reads return the newest per symbol
+        sentiment.id = self._next_id(SENTIMENT_ANALYSIS)
+        self._enqueue(SENTIMENT_ANALYSIS, sentiment.id, sentiment)
+        self.memory.cache_sentiment_analysis(sentiment)
+        return sentiment
+
+    def get_sentiment_analysis(self, symbol: str) -> Optional[SentimentAnalysis]:
+        sentiment = self.memory.get_sentiment_analysis(symbol)
+        if sentiment is not None:
+            return sentiment
+        buffered = [s for s in self._buffered_records(SENTIMENT_ANALYSIS) if s.stockSymbol == symbol]
+        if buffered:
+            return max(buffered, key=lambda s: s.id)
+        sentiment = self._query(SENTIMENT_ANALYSIS, "stock_symbol = ? ORDER BY id DESC LIMIT 1", (symbol,))
+        if sentiment is not None:
+            self.memory.cache_sentiment_analysis(sentiment)
+        return sentiment
+
+    def store_earnings_transcript(self, transcript: EarningsCallTranscript) -> EarningsCallTranscript:
+        """Store a transcript, replacing any earlier one for the same symbol and period"""
+        key = (transcript.stockSymbol, transcript.year, transcript.quarter)
+        transcript.createdAt = datetime.now().isoformat()
+        if transcript.id is None:
+            existing = self.get_earnings_transcript(transcript.stockSymbol, transcript.quarter, transcript.year)
+            transcript.id = existing.id if existing else None
+        if transcript.id is None:
+            transcript.id = self._next_id(EARNINGS_CALL_TRANSCRIPTS)
+        self._enqueue(EARNINGS_CALL_TRANSCRIPTS, key, transcript)
+        self.memory.cache_earnings_transcript(transcript)
+        return transcript
+
+    def get_earnings_transcript(self, symbol: str, quarter: str, year: str) -> Optional[EarningsCallTranscript]:
+        transcript = (
+            self.memory.get_earnings_transcript(symbol, quarter, year)
+            or self._buffered(EARNINGS_CALL_TRANSCRIPTS, (symbol, year, quarter))
+        )
+        if transcript is None:
+            transcript = self._query(
+                EARNINGS_CALL_TRANSCRIPTS, "stock_symbol = ? AND year = ? AND quarter = ?", (symbol, year, quarter)
+            )
+            if transcript is not None:
+                self.memory.cache_earnings_transcript(transcript)
+        return transcript
+
+    def get_earnings_transcripts(
+        self,
+        symbol: str,
+        limit: Optional[int] = None,
+        since: Optional[Tuple[str, str]] = None,
+        until: Optional[Tuple[str, str]] = None,
+    ) -> List[EarningsCallTranscript]:
+        """Transcripts for a symbol, newest period first (see MemoryStorage.get_earnings_transcripts)"""
+        # The cache may hold only some periods, so take the period list from the
+        # database (index-only scan) plus anything not yet flushed
+        periods = set(self._reader().execute(
+            "SELECT year, quarter FROM earnings_call_transcripts WHERE stock_symbol = ?", (symbol,)
+        ).fetchall())
+        periods.update(
+            (t.year, t.quarter) for t in self._buffered_records(EARNINGS_CALL_TRANSCRIPTS) if t.stockSymbol == symbol
+        )
+        ordered = sorted((period_key(year, quarter) for year, quarter in periods), reverse=True)
+        low = period_key(*since) if since else None
+        high = period_key(*until) if until else None
+        transcripts = []
+        for period in ordered:
+            if (low and period < low) or (high and period > high):
+                continue
+            transcript = self.get_earnings_transcript(symbol, period[3], period[2])
+            if transcript:
+                transcripts.append(transcript)
+                if limit is not None and len(transcripts) >= limit:
+                    break
+        return transcripts
+
+    def get_latest_earnings_transcript(self, symbol: str) -> Optional[EarningsCallTranscript]:
+        transcripts = self.get_earnings_transcripts(symbol, limit=1)
+        return transcripts[0] if transcripts else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Read-through cache counters plus database write and read counters"""
+        with self.lock:
+            pending = len(self.pending) + len(self.flushing)
+        return {
+            **self.memory.stats(),
+            "sqlite": {
+                "path": str(self.path),
+                "pendingWrites": pending,
+                "flushes": self.flushes,
+                "rowsWritten": self.rows_written,
+                "rowsRetried": self.retried,
+                "rowsDropped": self.rows_dropped,
+                "idBlocksReserved": self.id_blocks,
+                "dbHits": self.db_hits,
+                "dbMisses": self.db_misses,
+            },
+        }
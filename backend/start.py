@@ -2,50 +2,36 @@
 """
 FastAPI NSE Stock Analysis Server
 Start script for the backend service
+
+Development (default): one process with auto-reload.
+Production (--production or SERVE_MODE=production): WEB_CONCURRENCY
+workers, no reload. Requirements are installed only when not already met.
 """
 
+import argparse
 import os
 import sys
-import subprocess
-from pathlib import Path
 
-def install_requirements():
-    """Install Python requirements if needed"""
-    requirements_file = Path(__file__).parent / "requirements.txt"
-    
-    if requirements_file.exists():
-        print("Installing Python requirements...")
-        subprocess.check_call([
-            sys.executable, "-m", "pip", "install", "-r", str(requirements_file)
-        ])
-    else:
-        print("No requirements.txt found, skipping installation")
+from serving import ensure_requirements, mark_launched, run_api
 
-def start_server():
+def start_server(args):
     """Start the FastAPI server"""
-    print("Starting FastAPI NSE Stock Analysis Server...")
-    
-    # Set environment variables
-    os.environ.setdefault("PORT", "5000")
-    
-    # Import and run the FastAPI app
-    import uvicorn
-    from main import app
-    
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=int(os.environ.get("PORT", "5000")),
-        reload=True,
-        log_level="info"
-    )
+    if args.production:
+        os.environ["SERVE_MODE"] = "production"
+    run_api(port=args.port, workers=args.workers)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--production", action="store_true", help="multi-worker, no reload")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--port", type=int, default=None, help="port (default: PORT or 5000)")
+    args = parser.parse_args()
     try:
-        install_requirements()
-        start_server()
+        mark_launched()
+        ensure_requirements()
+        start_server(args)
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e:
         print(f"Error starting server: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,346 @@
+"""
+In-memory storage
+
+Each collection is bounded by a capacity and a TTL with LRU eviction, and
+records are kept compactly as tuples of field values with long text fields
+zlib-compressed, instead of as pydantic objects. Models are rebuilt on read.
+Quotes also keep their encoded JSON, so serving a cached one needs no
+serialization at all.
+"""
+
+import bisect
+import os
+import re
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+import fast_json
+from models import StockData, SentimentAnalysis, EarningsCallTranscript
+
+
+def approx_size(value: Any) -> int:
+    """Approximate bytes held by a compact record"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(approx_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    return size
+
+
+class RecordCodec:
+    """Packs a pydantic model into a tuple of field values and back"""
+
+    def __init__(self, model: Type[BaseModel], compressed: Tuple[str, ...] = ()):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self.compressed = set(compressed)
+
+    def encode(self, obj: BaseModel) -> tuple:
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            if field in self.compressed and value is not None:
+                value = zlib.compress(value.encode("utf-8"), 6)
+            elif isinstance(value, list):
+                value = tuple(tuple(v.items()) if isinstance(v, dict) else v for v in value)
+            values.append(value)
+        return tuple(values)
+
+    def decode(self, record: tuple) -> BaseModel:
+        values = {}
+        for field, value in zip(self.fields, record):
+            if field in self.compressed and value is not None:
+                value = zlib.decompress(value).decode("utf-8")
+            elif isinstance(value, tuple):
+                value = [dict(v) if isinstance(v, tuple) else v for v in value]
+            values[field] = value
+        # Records were validated when first built, so skip validation here
+        return self.model.model_construct(**values)
+
+
+class BoundedCollection:
+    """LRU + TTL map of compact records with hit/miss/eviction counters"""
+
+    def __init__(
+        self,
+        codec: RecordCodec,
+        capacity: int,
+        ttl_seconds: float,
+        on_evict: Optional[Callable[[Hashable, BaseModel], None]] = None,
+        encode_json: Optional[Callable[[BaseModel], bytes]] = None,
+    ):
+        self.codec = codec
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.encode_json = encode_json
+        self.records: "OrderedDict[Hashable, Tuple[float, tuple, int]]" = OrderedDict()
+        # key -> the record's response body, when encode_json is given
+        self.encoded: Dict[Hashable, bytes] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds
+
+    def _remove(self, key: Hashable) -> tuple:
+        _, record, size = self.records.pop(key)
+        self.encoded.pop(key, None)
+        self.bytes -= size
+        return record
+
+    def _evict(self, key: Hashable, expired: bool):
+        record = self._remove(key)
+        if expired:
+            self.expirations += 1
+        else:
+            self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, self.codec.decode(record))
+
+    def put(self, key: Hashable, obj: BaseModel):
+        if key in self.records:
+            self._remove(key)
+        record = self.codec.encode(obj)
+        size = approx_size(record)
+        if self.encode_json is not None:
+            encoded = self.encode_json(obj)
+            self.encoded[key] = encoded
+            size += sys.getsizeof(encoded)
+        self.records[key] = (time.monotonic(), record, size)
+        self.bytes += size
+        while len(self.records) > self.capacity:
+            self._evict(next(iter(self.records)), expired=False)
+
+    def get(self, key: Hashable) -> Optional[BaseModel]:
+        entry = self.records.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if self._expired(entry[0]):
+            self._evict(key, expired=True)
+            self.misses += 1
+            return None
+        self.records.move_to_end(key)
+        self.hits += 1
+        return self.codec.decode(entry[1])
+
+    def peek(self, key: Hashable) -> Optional[BaseModel]:
+        """Record for key without touching LRU order, counters or expiry"""
+        entry = self.records.get(key)
+        return self.codec.decode(entry[1]) if entry is not None else None
+
+    def peek_json(self, key: Hashable) -> Optional[bytes]:
+        """Encoded JSON of the record for key, like peek"""
+        return self.encoded.get(key)
+
+    def values(self) -> List[BaseModel]:
+        self.purge_expired()
+        return [self.codec.decode(record) for _, record, _ in self.records.values()]
+
+    def purge_expired(self):
+        if self.ttl_seconds <= 0:
+            return
+        expired = [key for key, (stored_at, _, _) in self.records.items() if self._expired(stored_at)]
+        for key in expired:
+            self._evict(key, expired=True)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.records),
+            "capacity": self.capacity,
+            "ttlSeconds": self.ttl_seconds,
+            "approxBytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+DIGITS = re.compile(r"\d+")
+
+# (symbol, year, quarter)
+TranscriptKey = Tuple[str, str, str]
+
+
+def period_key(year: str, quarter: str) -> Tuple[int, int, str, str]:
+    """Chronological sort key for a fiscal period such as ("2024", "3") or ("FY24", "Q3")"""
+    year_digits = DIGITS.search(year)
+    quarter_digits = DIGITS.search(quarter)
+    return (
+        int(year_digits.group()) if year_digits else -1,
+        int(quarter_digits.group()) if quarter_digits else -1,
+        year,
+        quarter,
+    )
+
+
+class MemoryStorage:
+    def __init__(
+        self,
+        max_stocks: Optional[int] = None,
+        stock_ttl: Optional[float] = None,
+        max_sentiments: Optional[int] = None,
+        sentiment_ttl: Optional[float] = None,
+        max_transcripts: Optional[int] = None,
+        transcript_ttl: Optional[float] = None,
+    ):
+        self.stock_data = BoundedCollection(
+            RecordCodec(StockData),
+            capacity=max_stocks or env_int("STORAGE_MAX_STOCKS", 10000),
+            ttl_seconds=stock_ttl if stock_ttl is not None else env_int("STORAGE_STOCK_TTL", 24 * 3600),
+            encode_json=fast_json.dumps,
+        )
+        self.sentiment_analyses = BoundedCollection(
+            RecordCodec(SentimentAnalysis, compressed=("transcriptText",)),
+            capacity=max_sentiments or env_int("STORAGE_MAX_SENTIMENTS", 10000),
+            ttl_seconds=sentiment_ttl if sentiment_ttl is not None else env_int("STORAGE_SENTIMENT_TTL", 7 * 24 * 3600),
+        )
+        # Transcripts are keyed by (symbol, year, quarter); a sorted per-symbol
+        # list of periods serves "latest" and range queries
+        self.earnings_transcripts = BoundedCollection(
+            RecordCodec(EarningsCallTranscript, compressed=("transcript",)),
+            capacity=max_transcripts or env_int("STORAGE_MAX_TRANSCRIPTS", 5000),
+            ttl_seconds=transcript_ttl if transcript_ttl is not None else env_int("STORAGE_TRANSCRIPT_TTL", 30 * 24 * 3600),
+            on_evict=self._forget_transcript,
+        )
+        self.transcript_periods: Dict[str, List[Tuple[int, int, str, str]]] = {}
+        self.next_id = 1
+
+    def get_next_id(self) -> int:
+        current_id = self.next_id
+        self.next_id += 1
+        return current_id
+
+    def store_stock_data(self, stock_data: StockData) -> StockData:
+        if stock_data.id is None:
+            stock_data.id = self.get_next_id()
+        stock_data.createdAt = datetime.now().isoformat()
+        return self.cache_stock_data(stock_data)
+
+    def cache_stock_data(self, stock_data: StockData) -> StockData:
+        """Keep an already stamped record, e.g. one read back from a persistent backend"""
+        self.stock_data.put(stock_data.symbol, stock_data)
+        return stock_data
+
+    def get_stock_data(self, symbol: str) -> Optional[StockData]:
+        return self.stock_data.get(symbol)
+
+    def peek_stock_data(self, symbol: str) -> Optional[StockData]:
+        """Cached quote for symbol without counting a hit or miss, for stats"""
+        return self.stock_data.peek(symbol)
+
+    def get_stock_json(self, symbol: str) -> Optional[bytes]:
+        """Encoded JSON of the quote get_stock_data last returned for symbol"""
+        return self.stock_data.peek_json(symbol)
+
+    def get_all_stock_data(self) -> List[StockData]:
+        return self.stock_data.values()
+
+    def store_sentiment_analysis(self, sentiment: SentimentAnalysis) -> SentimentAnalysis:
+        if sentiment.id is None:
+            sentiment.id = self.get_next_id()
+        sentiment.createdAt = datetime.now().isoformat()
+        return self.cache_sentiment_analysis(sentiment)
+
+    def cache_sentiment_analysis(self, sentiment: SentimentAnalysis) -> SentimentAnalysis:
+        self.sentiment_analyses.put(sentiment.stockSymbol, sentiment)
+        return sentiment
+
+    def get_sentiment_analysis(self, symbol: str) -> Optional[SentimentAnalysis]:
+        return self.sentiment_analyses.get(symbol)
+
+    def _forget_transcript(self, key: TranscriptKey, transcript: EarningsCallTranscript):
+        symbol, year, quarter = key
+        periods = self.transcript_periods.get(symbol)
+        if not periods:
+            return
+        period = period_key(year, quarter)
+        index = bisect.bisect_left(periods, period)
+        if index < len(periods) and periods[index] == period:
+            del periods[index]
+        if not periods:
+            del self.transcript_periods[symbol]
+
+    def store_earnings_transcript(self, transcript: EarningsCallTranscript) -> EarningsCallTranscript:
+        """Store a transcript, replacing any earlier one for the same symbol and period"""
+        key = (transcript.stockSymbol, transcript.year, transcript.quarter)
+        if transcript.id is None:
+            existing = self.earnings_transcripts.peek(key)
+            transcript.id = existing.id if existing else self.get_next_id()
+        transcript.createdAt = datetime.now().isoformat()
+        return self.cache_earnings_transcript(transcript)
+
+    def cache_earnings_transcript(self, transcript: EarningsCallTranscript) -> EarningsCallTranscript:
+        key = (transcript.stockSymbol, transcript.year, transcript.quarter)
+        if key not in self.earnings_transcripts:
+            bisect.insort(
+                self.transcript_periods.setdefault(transcript.stockSymbol, []),
+                period_key(transcript.year, transcript.quarter)
+            )
+        self.earnings_transcripts.put(key, transcript)
+        return transcript
+
+    def get_earnings_transcript(self, symbol: str, quarter: str, year: str) -> Optional[EarningsCallTranscript]:
+        return self.earnings_transcripts.get((symbol, year, quarter))
+
+    def get_earnings_transcripts(
+        self,
+        symbol: str,
+        limit: Optional[int] = None,
+        since: Optional[Tuple[str, str]] = None,
+        until: Optional[Tuple[str, str]] = None,
+    ) -> List[EarningsCallTranscript]:
+        """Transcripts for a symbol, newest period first
+
+        `since` and `until` are inclusive (year, quarter) bounds; `limit` caps
+        the number returned, so limit=8 is the last eight quarters on record.
+        """
+        periods = self.transcript_periods.get(symbol, [])
+        low = bisect.bisect_left(periods, period_key(*since)) if since else 0
+        high = bisect.bisect_right(periods, period_key(*until)) if until else len(periods)
+        transcripts = []
+        # Copy the slice: expired records found by get() are removed from the index
+        for _, _, year, quarter in reversed(periods[low:high]):
+            transcript = self.earnings_transcripts.get((symbol, year, quarter))
+            if transcript:
+                transcripts.append(transcript)
+                if limit is not None and len(transcripts) >= limit:
+                    break
+        return transcripts
+
+    def get_latest_earnings_transcript(self, symbol: str) -> Optional[EarningsCallTranscript]:
+        transcripts = self.get_earnings_transcripts(symbol, limit=1)
+        return transcripts[0] if transcripts else None
+
+    def close(self):
+        """Nothing to release; present so backends are interchangeable"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-collection size, footprint and cache counters"""
+        return {
+            "stockData": self.stock_data.stats(),
+            "sentimentAnalyses": self.sentiment_analyses.stats(),
+            "earningsTranscripts": self.earnings_transcripts.stats(),
+        }
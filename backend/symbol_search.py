@@ -0,0 +1,182 @@
+"""
+Symbol and company-name search
+
+The equity universe is loaded once from a master file (NSE's EQUITY_L.csv
+layout) and indexed two ways:
+
+- a prefix trie over symbols and over every word-start of the company name,
+  whose nodes keep the best few matches so keystroke queries cost one walk
+  down the trie;
+- a trigram index for typo-tolerant ranking when no prefix matches.
+"""
+
+import csv
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_EQUITY_LIST = Path(__file__).parent / "data" / "nse_equities.csv"
+
+NON_ALNUM = re.compile(r"[^A-Z0-9&]+")
+# Words that say nothing about which company is meant
+STOPWORDS = {"LIMITED", "LTD", "THE", "OF", "AND", "&", "CO", "COMPANY", "CORPORATION", "INDIA", "I"}
+
+# Match tiers, best first
+EXACT_SYMBOL, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX = range(4)
+
+
+def normalize(text: str) -> str:
+    return NON_ALNUM.sub(" ", text.upper()).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class TrieNode:
+    __slots__ = ("children", "matches")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        # (tier, rank, instrument index), kept sorted and capped
+        self.matches: List[Tuple[int, int, int]] = []
+
+
+class SymbolIndex:
+    def __init__(self, instruments: Iterable[Tuple[str, str]], node_capacity: int = 16, min_similarity: float = 0.3):
+        self.symbols: List[str] = []
+        self.names: List[str] = []
+        for symbol, name in instruments:
+            self.symbols.append(symbol.upper())
+            self.names.append(name.strip())
+        # Keyed like queries, so BAJAJ-AUTO is found as "BAJAJ-AUTO" or "bajaj auto"
+        self.symbol_keys = [normalize(symbol) for symbol in self.symbols]
+        self.by_symbol: Dict[str, int] = {}
+        for i, key in enumerate(self.symbol_keys):
+            self.by_symbol.setdefault(key, i)
+        self.node_capacity = node_capacity
+        self.min_similarity = min_similarity
+        self.root = TrieNode()
+        self._build_trie()
+        self._build_trigrams()
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "SymbolIndex":
+        """Load a master file with SYMBOL and NAME OF COMPANY columns"""
+        with open(Path(path) if path else DEFAULT_EQUITY_LIST, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = [column.strip().upper() for column in next(reader)]
+            symbol_column, name_column = header.index("SYMBOL"), header.index("NAME OF COMPANY")
+            return cls((row[symbol_column].strip(), row[name_column]) for row in reader if row)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # Indexing
+
+    def _insert(self, key: str, match: Tuple[int, int, int]):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            if len(node.matches) < self.node_capacity:
+                node.matches.append(match)
+
+    def _name_keys(self, index: int) -> List[Tuple[str, int]]:
+        """The name from each significant word onward, e.g. TATA MOTORS and MOTORS"""
+        words = normalize(self.names[index]).split()
+        return [
+            (" ".join(words[position:]), NAME_PREFIX if position == 0 else WORD_PREFIX)
+            for position, word in enumerate(words)
+            if word not in STOPWORDS or position == 0
+        ]
+
+    def _build_trie(self):
+        # Insert shorter symbols first so capped nodes keep the likeliest matches
+        order = sorted(range(len(self.symbols)), key=lambda i: (len(self.symbols[i]), self.symbols[i]))
+        for rank, index in enumerate(order):
+            self._insert(self.symbol_keys[index], (SYMBOL_PREFIX, rank, index))
+        for rank, index in enumerate(order):
+            for key, tier in self._name_keys(index):
+                self._insert(key, (tier, rank, index))
+        self._sort_matches(self.root)
+
+    def _sort_matches(self, root: TrieNode):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.matches.sort()
+            stack.extend(node.children.values())
+
+    def _build_trigrams(self):
+        postings: Dict[str, List[int]] = {}
+        gram_counts = np.zeros(len(self.symbols), dtype=np.int32)
+        for index, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            words = [word for word in normalize(name).split() if word not in STOPWORDS]
+            grams = set(trigrams(symbol)) | set(trigrams(" ".join(words)))
+            gram_counts[index] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(index)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.gram_counts = gram_counts
+        # Trigrams shared by a large part of the universe ("IND", "LTD"-like)
+        # cost the most to count and say the least, so scoring skips them
+        self.max_posting = max(len(self.symbols) // 5, 50)
+
+    # Queries
+
+    def _prefix_matches(self, query: str) -> List[Tuple[int, int, int]]:
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.matches
+
+    def _fuzzy_matches(self, query: str, limit: int) -> List[int]:
+        """Instruments ranked by how many of the query's trigrams they share"""
+        grams = set(trigrams(query))
+        lists = [
+            self.postings[gram] for gram in grams
+            if gram in self.postings and len(self.postings[gram]) <= self.max_posting
+        ]
+        if not lists:
+            return []
+        candidates, counts = np.unique(np.concatenate(lists), return_counts=True)
+        keep = counts >= self.min_similarity * len(grams)
+        candidates, counts = candidates[keep], counts[keep]
+        if not len(candidates):
+            return []
+        # Shared trigrams find a misspelt prefix of a long name; Dice (< 1)
+        # breaks ties in favour of names close to the query's length
+        dice = 2 * counts / (len(grams) + self.gram_counts[candidates])
+        score = counts + dice
+        if len(score) > limit:
+            top = np.argpartition(-score, limit)[:limit]
+            candidates, score = candidates[top], score[top]
+        return candidates[np.argsort(-score, kind="stable")].tolist()
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """(symbol, company name) pairs, best match first"""
+        query = normalize(query)
+        if not query:
+            return []
+        results: List[int] = []
+        seen = set()
+        exact = self.by_symbol.get(query)
+        if exact is not None:
+            results.append(exact)
+            seen.add(exact)
+        for _, _, index in self._prefix_matches(query):
+            if index not in seen:
+                results.append(index)
+                seen.add(index)
+        # Typo tolerance: fall back to trigram ranking when no prefix matches
+        if not results:
+            for index in self._fuzzy_matches(query, limit):
+                if index not in seen:
+                    results.append(index)
+                    seen.add(index)
+        return [(self.symbols[i], self.names[i]) for i in results[:limit]]
@@ -1,15 +1,50 @@
 #!/usr/bin/env python3
-import yfinance as yf
+import time
+# Taken before the heavy imports so startup can be logged
+IMPORT_STARTED = time.perf_counter()
+
 import pandas as pd
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+import os
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+
+# Share the backend's market data provider, on-disk history store and symbol search
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+from history_store import HistoryStore
+from market_data import create_provider
+from downsample import lttb_indices, format_dates
+from symbol_search import SymbolIndex
+from fundamentals import FundamentalsCache, parse_fields, load_fundamentals
+from serving import is_production, serve_wsgi
 
 app = Flask(__name__)
 CORS(app)
 
+# Batch quote limits
+MAX_BATCH_SYMBOLS = 100
+BATCH_INFO_CONCURRENCY = 8
+
+# Source of quotes, history and fundamentals; MARKET_DATA_PROVIDER=synthetic runs offline
+market_data = create_provider()
+
+# Info and statements per ticker; fundamentals only change when companies report
+fundamentals_cache = FundamentalsCache(
+    max_entries=int(os.getenv("FUNDAMENTALS_CACHE_SIZE", "5000")),
+    info_ttl=float(os.getenv("FUNDAMENTALS_TTL", str(24 * 3600))),
+    statement_ttl=float(os.getenv("FUNDAMENTALS_STATEMENT_TTL", str(7 * 24 * 3600)))
+)
+
+# Local OHLCV store so history requests only fetch missing bars
+history_store = HistoryStore(os.getenv("HISTORY_STORE_DIR", "data/history"))
+
+# Autocomplete over the full equity list (symbols and company names, typo tolerant)
+symbol_index = SymbolIndex.load(os.getenv("NSE_EQUITY_LIST_PATH") or None)
+
 # NSE stock symbols mapping
 NSE_STOCKS = {
     'RELIANCE': 'RELIANCE.NS',
@@ -102,49 +137,103 @@ def format_volume(volume):
     else:
         return str(int(volume))
 
+def build_stock_response(symbol, info, hist):
+    """Build the stock quote payload from a yfinance info dict and daily history"""
+    current_data = hist.iloc[-1]
+    previous_data = hist.iloc[-2] if len(hist) > 1 else current_data
+    
+    current_price = float(current_data['Close'])
+    previous_close = float(previous_data['Close'])
+    change = current_price - previous_close
+    change_percent = (change / previous_close) * 100
+    
+    # Get additional info
+    market_cap = info.get('marketCap')
+    pe_ratio = info.get('trailingPE')
+    company_name = info.get('longName', info.get('shortName', symbol))
+    
+    return {
+        "symbol": symbol.upper(),
+        "name": company_name,
+        "price": current_price,
+        "openPrice": float(current_data['Open']),
+        "highPrice": float(current_data['High']),
+        "lowPrice": float(current_data['Low']),
+        "volume": format_volume(current_data['Volume']),
+        "change": change,
+        "changePercent": change_percent,
+        "marketCap": format_market_cap(market_cap),
+        "peRatio": float(pe_ratio) if pe_ratio and not pd.isna(pe_ratio) else None
+    }
+
+def extract_ticker_history(data, yf_symbol):
+    """Pull one ticker's OHLCV frame out of a multi-ticker yf.download result"""
+    if isinstance(data.columns, pd.MultiIndex):
+        if yf_symbol not in data.columns.get_level_values(0):
+            return pd.DataFrame()
+        data = data[yf_symbol]
+    return data.dropna(how="all")
+
 @app.route('/stock/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
     """Get current stock data"""
     try:
         yf_symbol = get_nse_symbol(symbol)
-        stock = yf.Ticker(yf_symbol)
         
         # Get basic info
-        info = stock.info
+        info = market_data.info(yf_symbol)
         
         # Get current price data
-        hist = stock.history(period="2d")
+        hist = market_data.history(yf_symbol, period="2d")
         if hist.empty:
             return jsonify({"error": f"No data found for symbol {symbol}"}), 404
         
-        current_data = hist.iloc[-1]
-        previous_data = hist.iloc[-2] if len(hist) > 1 else current_data
+        return jsonify(build_stock_response(symbol, info, hist))
         
-        current_price = float(current_data['Close'])
-        previous_close = float(previous_data['Close'])
-        change = current_price - previous_close
-        change_percent = (change / previous_close) * 100
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/stocks/batch', methods=['POST'])
+def get_stocks_batch():
+    """Get current stock data for many symbols with one bulk download"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        symbols = list(dict.fromkeys(
+            str(symbol).strip().upper() for symbol in payload.get('symbols', []) if str(symbol).strip()
+        ))
+        if not symbols:
+            return jsonify({"error": "No symbols provided"}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({"error": f"At most {MAX_BATCH_SYMBOLS} symbols per batch"}), 400
         
-        # Get additional info
-        market_cap = info.get('marketCap')
-        pe_ratio = info.get('trailingPE')
-        company_name = info.get('longName', info.get('shortName', symbol))
+        yf_symbols = {symbol: get_nse_symbol(symbol) for symbol in symbols}
         
-        response = {
-            "symbol": symbol.upper(),
-            "name": company_name,
-            "price": current_price,
-            "openPrice": float(current_data['Open']),
-            "highPrice": float(current_data['High']),
-            "lowPrice": float(current_data['Low']),
-            "volume": format_volume(current_data['Volume']),
-            "change": change,
-            "changePercent": change_percent,
-            "marketCap": format_market_cap(market_cap),
-            "peRatio": float(pe_ratio) if pe_ratio and not pd.isna(pe_ratio) else None
-        }
+        # One round trip for all price history
+        data = market_data.download(list(yf_symbols.values()), "2d")
+        
+        # info has no bulk API, so fetch it with bounded parallelism
+        def fetch_info(yf_symbol):
+            try:
+                return market_data.info(yf_symbol)
+            except Exception:
+                return {}
+        
+        with ThreadPoolExecutor(max_workers=BATCH_INFO_CONCURRENCY) as executor:
+            infos = list(executor.map(fetch_info, yf_symbols.values()))
         
-        return jsonify(response)
+        quotes = []
+        errors = []
+        for (symbol, yf_symbol), info in zip(yf_symbols.items(), infos):
+            try:
+                hist = extract_ticker_history(data, yf_symbol)
+                if hist.empty:
+                    errors.append({"symbol": symbol, "detail": f"No data found for symbol {symbol}"})
+                    continue
+                quotes.append(build_stock_response(symbol, info, hist))
+            except Exception as e:
+                errors.append({"symbol": symbol, "detail": str(e)})
+        
+        return jsonify({"quotes": quotes, "errors": errors})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -166,33 +255,34 @@ def get_historical_data(symbol):
         yf_period, interval = period_map.get(period, ('1d', '5m'))
         
         yf_symbol = get_nse_symbol(symbol)
-        stock = yf.Ticker(yf_symbol)
+        fetch = market_data.fetcher(yf_symbol)
         
         # For intraday data, use different approach
         if period == '1D':
             # Get intraday data for current day
-            hist = stock.history(period='1d', interval='5m')
+            hist = history_store.get_window(yf_symbol, '5m', '1d', fetch)
             if hist.empty:
                 # Fallback to daily data if intraday not available
-                hist = stock.history(period='5d', interval='1d')
+                hist = history_store.get_window(yf_symbol, '1d', '5d', fetch)
         else:
-            hist = stock.history(period=yf_period, interval=interval)
+            hist = history_store.get_window(yf_symbol, interval, yf_period, fetch)
         
         if hist.empty:
             return jsonify({"error": f"No historical data found for symbol {symbol}"}), 404
         
-        data = []
-        for date, row in hist.iterrows():
-            # Handle different timestamp formats
-            if period == '1D' and hasattr(date, 'strftime'):
-                date_str = date.strftime('%Y-%m-%d %H:%M')
-            else:
-                date_str = date.strftime('%Y-%m-%d')
-            
-            data.append({
-                "date": date_str,
-                "price": float(row['Close'])
-            })
+        # Handle different timestamp formats
+        date_format = '%Y-%m-%d %H:%M' if period == '1D' else '%Y-%m-%d'
+        
+        # Build rows from whole columns, downsampling for the chart if asked
+        prices = hist['Close'].to_numpy(dtype=float)
+        index = hist.index
+        max_points = request.args.get('max_points', type=int)
+        if max_points and max_points >= 3 and len(prices) > max_points:
+            keep = lttb_indices(index.asi8, prices, max_points)
+            prices = prices[keep]
+            index = index[keep]
+        dates = format_dates(index, date_format)
+        data = [{"date": date, "price": price} for date, price in zip(dates, prices.tolist())]
         
         # Ensure we have at least some data points for charting
         if len(data) < 2:
@@ -218,59 +308,28 @@ def get_historical_data(symbol):
 def search_stocks(query):
     """Search for stocks with autocomplete"""
     try:
-        query = query.upper()
-        matches = []
-        
-        for symbol in NSE_STOCKS.keys():
-            if query in symbol:
-                matches.append({
-                    "symbol": symbol,
-                    "name": symbol  # We can enhance this with actual company names
-                })
-        
-        # Limit to 10 results
-        return jsonify(matches[:10])
+        return jsonify([
+            {"symbol": symbol, "name": name}
+            for symbol, name in symbol_index.search(query, limit=10)
+        ])
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/fundamentals/<symbol>', methods=['GET'])
 def get_fundamentals(symbol):
-    """Get fundamental analysis data for a stock"""
+    """Get fundamental analysis data for a stock, optionally only ?fields=a,b"""
+    try:
+        fields = request.args.get('fields')
+        requested = parse_fields(fields.split(',') if fields is not None else None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     try:
         yf_symbol = get_nse_symbol(symbol)
-        stock = yf.Ticker(yf_symbol)
-        
-        # Get basic stock info
-        info = stock.info
         
-        # Get financial data
-        financials = stock.financials
-        balance_sheet = stock.balance_sheet
-        cash_flow = stock.cashflow
-        
-        # Extract key metrics with safe defaults
-        fundamentals = {
-            "stockSymbol": symbol.upper(),
-            "marketCap": info.get('marketCap', 0),
-            "peRatio": info.get('trailingPE', 0),
-            "pegRatio": info.get('pegRatio', 0),
-            "bookValue": info.get('bookValue', 0),
-            "dividendYield": info.get('dividendYield', 0),
-            "roe": info.get('returnOnEquity', 0),
-            "debtToEquity": info.get('debtToEquity', 0),
-            "currentRatio": info.get('currentRatio', 0),
-            "revenueGrowth": info.get('revenueGrowth', 0),
-            "profitMargin": info.get('profitMargins', 0),
-            "operatingMargin": info.get('operatingMargins', 0),
-            "eps": info.get('trailingEps', 0),
-            "priceToBook": info.get('priceToBook', 0),
-            "priceToSales": info.get('priceToSalesTrailing12Months', 0),
-            "quickRatio": info.get('quickRatio', 0),
-            "interestCoverage": 0,  # Calculate from financials if available
-            "assetTurnover": 0,     # Calculate from financials if available
-            "returnOnAssets": info.get('returnOnAssets', 0)
-        }
+        # Statements are only fetched for the derived ratios that need them
+        fundamentals = load_fundamentals(market_data, fundamentals_cache, symbol, yf_symbol, requested)
         
         return jsonify(fundamentals)
         
@@ -283,4 +342,9 @@ def health_check():
     return jsonify({"status": "healthy", "service": "yfinance-service"})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    port = int(os.getenv("YFINANCE_SERVICE_PORT", "5001"))
+    if is_production():
+        # Requests block on Yahoo, so serve them from a thread pool
+        serve_wsgi(app, "yfinance-service", '0.0.0.0', port, int(os.getenv("YFINANCE_SERVICE_THREADS", "16")), IMPORT_STARTED)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
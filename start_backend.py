@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 """
 Startup script for the FastAPI backend
+
+Runs with reload by default; set SERVE_MODE=production for worker
+processes without reload (see backend/serving.py).
 """
 
 import os
 import sys
-import subprocess
 from pathlib import Path
 
 # Add backend directory to Python path
@@ -17,22 +19,11 @@ os.chdir(backend_dir)
 
 if __name__ == "__main__":
     try:
-        print("Starting FastAPI NSE Stock Analysis Server...")
-        
-        # Import and run the FastAPI app
-        import uvicorn
-        from main import app
-        
-        uvicorn.run(
-            app,
-            host="0.0.0.0",
-            port=int(os.environ.get("PORT", "5000")),
-            reload=True,
-            log_level="info"
-        )
+        from serving import run_api
+        run_api()
         
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e:
         print(f"Error starting server: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)